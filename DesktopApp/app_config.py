@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+# App settings: built-in defaults with config.json (next to the exe or this
+# script, or BET_CONFIG) merged over them key by key. Sections the file
+# leaves out (vision, macro, diagnostics, warmup, mouse, ...) fall back to
+# the defaults each reader passes to .get().
+DEFAULTS = {
+	'controller': {
+		'http_url': 'https://absolutely-stirring-racer.ngrok-free.app',
+		'ws_url': 'wss://quality-crappie-painfully.ngrok-free.app'
+	}
+}
+
+
+@dataclass
+class Config:
+	controller_http: str
+	controller_ws: str
+	raw: dict
+
+
+def app_dir() -> str:
+	return os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+
+
+def merge(base: dict, override: dict) -> dict:
+	"""Copy of base with override merged in; nested dicts merge, anything else replaces"""
+	out = dict(base)
+	for key, value in override.items():
+		if isinstance(value, dict) and isinstance(out.get(key), dict):
+			out[key] = merge(out[key], value)
+		else:
+			out[key] = value
+	return out
+
+
+def load_config(path: Optional[str] = None) -> Config:
+	path = path or os.environ.get('BET_CONFIG') or os.path.join(app_dir(), 'config.json')
+	# A copy: the app never writes into DEFAULTS
+	raw = merge(DEFAULTS, {})
+	if os.path.exists(path):
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			if not isinstance(data, dict):
+				raise ValueError('top level must be an object')
+			raw = merge(raw, data)
+		except (OSError, ValueError) as e:
+			print(f"⚠️ Ignoring {path}: {e}")
+	return Config(
+		controller_http=raw['controller']['http_url'],
+		controller_ws=raw['controller']['ws_url'],
+		raw=raw
+	)
@@ -0,0 +1,173 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+import cv_utils
+
+# Post-click check for macro bets. A small region around the bet area click
+# point is captured before the click sequence and polled after it, and the
+# bet only counts as placed once enough pixels there have changed strongly
+# (a chip stack appearing, not the hover tint). The gray before/after/diff
+# images live in buffers allocated once per region size. The poll gives up
+# after the table's usual draw time plus margin, and a bet still not seen
+# gets one more look with what is left of one capture interval, so
+# verification never adds more than that to a bet.
+# click_pacing.py uses the same region watch, on a tiny region, to wait for
+# each click to register.
+
+Region = Tuple[int, int, int, int]
+# Unchanged polls in a row after which a hovered region counts as settled (arm(settle_ms=...))
+SETTLE_POLLS = 3
+
+
+class RegionWatch:
+	"""Waits for the region around a click point to change"""
+
+	def __init__(self, roi_size: Tuple[int, int], pixel_delta: int, min_changed: float, timeout_ms: int, poll_ms: int,
+				 record: bool = True, label: Optional[str] = None):
+		self.roi_size = (int(roi_size[0]), int(roi_size[1]))
+		# Gray levels a pixel must move by to count; the hover highlight stays below this
+		self.pixel_delta = pixel_delta
+		# Share of the region that must change
+		self.min_changed = min_changed
+		self.timeout_ms = timeout_ms
+		self.poll_ms = poll_ms
+		# record: captures go through cv_utils.screenshot() and so into the frame ring;
+		# label: note added to the last ring frame when no change was seen
+		self.record = record
+		self.label = label
+		self._before: Optional[np.ndarray] = None
+		self._after: Optional[np.ndarray] = None
+		self._diff: Optional[np.ndarray] = None
+		self._region: Optional[Region] = None
+		self._last_region: Optional[Region] = None
+		self.last_score = 0.0
+		self.last_ms = 0.0
+		self.checks = 0
+		self.unconfirmed = 0
+
+	def _allocate(self, shape: Tuple[int, int]) -> None:
+		if self._before is None or self._before.shape != shape:
+			self._before = np.empty(shape, dtype=np.uint8)
+			self._after = np.empty(shape, dtype=np.uint8)
+			self._diff = np.empty(shape, dtype=np.uint8)
+
+	def region_for(self, box: Tuple[int, int, int, int]) -> Optional[Region]:
+		"""Region (monitor coordinates) centred on a screen click box; None if it is off the selected monitor"""
+		left, top, width, height = cv_utils.monitor_geometry()
+		w, h = self.roi_size
+		return cv_utils.clip_region((box[0] - left - w // 2, box[1] - top - h // 2, w, h), (height, width))
+
+	def arm(self, box: Tuple[int, int, int, int], settle_ms: float = 0.0) -> bool:
+		"""Capture the 'before' image; call right before the click sequence.
+
+		With settle_ms the region is re-captured until it has not changed for
+		SETTLE_POLLS polls in a row (or settle_ms passes), so a hover animation
+		still running when the cursor arrived is part of 'before' rather than
+		taken for the click.
+		"""
+		self._region = self.region_for(box)
+		if self._region is None:
+			return False
+		img = self._grab(self._region)
+		if img is None:
+			self._region = None
+			return False
+		self._allocate(img.shape[:2])
+		cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self._before)
+		if settle_ms > 0:
+			backend = cv_utils.capture_backend()
+			deadline = backend.now() + settle_ms / 1000.0
+			quiet = 0
+			while quiet < SETTLE_POLLS and backend.now() < deadline:
+				backend.sleep(self.poll_ms / 1000.0)
+				img = self._grab(self._region)
+				if img is None or img.shape[:2] != self._before.shape:
+					break
+				cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self._after)
+				if self.changed_fraction() < self.min_changed:
+					quiet += 1
+				else:
+					# Still animating: the newer image becomes 'before'
+					self._before, self._after = self._after, self._before
+					quiet = 0
+		return True
+
+	def _grab(self, region: Region) -> Optional[np.ndarray]:
+		return cv_utils.screenshot(region) if self.record else cv_utils.capture_backend().grab(region)
+
+	def changed_fraction(self) -> float:
+		cv2.absdiff(self._before, self._after, dst=self._diff)
+		cv2.threshold(self._diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self._diff)
+		return cv2.countNonZero(self._diff) / float(self._diff.size)
+
+	def confirm(self, timeout_ms: Optional[float] = None) -> Optional[bool]:
+		"""Poll the armed region until it changes or the timeout passes; None if nothing was armed"""
+		if self._region is None:
+			return None
+		backend = cv_utils.capture_backend()
+		# On the capture clock, like the deadline: draw times learned from it stay comparable on replays
+		t0 = backend.now()
+		deadline = t0 + (self.timeout_ms if timeout_ms is None else timeout_ms) / 1000.0
+		while True:
+			img = self._grab(self._region)
+			if img is None or img.shape[:2] != self._after.shape:
+				return None
+			cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self._after)
+			self.last_score = self.changed_fraction()
+			if self.last_score >= self.min_changed or backend.now() >= deadline:
+				break
+			backend.sleep(self.poll_ms / 1000.0)
+		self.last_ms = (backend.now() - t0) * 1000.0
+		region, self._region = self._region, None
+		self._last_region = region
+		self.checks += 1
+		confirmed = self.last_score >= self.min_changed
+		if not confirmed:
+			self.unconfirmed += 1
+			if self.label:
+				# Marks the region on the last ring frame, for the bet error dump
+				cv_utils.annotate_frame(self.label, region, self.last_score)
+		return confirmed
+
+	def recheck(self, timeout_ms: Optional[float] = None) -> Optional[bool]:
+		"""Poll the last confirmed region once more against the same 'before' image"""
+		self._region = self._last_region
+		return self.confirm(timeout_ms)
+
+
+class BetVerifier(RegionWatch):
+	"""Confirms that chips landed on the bet area after a click sequence.
+
+	The first look and the re-check together wait at most budget_ms (one
+	capture interval). Without a fixed timeout_ms the first look follows how
+	long confirmed bets took to draw on this table (click_pacing.LatencyModel,
+	the whole budget until the first confirmation) and the re-check gets what
+	is left of the budget.
+	"""
+
+	def __init__(self, roi_size: Tuple[int, int] = (200, 120), pixel_delta: int = 40, min_changed: float = 0.01,
+				 timeout_ms: Optional[int] = None, poll_ms: int = 15, budget_ms: float = 100.0):
+		# click_pacing imports this module, so its model is imported here
+		from click_pacing import LatencyModel
+		super().__init__(roi_size, pixel_delta, min_changed, timeout_ms, poll_ms, record=True, label='bet_not_confirmed')
+		self.budget_ms = budget_ms
+		self.model = LatencyModel(initial_ms=budget_ms, min_ms=min(30.0, budget_ms), max_ms=budget_ms)
+		self._waited = 0.0
+
+	def arm(self, box: Tuple[int, int, int, int], settle_ms: float = 0.0) -> bool:
+		self._waited = 0.0
+		return super().arm(box, settle_ms)
+
+	def confirm(self, timeout_ms: Optional[float] = None) -> Optional[bool]:
+		if timeout_ms is None:
+			timeout_ms = self.model.timeout_ms() if self.timeout_ms is None else self.timeout_ms
+		# An earlier look at the same bet counts against the budget
+		timeout_ms = max(0.0, min(timeout_ms, self.budget_ms - self._waited))
+		confirmed = super().confirm(timeout_ms)
+		if confirmed:
+			# Confirmed on a re-check: the chips took both waits to draw
+			self.model.observe(self._waited + self.last_ms)
+		self._waited = self._waited + self.last_ms if confirmed is False else 0.0
+		return confirmed
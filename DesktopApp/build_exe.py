@@ -20,6 +20,15 @@ def install_pyinstaller():
         subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
         print("✓ PyInstaller installed successfully")
 
+def build_template_bundle():
+    """Pack assets into assets/templates.npy + templates.json (see build_templates.py)"""
+    try:
+        from build_templates import build_bundle
+        count = build_bundle()
+        print(f"✓ Template bundle built ({count} assets)")
+    except Exception as e:
+        print(f"⚠️ Warning: Template bundle not built, app will decode PNGs at startup: {e}")
+
 def create_spec_file():
     """Create PyInstaller spec file"""
     spec_content = '''# -*- mode: python ; coding: utf-8 -*-
@@ -272,6 +281,9 @@ def main():
     # Install PyInstaller
     install_pyinstaller()
     
+    # Precompile templates so the frozen app maps them instead of decoding PNGs
+    build_template_bundle()
+    
     # Create spec file
     create_spec_file()
     
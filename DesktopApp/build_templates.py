@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Precompile template assets into one memory-mappable bundle.
+
+Writes assets/templates.npy (a flat uint8 blob) and assets/templates.json
+(offset/shape index). For every PNG under assets/ and assets/chips/ the
+bundle holds the BGR image, alpha (if any), the match mask, the grayscale
+half-resolution variants used by fast mode and, with --scales, a scale
+pyramid for match_template_multiscale_masked.
+cv_utils maps the blob at first use and hands out zero-copy views, so
+startup no longer decodes PNGs or rebuilds masks.
+
+Usage:
+    python build_templates.py                # build the bundle
+    python build_templates.py --scales 0.9,1.1
+    python build_templates.py --measure      # cold start with vs. without it
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import cv_utils
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
+BLOB_NAME = 'templates.npy'
+ALIGN = 64
+# Pyramid levels are opt-in (--scales); the 1000px chip PNGs make each level costly
+DEFAULT_SCALES = ()
+
+
+def asset_paths():
+    """All template PNGs, relative to the app directory"""
+    paths = glob.glob(os.path.join(ASSETS_DIR, '*.png')) + glob.glob(os.path.join(ASSETS_DIR, 'chips', '*.png'))
+    return sorted(cv_utils.asset_key(p) for p in paths)
+
+
+def template_variants(path, scales):
+    """Every precomputed array for one asset, built with the runtime's own helpers"""
+    # Decode the PNG: a stale bundle must never feed the new one
+    bgr, alpha = cv_utils.load_image_with_alpha(path, bundled=False)
+    bgr = np.ascontiguousarray(bgr)
+    mask = alpha if alpha is not None else cv_utils.build_nonwhite_mask(bgr)
+    fast = cv_utils.FastTemplate(bgr, mask)
+    variants = {'bgr': bgr, 'mask': mask}
+    if alpha is not None:
+        variants['alpha'] = alpha
+    if fast.scale != 1.0:
+        variants['gray_half'] = fast.gray
+        if fast.mask_small is not None:
+            variants['mask_half'] = fast.mask_small
+    for s in scales:
+        variants[f"bgr@{s:g}"] = cv_utils.resize_image(bgr, s)
+        variants[f"mask@{s:g}"] = cv_utils.resize_mask(mask, s)
+    return variants
+
+
+def build_bundle(scales=DEFAULT_SCALES):
+    """Write the blob and index; returns the number of assets packed"""
+    blocks = []
+    entries = {}
+    offset = 0
+    for key in asset_paths():
+        src = os.path.join(BASE_DIR, key)
+        try:
+            variants = template_variants(key, scales)
+        except Exception as e:
+            print(f"⚠️ Skipping {key}: {e}")
+            continue
+        index = {}
+        for name, arr in variants.items():
+            arr = np.ascontiguousarray(arr, dtype=np.uint8)
+            pad = (-offset) % ALIGN
+            if pad:
+                blocks.append(np.zeros(pad, dtype=np.uint8))
+                offset += pad
+            index[name] = [offset, list(arr.shape)]
+            blocks.append(arr.ravel())
+            offset += arr.size
+        st = os.stat(src)
+        entries[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'crc': cv_utils.file_crc(src), 'variants': index}
+        print(f"✓ {key}: {len(index)} variants")
+
+    blob = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.uint8)
+    np.save(os.path.join(ASSETS_DIR, BLOB_NAME), blob)
+    with open(cv_utils.BUNDLE_INDEX, 'w') as f:
+        json.dump({'version': 1, 'blob': BLOB_NAME, 'scales': list(scales), 'entries': entries}, f, indent=1)
+    print(f"✓ Wrote {BLOB_NAME} ({blob.size / 1e6:.1f} MB) and {os.path.basename(cv_utils.BUNDLE_INDEX)}")
+    return len(entries)
+
+
+# Cold start = fresh interpreter, import the vision stack, build a
+# PragmaticBaccarat over every bundled asset (templates, masks, prefilters,
+# fast-mode variants) - i.e. everything before the first bet can be placed.
+_COLD_START = r'''
+t0 = time.perf_counter()
+import os, sys
+sys.path.insert(0, %r)
+from site_pragmatic import PragmaticBaccarat
+t1 = time.perf_counter()
+tpl = {'player_area': 'assets/player_area.png', 'banker_area': 'assets/banker_area.png',
+       'cancel_button': 'assets/cancel_button.png', 'fast_mode': True, 'chips': {}}
+for p in os.listdir(os.path.join(%r, 'assets', 'chips')):
+    if p.endswith('.png'):
+        tpl['chips'][p[:-4]] = 'assets/chips/' + p
+PragmaticBaccarat({'templates': tpl})
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f}")
+'''
+
+
+def measure(runs=5):
+    """Median cold start (import, init) in ms with and without the bundle"""
+    results = {}
+    for label, flag in (('png decode', '0'), ('bundle', '1')):
+        env = dict(os.environ, BET_TEMPLATE_BUNDLE=flag)
+        samples = []
+        for _ in range(runs):
+            out = subprocess.check_output([sys.executable, '-c', _COLD_START % (BASE_DIR, BASE_DIR)], env=env, cwd=BASE_DIR, text=True)
+            samples.append([float(v) for v in out.split()[-2:]])
+        samples.sort(key=lambda s: s[0] + s[1])
+        imp, init = samples[len(samples) // 2]
+        results[label] = (imp, init)
+        print(f"{label:<11} import {imp:7.1f} ms   init {init:7.1f} ms   total {imp + init:7.1f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default=','.join(f"{s:g}" for s in DEFAULT_SCALES), help='pyramid scales, comma separated')
+    parser.add_argument('--measure', action='store_true', help='compare cold start with and without the bundle')
+    args = parser.parse_args()
+    if args.measure:
+        if not os.path.exists(cv_utils.BUNDLE_INDEX):
+            build_bundle()
+        measure()
+        return
+    build_bundle(tuple(float(s) for s in args.scales.split(',') if s))
+
+
+if __name__ == '__main__':
+    main()
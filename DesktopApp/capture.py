@@ -0,0 +1,438 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import cv_utils
+
+# Frame sources behind cv_utils.screenshot(). Every backend hands out BGR
+# frames of the selected monitor (or an (x, y, w, h) region of it) and owns
+# the clock that polling code sleeps on, so recorded sessions can be replayed
+# faster than real time without touching the code that waits on the screen.
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+VIDEO_EXTS = ('.mp4', '.avi', '.mkv', '.mov')
+# Optional sidecar in a replay directory: {"frames": [{"file": ..., "t": seconds}, ...]}
+TIMESTAMPS_FILE = 'frames.json'
+
+
+class CaptureBackend:
+	"""Live-clock base: now() is time.monotonic() and sleep() really sleeps"""
+
+	name = 'base'
+
+	def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+		# region is clipped to the frame; None when none of it is inside
+		raise NotImplementedError
+
+	def now(self) -> float:
+		return time.monotonic()
+
+	def sleep(self, seconds: float) -> None:
+		if seconds > 0:
+			time.sleep(seconds)
+
+	def close(self) -> None:
+		pass
+
+
+class MssBackend(CaptureBackend):
+	"""Live screen capture of a monitor; monitor_index=None follows cv_utils.set_selected_monitor"""
+
+	name = 'mss'
+
+	def __init__(self, monitor_index: Optional[int] = None):
+		self.monitor_index = monitor_index
+		# mss handles are not thread-safe, so each thread keeps its own open
+		# session instead of paying the setup cost on every grab.
+		self._local = threading.local()
+
+	def _session(self):
+		sct = getattr(self._local, 'sct', None)
+		if sct is None:
+			import mss
+			sct = mss.mss()
+			self._local.sct = sct
+		return sct
+
+	def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+		sct = self._session()
+		index = self.monitor_index if self.monitor_index is not None else cv_utils.SELECTED_MONITOR_INDEX
+		mon = sct.monitors[index]
+		if region is not None:
+			x, y, w, h = region
+			mon = {'left': mon['left'] + int(x), 'top': mon['top'] + int(y), 'width': int(w), 'height': int(h)}
+		img = np.array(sct.grab(mon))
+		# mss returns BGRA; convert to BGR
+		return img[:, :, :3]
+
+	def close(self) -> None:
+		sct = getattr(self._local, 'sct', None)
+		if sct is not None:
+			sct.close()
+			self._local.sct = None
+
+
+class RecordedBackend(CaptureBackend):
+	"""Frames with timestamps played against a session clock.
+
+	speed=None runs on a virtual clock that only moves when sleep() is called,
+	so a poll loop walks through the recording as fast as it can match;
+	speed=1.0 replays in real time, 4.0 four times faster, and so on.
+	grab() returns the latest frame at or before now(); past the end the last
+	frame is held (exhausted becomes True) unless loop is set.
+	"""
+
+	def __init__(self, speed: Optional[float] = None, loop: bool = False):
+		self.speed = speed
+		self.loop = loop
+		self.exhausted = False
+		self._t0 = 0.0
+		self._virtual = 0.0
+		self._wall0 = time.monotonic()
+		self._lock = threading.Lock()
+		self.frames_served = 0
+
+	def now(self) -> float:
+		if self.speed is None:
+			return self._virtual
+		return self._t0 + (time.monotonic() - self._wall0) * self.speed
+
+	def sleep(self, seconds: float) -> None:
+		if seconds <= 0:
+			return
+		if self.speed is None:
+			self._virtual += seconds
+		else:
+			time.sleep(seconds / self.speed)
+
+	def rewind(self) -> None:
+		with self._lock:
+			self._virtual = self._t0
+			self._wall0 = time.monotonic()
+			self.exhausted = False
+			self._rewind()
+
+	def _rewind(self) -> None:
+		pass
+
+	def duration(self) -> float:
+		raise NotImplementedError
+
+	def _frame_at(self, t: float) -> np.ndarray:
+		raise NotImplementedError
+
+	def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+		with self._lock:
+			t = self.now() - self._t0
+			length = self.duration()
+			if t >= length:
+				if self.loop and length > 0:
+					t = t % length
+				else:
+					self.exhausted = True
+			frame = self._frame_at(t)
+			self.frames_served += 1
+		if region is None:
+			return frame
+		clipped = cv_utils.clip_region(region, frame.shape)
+		if clipped is None:
+			return None
+		x, y, w, h = clipped
+		return frame[y:y + h, x:x + w]
+
+
+class ReplayBackend(RecordedBackend):
+	"""Replay a directory of frames or a video file.
+
+	Directory frames are ordered by name; timestamps come from frames.json when
+	present, otherwise frames are spaced 1/fps apart. Videos use the container
+	timestamps. Decoded frames are read-only and shared between callers.
+	"""
+
+	name = 'replay'
+
+	def __init__(self, source: str, fps: float = 10.0, speed: Optional[float] = None, loop: bool = False):
+		super().__init__(speed=speed, loop=loop)
+		self.source = source
+		self.fps = fps
+		self._video = None
+		self._cached: Tuple[int, Optional[np.ndarray]] = (-1, None)
+		if os.path.isdir(source):
+			self.files, self.times = self._index_dir(source, fps)
+		elif source.lower().endswith(VIDEO_EXTS):
+			self.files, self.times = [], self._index_video(source)
+		else:
+			raise FileNotFoundError(f"Replay source not found: {source}")
+		if not self.times:
+			raise ValueError(f"Replay source has no frames: {source}")
+		self.times = [t - self.times[0] for t in self.times]
+
+	@staticmethod
+	def _index_dir(path: str, fps: float) -> Tuple[List[str], List[float]]:
+		sidecar = os.path.join(path, TIMESTAMPS_FILE)
+		if os.path.exists(sidecar):
+			with open(sidecar, 'r') as f:
+				entries = sorted(json.load(f).get('frames', []), key=lambda e: float(e['t']))
+			return [os.path.join(path, e['file']) for e in entries], [float(e['t']) for e in entries]
+		files = sorted(p for p in glob.glob(os.path.join(path, '*')) if p.lower().endswith(IMAGE_EXTS))
+		return files, [i / fps for i in range(len(files))]
+
+	def _index_video(self, path: str) -> List[float]:
+		cap = cv2.VideoCapture(path)
+		if not cap.isOpened():
+			raise FileNotFoundError(f"Cannot open video: {path}")
+		times = []
+		# Only timestamps are collected here; frames are decoded on demand
+		while cap.grab():
+			times.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+		cap.release()
+		return times
+
+	def duration(self) -> float:
+		step = self.times[-1] / (len(self.times) - 1) if len(self.times) > 1 else 1.0 / self.fps
+		return self.times[-1] + step
+
+	def _index_at(self, t: float) -> int:
+		return max(0, int(np.searchsorted(self.times, t, side='right')) - 1)
+
+	def _decode(self, idx: int) -> np.ndarray:
+		if self.files:
+			frame = cv2.imread(self.files[idx], cv2.IMREAD_COLOR)
+			if frame is None:
+				raise FileNotFoundError(f"Unreadable replay frame: {self.files[idx]}")
+			return frame
+		# Video: decode forward from the current position, reopening to go back
+		if self._video is None or idx < self._video[1]:
+			if self._video is not None:
+				self._video[0].release()
+			self._video = [cv2.VideoCapture(self.source), 0]
+		cap, pos = self._video
+		while pos < idx:
+			cap.grab()
+			pos += 1
+		ok, frame = cap.read()
+		self._video[1] = pos + 1
+		if not ok:
+			raise ValueError(f"Video ended early at frame {idx}: {self.source}")
+		return frame
+
+	def _frame_at(self, t: float) -> np.ndarray:
+		idx = self._index_at(t)
+		if self._cached[0] != idx:
+			frame = self._decode(idx)
+			frame.setflags(write=False)
+			self._cached = (idx, frame)
+		return self._cached[1]
+
+	def _rewind(self) -> None:
+		self._cached = (-1, None)
+
+	def close(self) -> None:
+		if self._video is not None:
+			self._video[0].release()
+			self._video = None
+
+
+class SyntheticBackend(RecordedBackend):
+	"""In-memory frames from synth_screens.generate(), one every 1/fps seconds.
+
+	label holds the ground truth of the frame last returned by grab().
+	"""
+
+	name = 'synthetic'
+
+	def __init__(self, count: int = 1000, fps: float = 10.0, speed: Optional[float] = None, loop: bool = False, **generate_kwargs):
+		super().__init__(speed=speed, loop=loop)
+		self.count = count
+		self.fps = fps
+		self.generate_kwargs = generate_kwargs
+		self.label: Optional[dict] = None
+		self._rewind()
+
+	def _rewind(self) -> None:
+		import synth_screens
+		self._frames: Iterator[Tuple[np.ndarray, dict]] = synth_screens.generate(self.count, **self.generate_kwargs)
+		self._idx = -1
+		self._frame: Optional[np.ndarray] = None
+
+	def duration(self) -> float:
+		return self.count / self.fps
+
+	def _frame_at(self, t: float) -> np.ndarray:
+		idx = min(self.count - 1, int(t * self.fps))
+		if idx < self._idx:
+			self._rewind()
+		# The generator only moves forward; skipped frames are still generated
+		while self._idx < idx:
+			self._frame, self.label = next(self._frames)
+			self._idx += 1
+		return self._frame
+
+
+def backend_from_spec(spec: Optional[str]) -> CaptureBackend:
+	"""'mss' (default), 'replay:<dir or video>[@speed]' or 'synthetic[:count]'"""
+	spec = (spec or 'mss').strip()
+	kind, _, arg = spec.partition(':')
+	if kind == 'mss':
+		return MssBackend(int(arg) if arg else None)
+	if kind == 'replay':
+		path, _, speed = arg.rpartition('@') if '@' in arg else (arg, '', '')
+		return ReplayBackend(path, speed=float(speed) if speed else None)
+	if kind == 'synthetic':
+		return SyntheticBackend(int(arg) if arg else 1000)
+	raise ValueError(f"Unknown capture backend: {spec}")
+
+
+class FrameRing:
+	"""Last `capacity` captured frames in one preallocated uint8 block.
+
+	Slots are sized by the first frame (or `shape`); larger frames are stored
+	subsampled by an integer step, smaller ones (ROI grabs) in the slot's
+	top-left corner, so push() never allocates. annotate() attaches match
+	results to the newest frame for the overlays drawn by FrameDumper.
+	"""
+
+	def __init__(self, capacity: int = 8, shape: Optional[Tuple[int, int]] = None):
+		self.capacity = max(1, int(capacity))
+		self._buf: Optional[np.ndarray] = None
+		self._ts = np.zeros(self.capacity, dtype=np.float64)
+		self._seq = np.full(self.capacity, -1, dtype=np.int64)
+		self._hw = np.zeros((self.capacity, 2), dtype=np.int32)
+		self._region = np.zeros((self.capacity, 4), dtype=np.int32)
+		self._step = np.ones(self.capacity, dtype=np.int32)
+		self._notes: List[list] = [[] for _ in range(self.capacity)]
+		self._next = 0
+		self._lock = threading.Lock()
+		if shape is not None:
+			self._allocate(shape)
+
+	def _allocate(self, shape: Tuple[int, ...]) -> None:
+		self._buf = np.zeros((self.capacity, int(shape[0]), int(shape[1]), 3), dtype=np.uint8)
+
+	def __len__(self) -> int:
+		return min(self._next, self.capacity)
+
+	def push(self, frame: np.ndarray, region: Optional[Tuple[int, int, int, int]] = None, t: float = 0.0) -> None:
+		h, w = frame.shape[:2]
+		if h == 0 or w == 0:
+			return
+		with self._lock:
+			if self._buf is None:
+				self._allocate(frame.shape)
+			slot = self._next % self.capacity
+			bh, bw = self._buf.shape[1:3]
+			step = max(1, -(-h // bh), -(-w // bw))
+			src = frame[::step, ::step, :3] if step > 1 else frame[:, :, :3]
+			sh, sw = src.shape[:2]
+			np.copyto(self._buf[slot, :sh, :sw], src)
+			self._ts[slot] = t
+			self._seq[slot] = self._next
+			self._hw[slot] = (sh, sw)
+			self._region[slot] = region if region is not None else (0, 0, w, h)
+			self._step[slot] = step
+			self._notes[slot].clear()
+			self._next += 1
+
+	def annotate(self, label: str, box: Optional[Tuple[int, ...]], score: Optional[float] = None) -> None:
+		# box is in monitor coordinates (None records a miss)
+		with self._lock:
+			if self._next == 0:
+				return
+			slot = (self._next - 1) % self.capacity
+			self._notes[slot].append((label, tuple(int(v) for v in box[:4]) if box else None, None if score is None else float(score)))
+
+	def snapshot(self) -> List[dict]:
+		# Copies out the filled slots, oldest first; the only allocation, on the error path
+		with self._lock:
+			frames = []
+			for seq in range(max(0, self._next - self.capacity), self._next):
+				slot = seq % self.capacity
+				sh, sw = self._hw[slot]
+				frames.append({
+					'seq': int(seq),
+					't': float(self._ts[slot]),
+					'region': [int(v) for v in self._region[slot]],
+					'step': int(self._step[slot]),
+					'notes': list(self._notes[slot]),
+					'frame': self._buf[slot, :sh, :sw].copy(),
+				})
+			return frames
+
+
+def draw_overlay(frame: np.ndarray, notes: List[tuple], region: List[int], step: int) -> np.ndarray:
+	"""Draw match boxes (green) and misses (red text) onto a ring frame in place"""
+	rx, ry = region[0], region[1]
+	line = 0
+	for label, box, score in notes:
+		text = f"{label} {score:.3f}" if score is not None else label
+		if box is None:
+			line += 1
+			cv2.putText(frame, f"{text}: miss", (6, 18 * line), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1, cv2.LINE_AA)
+			continue
+		x, y, w, h = box
+		p1 = ((x - rx) // step, (y - ry) // step)
+		p2 = ((x - rx + w) // step, (y - ry + h) // step)
+		cv2.rectangle(frame, p1, p2, (0, 255, 0), 2)
+		cv2.putText(frame, text, (p1[0], max(12, p1[1] - 4)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
+	return frame
+
+
+class FrameDumper:
+	"""Background writer for FrameRing snapshots.
+
+	submit() only queues; overlays, JPEG encoding and file writes happen on
+	one daemon thread. When the queue is full the dump is dropped (counted in
+	`dropped`) rather than making the caller wait.
+	"""
+
+	def __init__(self, quality: int = 85, max_pending: int = 4, logger=None):
+		self.quality = quality
+		self.logger = logger
+		self.dropped = 0
+		self._queue: 'queue.Queue' = queue.Queue(maxsize=max_pending)
+		self._thread = threading.Thread(target=self._run, name='frame-dumper', daemon=True)
+		self._thread.start()
+
+	def submit(self, frames: List[dict], out_dir: str, meta: Optional[dict] = None) -> bool:
+		try:
+			self._queue.put_nowait((frames, out_dir, meta or {}))
+			return True
+		except queue.Full:
+			self.dropped += 1
+			return False
+
+	def join(self) -> None:
+		# Block until queued dumps are written (tests / shutdown)
+		self._queue.join()
+
+	def _run(self) -> None:
+		while True:
+			frames, out_dir, meta = self._queue.get()
+			try:
+				self._write(frames, out_dir, meta)
+			except Exception as e:
+				if self.logger:
+					self.logger(f"Frame dump failed: {e}")
+			finally:
+				self._queue.task_done()
+
+	def _write(self, frames: List[dict], out_dir: str, meta: dict) -> None:
+		os.makedirs(out_dir, exist_ok=True)
+		index = []
+		for entry in frames:
+			name = f"frame_{entry['seq']:06d}.jpg"
+			img = draw_overlay(entry['frame'], entry['notes'], entry['region'], entry['step'])
+			cv2.imwrite(os.path.join(out_dir, name), img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+			index.append({'file': name, 't': entry['t'], 'region': entry['region'], 'step': entry['step'],
+			              'notes': [{'label': l, 'box': b, 'score': s} for l, b, s in entry['notes']]})
+		with open(os.path.join(out_dir, 'frames.json'), 'w') as f:
+			json.dump(dict(meta, frames=index), f, indent=1)
+		if self.logger:
+			self.logger(f"Wrote {len(frames)} frame(s) to {out_dir}")
@@ -0,0 +1,378 @@
+import os
+import threading
+import time
+import uuid
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import capture
+import cv_utils
+
+# One grab per region per tick, published to every consumer through shared
+# memory. Each region gets a block laid out as
+#   header  int64[4]          latest seq, height, width, slots
+#   slot_seq int64[slots]     seq held by the slot, -1 while being written
+#   slot_shape int64[slots*2] (height, width) of the frame in the slot
+#   slot_t  float64[slots*2]  (capture-clock time, time.monotonic() at publish)
+#   frames  uint8[slots, h, w, 3]
+# A frame smaller than the block (the monitor's resolution dropped) fills only
+# the top-left of its slot; readers crop to the slot's shape so pixels left
+# from a bigger frame never show. Readers get zero-copy views into a slot and
+# call valid(seq) afterwards to learn whether the writer lapped them while
+# they worked (a torn read).
+
+MAX_CONSUMERS = 16
+# Per-consumer row in the stats block: used, last seq, reads, dropped, torn,
+# latency sum (us), latency max (us)
+_STAT_COLS = 7
+_HEADER = 4
+
+
+def _layout(slots: int, height: int, width: int) -> Tuple[int, int, int, int]:
+	seq_off = _HEADER * 8
+	shape_off = seq_off + slots * 8
+	t_off = shape_off + slots * 16
+	frames_off = t_off + slots * 16
+	# Keep frame rows 64-byte aligned for the copy
+	frames_off += (-frames_off) % 64
+	return seq_off, shape_off, t_off, frames_off, frames_off + slots * height * width * 3
+
+
+class _RegionBlock:
+	"""Views over one region's shared block (owner or attached)"""
+
+	def __init__(self, shm: shared_memory.SharedMemory, slots: int, height: int, width: int):
+		self.shm = shm
+		seq_off, shape_off, t_off, frames_off, _ = _layout(slots, height, width)
+		buf = shm.buf
+		self.header = np.ndarray((_HEADER,), dtype=np.int64, buffer=buf)
+		self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=seq_off)
+		self.slot_shape = np.ndarray((slots, 2), dtype=np.int64, buffer=buf, offset=shape_off)
+		self.slot_t = np.ndarray((slots, 2), dtype=np.float64, buffer=buf, offset=t_off)
+		self.frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=buf, offset=frames_off)
+		self.slots = slots
+
+	def frame(self, slot: int) -> np.ndarray:
+		# The slot's frame, cropped to the size it was published at
+		h, w = (int(v) for v in self.slot_shape[slot])
+		return self.frames[slot, :h, :w]
+
+	@classmethod
+	def attach(cls, name: str) -> '_RegionBlock':
+		shm = shared_memory.SharedMemory(name=name)
+		header = np.ndarray((_HEADER,), dtype=np.int64, buffer=shm.buf)
+		_, height, width, slots = (int(v) for v in header)
+		del header
+		return cls(shm, slots, height, width)
+
+	def release(self) -> None:
+		# Views must go before the mapping can close
+		self.header = self.slot_seq = self.slot_shape = self.slot_t = self.frames = None
+		self.shm.close()
+
+
+class FrameSubscriber:
+	"""A consumer's handle on the published regions; picklable for worker processes.
+
+	latest(region) returns (seq, t, frame view) for the newest frame, next(region)
+	waits for one newer than the last read. Gaps in seq count as dropped frames,
+	valid() == False after processing counts as a torn read; both, plus
+	publish-to-read latency, are recorded in the service's stats block.
+	"""
+
+	def __init__(self, spec: dict):
+		self.spec = spec
+		self.name = spec['consumer']
+		self.row = spec['row']
+		self._blocks: Dict[str, _RegionBlock] = {}
+		self._stats_shm: Optional[shared_memory.SharedMemory] = None
+		self._stats: Optional[np.ndarray] = None
+		self._last: Dict[str, int] = {}
+
+	def __getstate__(self):
+		return {'spec': self.spec}
+
+	def __setstate__(self, state):
+		self.__init__(state['spec'])
+
+	def _block(self, region: str) -> _RegionBlock:
+		block = self._blocks.get(region)
+		if block is None:
+			block = _RegionBlock.attach(self.spec['regions'][region])
+			self._blocks[region] = block
+		return block
+
+	def _stat_row(self) -> np.ndarray:
+		if self._stats is None:
+			self._stats_shm = shared_memory.SharedMemory(name=self.spec['stats'])
+			self._stats = np.ndarray((MAX_CONSUMERS, _STAT_COLS), dtype=np.int64, buffer=self._stats_shm.buf)
+		return self._stats[self.row]
+
+	def regions(self) -> List[str]:
+		return list(self.spec['regions'])
+
+	def latest(self, region: str) -> Optional[Tuple[int, float, np.ndarray]]:
+		block = self._block(region)
+		seq = int(block.header[0])
+		if seq < 0:
+			return None
+		slot = seq % block.slots
+		t, published = block.slot_t[slot]
+		view = block.frame(slot)
+		if int(block.slot_seq[slot]) != seq:
+			# Lapped between reading the header and the slot
+			return None
+		stats = self._stat_row()
+		last = self._last.get(region)
+		if last is not None and seq > last + 1:
+			stats[3] += seq - last - 1
+		if last is None or seq != last:
+			stats[2] += 1
+			latency_us = int((time.monotonic() - published) * 1e6)
+			stats[5] += latency_us
+			stats[6] = max(stats[6], latency_us)
+		self._last[region] = seq
+		stats[1] = seq
+		return seq, float(t), view
+
+	def next(self, region: str, timeout: float = 1.0, poll: float = 0.002) -> Optional[Tuple[int, float, np.ndarray]]:
+		end = time.monotonic() + timeout
+		last = self._last.get(region, -1)
+		block = self._block(region)
+		while int(block.header[0]) <= last:
+			if time.monotonic() >= end:
+				return None
+			time.sleep(poll)
+		return self.latest(region)
+
+	def get(self, region: str, seq: int) -> Optional[np.ndarray]:
+		# View of a specific frame, or None once the writer has reused its slot
+		block = self._block(region)
+		slot = seq % block.slots
+		view = block.frame(slot)
+		return view if int(block.slot_seq[slot]) == seq else None
+
+	def valid(self, region: str, seq: int) -> bool:
+		# True when the slot still holds seq, i.e. the view read was not overwritten
+		block = self._block(region)
+		ok = int(block.slot_seq[seq % block.slots]) == seq
+		if not ok:
+			self._stat_row()[4] += 1
+		return ok
+
+	def close(self) -> None:
+		for block in self._blocks.values():
+			block.release()
+		self._blocks.clear()
+		if self._stats_shm is not None:
+			self._stats = None
+			self._stats_shm.close()
+			self._stats_shm = None
+
+
+class CaptureService:
+	"""Grab each configured region once per tick and publish it to all consumers.
+
+	regions maps a name to an (x, y, w, h) region of the selected monitor, or
+	None for the whole monitor. Frames come from cv_utils.capture_backend()
+	unless a backend is given, so replay/synthetic sources work the same way.
+	"""
+
+	def __init__(self, regions: Dict[str, Optional[Tuple[int, int, int, int]]], fps: float = 10.0, slots: int = 4, backend=None,
+				 logger: Optional[Callable[[str], None]] = None):
+		self.regions = dict(regions)
+		self.logger = logger or print
+		self.interval = 1.0 / fps
+		self.slots = max(2, int(slots))
+		self.backend = backend
+		self.prefix = f"bet_{uuid.uuid4().hex[:8]}"
+		self._blocks: Dict[str, _RegionBlock] = {}
+		self._names: Dict[str, str] = {}
+		self._consumers: Dict[int, str] = {}
+		self._stats_shm: Optional[shared_memory.SharedMemory] = None
+		self._stats: Optional[np.ndarray] = None
+		self._seq = 0
+		self._thread: Optional[threading.Thread] = None
+		self._stop = threading.Event()
+		self._lock = threading.Lock()
+		self.ticks = 0
+		self.grab_ms = 0.0
+
+	def _backend(self):
+		return self.backend if self.backend is not None else cv_utils.capture_backend()
+
+	def _allocate(self) -> None:
+		backend = self._backend()
+		for name, region in self.regions.items():
+			if region is None:
+				height, width = backend.grab().shape[:2]
+			else:
+				width, height = int(region[2]), int(region[3])
+			size = _layout(self.slots, height, width)[-1]
+			shm = shared_memory.SharedMemory(create=True, size=size, name=f"{self.prefix}_{name}")
+			block = _RegionBlock(shm, self.slots, height, width)
+			block.header[:] = (-1, height, width, self.slots)
+			block.slot_seq[:] = -1
+			block.slot_shape[:] = (height, width)
+			self._blocks[name] = block
+			self._names[name] = shm.name
+		self._stats_shm = shared_memory.SharedMemory(create=True, size=MAX_CONSUMERS * _STAT_COLS * 8, name=f"{self.prefix}_stats")
+		self._stats = np.ndarray((MAX_CONSUMERS, _STAT_COLS), dtype=np.int64, buffer=self._stats_shm.buf)
+		self._stats[:] = 0
+
+	def start(self) -> 'CaptureService':
+		if self._thread is None:
+			self._allocate()
+			self._stop.clear()
+			self._thread = threading.Thread(target=self._run, name='capture-service', daemon=True)
+			self._thread.start()
+		return self
+
+	def subscribe(self, consumer: str) -> FrameSubscriber:
+		if self._stats is None:
+			raise RuntimeError("CaptureService not started")
+		with self._lock:
+			free = [row for row in range(MAX_CONSUMERS) if row not in self._consumers]
+			if not free:
+				raise RuntimeError(f"Too many capture consumers (max {MAX_CONSUMERS})")
+			row = free[0]
+			self._consumers[row] = consumer
+			self._stats[row] = 0
+			self._stats[row, 0] = 1
+		return FrameSubscriber({'consumer': consumer, 'row': row, 'regions': dict(self._names), 'stats': self._stats_shm.name})
+
+	def unsubscribe(self, subscriber: FrameSubscriber) -> None:
+		with self._lock:
+			self._consumers.pop(subscriber.row, None)
+			self._stats[subscriber.row, 0] = 0
+		subscriber.close()
+
+	def publish_once(self) -> int:
+		"""Grab every region once and publish it; returns the new seq"""
+		backend = self._backend()
+		seq = self._seq
+		t0 = time.perf_counter()
+		for name, region in self.regions.items():
+			block = self._blocks[name]
+			frame = backend.grab(region)
+			if frame is None:
+				raise ValueError(f"region {name} {region} is outside the captured frame")
+			slot = seq % self.slots
+			block.slot_seq[slot] = -1
+			h = min(frame.shape[0], block.frames.shape[1])
+			w = min(frame.shape[1], block.frames.shape[2])
+			np.copyto(block.frames[slot, :h, :w], frame[:h, :w, :3])
+			block.slot_shape[slot] = (h, w)
+			block.slot_t[slot] = (backend.now(), time.monotonic())
+			block.slot_seq[slot] = seq
+			block.header[0] = seq
+		self.grab_ms += (time.perf_counter() - t0) * 1000.0
+		self.ticks += 1
+		self._seq += 1
+		return seq
+
+	def _run(self) -> None:
+		backend = self._backend()
+		next_tick = backend.now()
+		while not self._stop.is_set():
+			try:
+				self.publish_once()
+			except Exception as e:
+				self.logger(f"Capture service grab failed: {e}")
+			next_tick += self.interval
+			delay = next_tick - backend.now()
+			if delay > 0:
+				backend.sleep(delay)
+			else:
+				# Fell behind: skip missed ticks rather than bursting to catch up
+				next_tick = backend.now()
+
+	def stats(self) -> Dict[str, dict]:
+		"""Per consumer: frames read, dropped (never seen), torn reads, latency ms"""
+		out = {}
+		with self._lock:
+			for row, consumer in self._consumers.items():
+				_, last, reads, dropped, torn, lat_sum, lat_max = (int(v) for v in self._stats[row])
+				out[consumer] = {
+					'last_seq': last,
+					'reads': reads,
+					'dropped': dropped,
+					'torn': torn,
+					'latency_ms_avg': round(lat_sum / reads / 1000.0, 3) if reads else None,
+					'latency_ms_max': round(lat_max / 1000.0, 3),
+				}
+		return out
+
+	def stop(self) -> None:
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout=2.0)
+			self._thread = None
+		for block in self._blocks.values():
+			shm = block.shm
+			block.release()
+			shm.unlink()
+		self._blocks.clear()
+		if self._stats_shm is not None:
+			self._stats = None
+			self._stats_shm.close()
+			self._stats_shm.unlink()
+			self._stats_shm = None
+
+
+class ServiceBackend(capture.CaptureBackend):
+	"""CaptureBackend over a subscriber, so screenshot()/wait_for_any share the service's grabs.
+
+	grab(None) returns a copy of the newest full frame of `region_name`; a
+	region is cropped from it. Copies keep legacy callers safe when they hold
+	a frame longer than the service's slot ring.
+	"""
+
+	name = 'service'
+
+	def __init__(self, subscriber: FrameSubscriber, region_name: str = 'full'):
+		self.subscriber = subscriber
+		self.region_name = region_name
+
+	def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+		for _ in range(3):
+			res = self.subscriber.latest(self.region_name) or self.subscriber.next(self.region_name)
+			if res is None:
+				break
+			seq, _, view = res
+			if region is not None:
+				clipped = cv_utils.clip_region(region, view.shape)
+				if clipped is None:
+					return None
+				x, y, w, h = clipped
+				view = view[y:y + h, x:x + w]
+			frame = view.copy()
+			if self.subscriber.valid(self.region_name, seq):
+				return frame
+		raise RuntimeError("Capture service published no frame")
+
+	def close(self) -> None:
+		self.subscriber.close()
+
+
+_served: Optional[CaptureService] = None
+_served_lock = threading.Lock()
+
+
+def serve_screenshots(fps: float = 10.0, logger: Optional[Callable[[str], None]] = None) -> CaptureService:
+	"""Route cv_utils.screenshot() in this process through one full-monitor service.
+
+	The service grabs from its own backend (BET_CAPTURE), and the previous
+	process-wide backend is closed. Later calls return the running service,
+	so several tables in one process share it.
+	"""
+	global _served
+	with _served_lock:
+		if _served is None:
+			backend = capture.backend_from_spec(os.environ.get('BET_CAPTURE'))
+			svc = CaptureService({'full': None}, fps, backend=backend, logger=logger).start()
+			cv_utils.set_capture_backend(ServiceBackend(svc.subscribe('app')))
+			_served = svc
+		return _served
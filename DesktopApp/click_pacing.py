@@ -0,0 +1,130 @@
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import cv_utils
+from bet_verify import RegionWatch
+from clicker import click_center, move_to
+
+# Click pacing from what the table shows instead of fixed sleeps. The cursor
+# is moved onto the click point first and a tiny region around it captured
+# once any hover highlight has settled; after the click, the region is polled
+# until it changes (the chip is selected, a stack appears on the area) and
+# the next click goes as soon as it does. Hover alone never counts. How long the table
+# takes to acknowledge is learned per table, and a click that shows nothing
+# waits the learned timeout before the sequence moves on.
+
+
+class LatencyModel:
+	"""Smoothed acknowledgement latency and its deviation (the TCP retransmit-timer estimator).
+
+	The timeout is latency + 4 deviations, kept within [min_ms, max_ms]. Until
+	the first acknowledgement it is initial_ms, the old fixed pacing. A timeout
+	on a click that is normally acknowledged means the table is lagging, and
+	backoff() raises the estimate by half at a time until acknowledgements
+	arrive inside it again.
+	"""
+
+	def __init__(self, initial_ms: float = 200.0, min_ms: float = 30.0, max_ms: float = 600.0,
+				 alpha: float = 0.125, beta: float = 0.25):
+		self.initial_ms = initial_ms
+		self.min_ms = min_ms
+		self.max_ms = max_ms
+		self.alpha = alpha
+		self.beta = beta
+		self.latency_ms: Optional[float] = None
+		self.deviation_ms = 0.0
+		self.samples = 0
+		self.backoffs = 0
+
+	def observe(self, ms: float) -> None:
+		if self.latency_ms is None:
+			self.latency_ms, self.deviation_ms = ms, ms / 2
+		else:
+			self.deviation_ms = (1 - self.beta) * self.deviation_ms + self.beta * abs(self.latency_ms - ms)
+			self.latency_ms = (1 - self.alpha) * self.latency_ms + self.alpha * ms
+		self.samples += 1
+
+	def backoff(self) -> None:
+		self.latency_ms = min(self.max_ms, max(self.latency_ms or 0.0, self.timeout_ms()) * 1.5)
+		self.backoffs += 1
+
+	def timeout_ms(self) -> float:
+		if self.latency_ms is None:
+			return self.initial_ms
+		return min(self.max_ms, max(self.min_ms, self.latency_ms + 4 * self.deviation_ms))
+
+
+class ClickPacer:
+	"""Clicks and waits for the table to acknowledge; one per table"""
+
+	def __init__(self, model: Optional[LatencyModel] = None, roi_size: Tuple[int, int] = (64, 64), pixel_delta: int = 30,
+				 min_changed: float = 0.02, poll_ms: int = 5, move_delay_ms: int = 100, settle_ms: int = 60,
+				 logger: Optional[Callable[[str], None]] = None):
+		self.model = model or LatencyModel()
+		# Not recorded into the frame ring: the polls would push the evidence frames out
+		self.watch = RegionWatch(roi_size, pixel_delta, min_changed, int(self.model.initial_ms), poll_ms, record=False)
+		self.move_delay_ms = move_delay_ms
+		self.logger = logger or print
+		# Longest wait for a hover animation to finish before the 'before' capture
+		self.settle_ms = settle_ms
+		self._lock = threading.Lock()
+		# (x, y, repeat) of clicks whose region has shown a click before. Some
+		# never do, e.g. a second click on the same area may not redraw around
+		# the point; their timeouts say nothing about lag.
+		self._acking: Set[Tuple[int, int, bool]] = set()
+		self._last_point: Optional[Tuple[int, int]] = None
+		self.acked = 0
+		# Acknowledged clicks per (x, y) point; tells a caller which of its clicks showed
+		self.acks: Dict[Tuple[int, int], int] = {}
+		self.timeouts = 0
+		self.unwatched = 0
+
+	def click(self, box: Tuple[int, int, int, int], pause: float = 0.0) -> None:
+		"""Click `box` and return once the click shows on screen, and no sooner than `pause` seconds after it"""
+		with self._lock:
+			key = (box[0], box[1], (box[0], box[1]) == self._last_point)
+			self._last_point = (box[0], box[1])
+			# Hover first: what the cursor alone changes must be in the 'before' image
+			move_to(box, self.move_delay_ms)
+			try:
+				armed = self.watch.arm(box, self.settle_ms)
+			except Exception as e:
+				self.logger(f"Click pacing: cannot capture around {box[:2]}: {e}")
+				armed = False
+			click_center(box, move_delay_ms=0, post_click_ms=0)
+			clicked_at = cv_utils.capture_backend().now()
+			timeout = self.model.timeout_ms()
+			acked = None
+			if armed:
+				try:
+					acked = self.watch.confirm(timeout)
+				except Exception as e:
+					self.logger(f"Click pacing: capture failed: {e}")
+			if acked is None:
+				# Nothing to watch: fall back to waiting the learned timeout
+				self.unwatched += 1
+				cv_utils.pause(timeout / 1000.0)
+			elif acked:
+				self.acked += 1
+				self.acks[(box[0], box[1])] = self.acks.get((box[0], box[1]), 0) + 1
+				self._acking.add(key)
+				self.model.observe(self.watch.last_ms)
+			else:
+				self.timeouts += 1
+				if key in self._acking:
+					self.model.backoff()
+			# The caller's pause is a floor: some steps need the table to settle, not just to acknowledge
+			left = pause - (cv_utils.capture_backend().now() - clicked_at)
+			if left > 0:
+				cv_utils.pause(left)
+
+	def stats(self) -> Dict[str, object]:
+		latency = self.model.latency_ms
+		return {
+			'latency_ms': None if latency is None else round(latency, 1),
+			'timeout_ms': round(self.model.timeout_ms(), 1),
+			'acked': self.acked,
+			'timeouts': self.timeouts,
+			'backoffs': self.model.backoffs,
+			'unwatched': self.unwatched,
+		}
@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Mouse input and monitor lookup without the vision stack: importing this
+# module loads neither cv2, numpy nor mss. pyautogui is loaded on the first
+# click and mss on the first monitor lookup.
+
+# (x, y, w, h) click box and the pause after the click, in seconds
+Click = Tuple[Tuple[int, int, int, int], float]
+# Performs one click and its wait in place of click + sleep(pause), e.g. click_pacing.ClickPacer.click
+ClickStep = Callable[[Tuple[int, int, int, int], float], None]
+# Queue waits kept per owner for stats(); older ones are dropped
+WAIT_SAMPLES = 1000
+
+_pyautogui = None
+_monitors: Optional[List[dict]] = None
+
+
+def _input():
+	# pyautogui needs a display at import time; load it on the first click so
+	# headless tools (benchmarks, replay) can import this module.
+	global _pyautogui
+	if _pyautogui is None:
+		import pyautogui
+		pyautogui.FAILSAFE = False
+		_pyautogui = pyautogui
+	return _pyautogui
+
+
+def monitors(refresh: bool = False) -> List[dict]:
+	# mss monitor list, probed once and again on refresh (entry 0 is the
+	# virtual "all monitors" box)
+	global _monitors
+	if _monitors is None or refresh:
+		import mss
+		with mss.mss() as sct:
+			_monitors = [dict(m) for m in sct.monitors]
+	return _monitors
+
+
+def get_monitor_for_coordinates(x: int, y: int) -> dict:
+	"""Get the monitor that contains the given coordinates"""
+	monitor = _find_monitor(monitors(), x, y)
+	if monitor is None:
+		# A monitor may have been plugged in or rearranged since the last probe
+		monitor = _find_monitor(monitors(refresh=True), x, y)
+	if monitor is not None:
+		return monitor
+	# Default to primary monitor if not found
+	mons = monitors()
+	return mons[1] if len(mons) > 1 else mons[0]
+
+
+def _find_monitor(mons: List[dict], x: int, y: int) -> Optional[dict]:
+	for i, monitor in enumerate(mons):
+		if i == 0:  # Skip the "all monitors" entry
+			continue
+		left = monitor['left']
+		top = monitor['top']
+		width = monitor['width']
+		height = monitor['height']
+
+		if (left <= x < left + width and top <= y < top + height):
+			return monitor
+	return None
+
+
+def warm_input() -> Tuple[int, int]:
+	# Dry run of the input backend: load it and move the cursor onto itself
+	gui = _input()
+	x, y = gui.position()
+	gui.moveTo(x, y, duration=0)
+	return x, y
+
+
+def move_to(box: Tuple[int, int, int, int], move_delay_ms: int = 100) -> None:
+	# Put the cursor on the click point without clicking (hover effects show now)
+	_input().moveTo(box[0], box[1], duration=move_delay_ms / 1000.0)
+
+
+def click_center(box: Tuple[int, int, int, int], move_delay_ms: int = 100, post_click_ms: int = 150) -> None:
+	x, y, w, h = box
+
+	# Get the monitor that contains these coordinates
+	target_monitor = get_monitor_for_coordinates(x, y)
+
+	# Click at the exact position (x, y) without adding width/height offsets
+	# since the stored coordinates are the exact click positions
+	cx, cy = x, y
+
+	print(f"Clicking at exact position ({cx}, {cy}) on monitor: {target_monitor['left']},{target_monitor['top']} {target_monitor['width']}x{target_monitor['height']}")
+
+	gui = _input()
+	gui.moveTo(cx, cy, duration=move_delay_ms / 1000.0)
+	gui.click()
+	time.sleep(post_click_ms / 1000.0)
+
+
+class MouseScheduler:
+	"""Runs click sequences from several tables on the one physical mouse.
+
+	Each submitted sequence runs whole, never interleaved with another table's
+	clicks. While the mouse is busy, further sequences queue up. The next
+	sequence is the oldest one from the table that clicked last, so bursts
+	for one table do not bounce the cursor between windows, unless another
+	table has waited longer than max_wait_ms. Switching tables adds
+	switch_ms for the other window to take focus.
+	"""
+
+	def __init__(self, max_wait_ms: int = 150, switch_ms: int = 30, click=None):
+		self.max_wait = max_wait_ms / 1000.0
+		self.switch = switch_ms / 1000.0
+		self._click = click or click_center
+		self._queue: List[Tuple[float, Optional[str], List[Click], Optional[ClickStep], Future]] = []
+		self._cond = threading.Condition()
+		self._closed = False
+		self._owner: Optional[str] = None
+		self._thread: Optional[threading.Thread] = None
+		self.switches = 0
+		self.waits: Dict[Optional[str], Deque[float]] = {}
+
+	def start(self) -> 'MouseScheduler':
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._run, name='mouse', daemon=True)
+			self._thread.start()
+		return self
+
+	def submit(self, clicks: List[Click], owner: Optional[str] = None, step: Optional[ClickStep] = None) -> Future:
+		# step: the owner's own click-and-wait (its pacing); default is click + sleep(pause)
+		future: Future = Future()
+		with self._cond:
+			if self._closed:
+				raise RuntimeError('mouse scheduler is closed')
+			self._queue.append((time.monotonic(), owner, list(clicks), step, future))
+			self._cond.notify()
+		return future
+
+	def run(self, clicks: List[Click], owner: Optional[str] = None, timeout: Optional[float] = None,
+			step: Optional[ClickStep] = None) -> None:
+		self.submit(clicks, owner, step).result(timeout)
+
+	def _next(self) -> Tuple[float, Optional[str], List[Click], Optional[ClickStep], Future]:
+		oldest = self._queue[0]
+		if time.monotonic() - oldest[0] < self.max_wait:
+			for i, job in enumerate(self._queue):
+				if job[1] == self._owner:
+					return self._queue.pop(i)
+		return self._queue.pop(0)
+
+	def _run(self) -> None:
+		while True:
+			with self._cond:
+				while not self._queue and not self._closed:
+					self._cond.wait()
+				if not self._queue:
+					return
+				queued_at, owner, clicks, step, future = self._next()
+			if not future.set_running_or_notify_cancel():
+				continue
+			waited = time.monotonic() - queued_at
+			self.waits.setdefault(owner, deque(maxlen=WAIT_SAMPLES)).append(waited)
+			try:
+				if owner != self._owner and self._owner is not None:
+					self.switches += 1
+					time.sleep(self.switch)
+				self._owner = owner
+				for box, pause in clicks:
+					if step is not None:
+						step(box, pause)
+						continue
+					self._click(box)
+					if pause:
+						time.sleep(pause)
+			except Exception as e:
+				future.set_exception(e)
+			else:
+				future.set_result(None)
+
+	def stats(self) -> Dict[str, object]:
+		per_owner = {}
+		for owner, waits in self.waits.items():
+			ordered = sorted(waits)
+			per_owner[owner] = {'sequences': len(ordered), 'wait_p50_ms': ordered[len(ordered) // 2] * 1000.0, 'wait_max_ms': ordered[-1] * 1000.0}
+		return {'switches': self.switches, 'queued': len(self._queue), 'owners': per_owner}
+
+	def close(self) -> None:
+		# Sequences already queued still run
+		with self._cond:
+			self._closed = True
+			self._cond.notify_all()
+		if self._thread is not None:
+			self._thread.join(timeout=10)
+			self._thread = None
@@ -0,0 +1,301 @@
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Persistence for macro_config.json: atomic writes (temp file + os.replace),
+# debounced saves, a schema version with migrations and the last K configs
+# kept next to the file for rollback. ConfigWatcher picks up edits made to
+# the file by anything else (an editor, a deploy script).
+
+SCHEMA_VERSION = 4
+
+
+def _migrate_v1(data: dict) -> dict:
+    # v1 files have no version field. Duplicate chip amounts could be saved
+    # from the editor; lookups always used the first one, so keep that.
+    chips, seen = [], set()
+    for chip in data.get('chips', []):
+        if chip.get('amount') not in seen:
+            seen.add(chip.get('amount'))
+            chips.append(chip)
+    return {'positions': data.get('positions', {}), 'chips': chips}
+
+
+def _migrate_v2(data: dict) -> dict:
+    # v3 adds the game window the positions were recorded in (window_frame.py);
+    # older configs stay absolute until a window is configured
+    return dict(data, window=None)
+
+
+def _migrate_v3(data: dict) -> dict:
+    # v4 positions may carry the layout-detection 'score'; nothing to convert,
+    # the bump only keeps older apps from loading a field they do not know
+    return data
+
+
+# version -> function upgrading a config of that version by one step
+MIGRATIONS: Dict[int, Callable[[dict], dict]] = {
+    1: _migrate_v1,
+    2: _migrate_v2,
+    3: _migrate_v3,
+}
+
+
+def migrate(data: dict) -> dict:
+    """Upgrade a loaded config to SCHEMA_VERSION"""
+    version = int(data.get('version', 1))
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"config version {version} is newer than this app supports ({SCHEMA_VERSION})")
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data)
+        version += 1
+    data['version'] = SCHEMA_VERSION
+    return data
+
+
+# Keys a config and its window may have; positions and chips are checked by
+# building them (ConfigStore's parse)
+CONFIG_KEYS = ('version', 'positions', 'chips', 'window')
+WINDOW_KEYS = ('title', 'anchor', 'rect')
+
+
+def _position_ok(pos) -> bool:
+    return (isinstance(pos, dict) and all(isinstance(pos.get(k), int) for k in ('x', 'y', 'width', 'height'))
+            and isinstance(pos.get('name'), str))
+
+
+def validate(data: dict) -> List[str]:
+    """Problems that make a config unusable; empty when it is fine"""
+    errors = []
+    unknown = sorted(set(data) - set(CONFIG_KEYS))
+    if unknown:
+        errors.append(f"unknown keys: {', '.join(unknown)}")
+    if not isinstance(data.get('positions', {}), dict) or not isinstance(data.get('chips', []), list):
+        return errors + ['positions must be an object and chips a list']
+    needs = 'needs integer x, y, width, height and a name'
+    for name, pos in data.get('positions', {}).items():
+        if not _position_ok(pos):
+            errors.append(f"position {name}: {needs}")
+    amounts = set()
+    for i, chip in enumerate(data.get('chips', [])):
+        amount = chip.get('amount') if isinstance(chip, dict) else None
+        if not isinstance(amount, int) or amount <= 0:
+            errors.append(f"chip #{i}: amount must be a positive integer")
+            continue
+        if amount in amounts:
+            errors.append(f"chip {amount}: listed more than once")
+        amounts.add(amount)
+        if not _position_ok(chip.get('position')):
+            errors.append(f"chip {amount}: {needs}")
+    window = data.get('window')
+    if window is not None:
+        rect = window.get('rect') if isinstance(window, dict) else None
+        if not isinstance(window, dict):
+            errors.append('window must be an object or null')
+        elif set(window) - set(WINDOW_KEYS):
+            errors.append(f"unknown window keys: {', '.join(sorted(set(window) - set(WINDOW_KEYS)))}")
+        elif rect is not None and not (isinstance(rect, list) and len(rect) == 4 and all(isinstance(v, int) for v in rect)
+                                       and rect[2] > 0 and rect[3] > 0):
+            errors.append('window.rect must be [left, top, width, height] with a positive size')
+    return errors
+
+
+class ConfigStore:
+    """parse builds the app's objects from a config and raises if it cannot; a
+    file (or backup) is only accepted once it has been validated and parsed"""
+
+    def __init__(self, path: str, debounce_s: float = 0.5, keep: int = 5, logger: Optional[Callable[[str], None]] = None,
+                 parse: Optional[Callable[[dict], object]] = None):
+        self.path = path
+        self.parse = parse
+        self.debounce_s = debounce_s
+        self.keep = keep
+        self.logger = logger or print
+        self.history_dir = path + '.history'
+        self._lock = threading.Lock()
+        self._pending: Optional[dict] = None
+        self._timer: Optional[threading.Timer] = None
+        self.writes = 0
+        self.coalesced = 0
+        # (mtime_ns, size) of the file as we last wrote it, so the watcher skips our own saves
+        self.own_signature: Optional[Tuple[int, int]] = None
+        # A debounced save must not be lost when the app exits
+        atexit.register(self.flush)
+
+    def log(self, msg: str) -> None:
+        self.logger(msg)
+
+    def signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def read(self) -> dict:
+        """Read, migrate and validate the file as it is now; raises instead of falling back"""
+        return self._read(self.path)
+
+    def _read(self, path: str) -> dict:
+        with open(path, 'r') as f:
+            data = migrate(json.load(f))
+        errors = validate(data)
+        if errors:
+            raise ValueError('; '.join(errors))
+        if self.parse is not None:
+            try:
+                self.parse(data)
+            except (TypeError, ValueError, KeyError) as e:
+                raise ValueError(f"cannot build the config: {e}") from e
+        return data
+
+    def load(self) -> Optional[dict]:
+        """Read and migrate the config; falls back to the newest good backup. None if there is none."""
+        # A queued save is newer than what is on disk
+        self.flush()
+        if not os.path.exists(self.path):
+            return None
+        try:
+            return self._read(self.path)
+        except Exception as e:
+            self.log(f"Config {self.path} unreadable ({e}); trying backups")
+        for path in self.history():
+            try:
+                data = self._read(path)
+            except Exception:
+                continue
+            self.log(f"Restored config from {os.path.basename(path)}")
+            self.save(data, immediate=True)
+            return data
+        raise ValueError(f"no readable config in {self.path} or its backups")
+
+    def save(self, data: dict, immediate: bool = False) -> None:
+        """Queue a write; saves within debounce_s of each other become one write"""
+        data = dict(data, version=SCHEMA_VERSION)
+        with self._lock:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = data
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not immediate and self.debounce_s > 0:
+                self._timer = threading.Timer(self.debounce_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.flush()
+
+    def flush(self) -> bool:
+        """Write a pending save now; True if something was written"""
+        with self._lock:
+            data, self._pending = self._pending, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if data is None:
+                return False
+            try:
+                self._write(data)
+            except Exception as e:
+                self.log(f"Error saving config: {e}")
+                return False
+        return True
+
+    def _write(self, data: dict) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        # Keep the version being replaced; the file itself is only ever swapped whole
+        if os.path.exists(self.path):
+            os.makedirs(self.history_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            with open(self.path, 'rb') as src, open(os.path.join(self.history_dir, stamp + '.json'), 'wb') as dst:
+                dst.write(src.read())
+            for old in self.history()[self.keep:]:
+                os.remove(old)
+        os.replace(tmp, self.path)
+        self.own_signature = self.signature()
+        self.writes += 1
+        chips = data.get('chips', [])
+        self.log(f"Saved {len(data.get('positions', {}))} positions and {len(chips)} chips to {self.path}")
+
+    def history(self) -> List[str]:
+        """Backup files, newest first"""
+        if not os.path.isdir(self.history_dir):
+            return []
+        names = sorted((n for n in os.listdir(self.history_dir) if n.endswith('.json')), reverse=True)
+        return [os.path.join(self.history_dir, n) for n in names]
+
+    def rollback(self, steps: int = 1) -> dict:
+        """Make the config from `steps` saves ago current again and return it"""
+        self.flush()
+        backups = self.history()
+        if steps < 1 or steps > len(backups):
+            raise ValueError(f"only {len(backups)} backups kept")
+        data = self._read(backups[steps - 1])
+        self.save(data, immediate=True)
+        self.log(f"Rolled back to {os.path.basename(backups[steps - 1])}")
+        return data
+
+    def stats(self) -> dict:
+        return {'writes': self.writes, 'coalesced': self.coalesced, 'backups': len(self.history())}
+
+
+class ConfigWatcher:
+    """Polls the config file's mtime/size and hands validated external edits to on_change"""
+
+    def __init__(self, store: ConfigStore, on_change: Callable[[dict], None], interval: float = 1.0,
+                 logger: Optional[Callable[[str], None]] = None):
+        self.store = store
+        self.on_change = on_change
+        self.interval = interval
+        self.logger = logger or store.logger
+        self._seen = store.signature()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.rejected = 0
+
+    def start(self) -> 'ConfigWatcher':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='config-watch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger(f"Config watch error: {e}")
+
+    def poll(self) -> bool:
+        """One check; True if a new config was handed to on_change"""
+        sig = self.store.signature()
+        if sig is None or sig == self._seen:
+            return False
+        self._seen = sig
+        if sig == self.store.own_signature:
+            return False
+        try:
+            data = self.store.read()
+        except Exception as e:
+            # Keep running on the current config; a half-written file is retried once it changes again
+            self.rejected += 1
+            self.logger(f"Ignoring edited config {self.store.path}: {e}")
+            return False
+        self.on_change(data)
+        self.reloads += 1
+        return True
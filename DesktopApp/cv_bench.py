@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the cv_utils matchers. Runs headless (no display,
+no mss grab, no pyautogui).
+
+Usage:
+    python cv_bench.py corpus CORPUS_DIR [--json out.json] [--compare old.json]
+    python cv_bench.py fast [--frames 40] [--json out.json]
+    python cv_bench.py replay SOURCE [--poll-ms 100] [--speed 4] [--json out.json]
+
+`corpus` runs match_template, match_template_masked (with and without the
+prefilter cascade), match_template_multiscale_masked, match_template_fast,
+find_any and the PragmaticBaccarat lookups over saved frames with labelled
+boxes, and reports p50/p99 latency, hit rate and false positives per
+template. CORPUS_DIR holds the frames plus labels.json:
+
+    {"frames": {"0001.png": {"state": "betting_open",
+                             "boxes": [{"template": "assets/player_area.png",
+                                        "box": [x, y, w, h]}]}}}
+
+"state" is optional (wrong_tab / not_betting_time / betting_open) and is
+used to score classify_screen. --compare prints latency/hit-rate deltas
+against an earlier --json run.
+
+`fast` compares the grayscale/half-resolution path (match_template_fast)
+against the full-colour masked matcher for every bundled asset and reports
+the speedup, how often both paths agree, and how often each path is right
+against the pasted ground truth (half the frames hold the asset).
+
+`replay` plays a recorded session (a frame directory, optionally with
+frames.json timestamps, or a video) through capture.ReplayBackend and polls
+PragmaticBaccarat.classify_screen every --poll-ms of session time, the way
+the app would. Without --speed the session clock is virtual and the run is
+as fast as matching allows; the report gives the real-time factor, the
+state timeline and, when the directory has labels.json, state accuracy.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import cv_utils
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRAME_W = 1280
+FRAME_H = 720
+
+
+def bundled_assets() -> List[str]:
+    paths = [os.path.join('assets', n) for n in ('player_area.png', 'banker_area.png', 'cancel_button.png')]
+    paths += sorted(os.path.relpath(p, BASE_DIR) for p in glob.glob(os.path.join(BASE_DIR, 'assets', 'chips', '*.png')))
+    return paths
+
+
+def load_asset(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Template and the mask production code would use for it"""
+    bgr, alpha = cv_utils.load_image_with_alpha(path)
+    mask = alpha if alpha is not None else cv_utils.build_nonwhite_mask(bgr)
+    return bgr, mask
+
+
+def _background(rng: np.random.Generator) -> np.ndarray:
+    noise = rng.integers(0, 256, (FRAME_H // 8, FRAME_W // 8, 3), dtype=np.uint8)
+    bg = cv2.resize(noise, (FRAME_W, FRAME_H), interpolation=cv2.INTER_CUBIC)
+    ramp = np.linspace(-40, 40, FRAME_W, dtype=np.float32)[None, :, None]
+    return np.clip(bg.astype(np.float32) + ramp, 0, 255).astype(np.uint8)
+
+
+def _paste(frame: np.ndarray, tpl: np.ndarray, mask: np.ndarray, x: int, y: int, rng: np.random.Generator) -> np.ndarray:
+    h, w = tpl.shape[:2]
+    region = frame[y:y + h, x:x + w]
+    region[:] = np.where((mask > 0)[:, :, None], tpl, region)
+    noisy = np.clip(frame.astype(np.float32) + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+    ok, enc = cv2.imencode('.jpg', noisy, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return cv2.imdecode(enc, cv2.IMREAD_COLOR)
+
+
+def iou(a: Tuple, b: Tuple) -> float:
+    ax, ay, aw, ah = a[:4]
+    bx, by, bw, bh = b[:4]
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def load_corpus(corpus_dir: str) -> List[Tuple[str, np.ndarray, dict]]:
+    """(name, frame, label) for every labelled frame that can be read"""
+    with open(os.path.join(corpus_dir, 'labels.json'), 'r') as f:
+        labels = json.load(f)['frames']
+    frames = []
+    for name in sorted(labels):
+        img = cv2.imread(os.path.join(corpus_dir, name), cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"⚠️ Skipping unreadable frame {name}")
+            continue
+        frames.append((name, img, labels[name]))
+    return frames
+
+
+class Tally:
+    """Latency samples and hit/miss/false-positive counts for one matcher+template"""
+
+    def __init__(self):
+        self.ms: List[float] = []
+        self.hits = 0
+        self.misses = 0
+        self.false_pos = 0
+        self.negatives = 0
+
+    def add(self, ms: float, found: Optional[Tuple], truth: List[Tuple], min_iou: float) -> None:
+        self.ms.append(ms)
+        if truth:
+            if found is not None and any(iou(found, t) >= min_iou for t in truth):
+                self.hits += 1
+            else:
+                self.misses += 1
+                if found is not None:
+                    self.false_pos += 1
+        else:
+            self.negatives += 1
+            if found is not None:
+                self.false_pos += 1
+
+    def summary(self) -> dict:
+        positives = self.hits + self.misses
+        ms = np.array(self.ms) if self.ms else np.zeros(1)
+        return {
+            'runs': len(self.ms),
+            'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3),
+            'hit_rate': round(self.hits / positives, 3) if positives else None,
+            'false_positives': self.false_pos,
+            'negatives': self.negatives,
+        }
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    res = fn(*args)
+    return res, (time.perf_counter() - t0) * 1000.0
+
+
+def _pragmatic_config(keys: List[str]) -> dict:
+    tpl = {'chips': {}}
+    for key in keys:
+        base = os.path.splitext(os.path.basename(key))[0]
+        if key.startswith('assets/chips/') and base.isdigit():
+            tpl['chips'][base] = key
+        elif base in ('player_area', 'banker_area', 'cancel_button'):
+            tpl[base] = key
+    return {'templates': tpl}
+
+
+def bench_corpus(corpus_dir: str, threshold: float, scales: List[float], min_iou: float) -> dict:
+    frames = load_corpus(corpus_dir)
+    keys = sorted({b['template'] for _, _, lab in frames for b in lab.get('boxes', [])} | set(bundled_assets()))
+    entries = {}
+    for key in keys:
+        try:
+            tpl, mask = load_asset(key)
+        except Exception as e:
+            print(f"⚠️ Skipping template {key}: {e}")
+            continue
+        entries[key] = {
+            'tpl': tpl,
+            'mask': mask,
+            'prefilter': cv_utils.PrefilterCascade(tpl, mask),
+            'fast': cv_utils.fast_template(key, tpl, mask),
+            'pyramid': cv_utils.template_pyramid(key, tpl, mask, scales),
+        }
+    matchers = {
+        'match_template': lambda img, e: cv_utils.match_template(img, e['tpl'], threshold),
+        'match_template_masked': lambda img, e: cv_utils.match_template_masked(img, e['tpl'], e['mask'], threshold),
+        'masked+prefilter': lambda img, e: cv_utils.match_template_masked(img, e['tpl'], e['mask'], threshold, prefilter=e['prefilter']),
+        'multiscale_masked': lambda img, e: cv_utils.match_template_multiscale_masked(img, e['tpl'], e['mask'], scales, threshold, pyramid=e['pyramid']),
+        'match_template_fast': lambda img, e: cv_utils.match_template_fast(img, e['fast'], threshold),
+    }
+
+    from site_pragmatic import PragmaticBaccarat
+    cfg = _pragmatic_config(list(entries))
+    cfg['templates']['match_threshold'] = threshold
+    pragmatic = PragmaticBaccarat(cfg)
+    chip_keys = {path: int(val) for val, path in cfg['templates']['chips'].items()}
+    area_keys = {cfg['templates'].get('player_area'): 'Player', cfg['templates'].get('banker_area'): 'Banker'}
+
+    tallies: Dict[str, Dict[str, Tally]] = {}
+    def tally(matcher: str, key: str) -> Tally:
+        return tallies.setdefault(matcher, {}).setdefault(key, Tally())
+
+    state_total = state_ok = 0
+    names = list(entries)
+    templates = [entries[k]['tpl'] for k in names]
+    for name, img, lab in frames:
+        truth: Dict[str, List[Tuple]] = {}
+        for b in lab.get('boxes', []):
+            truth.setdefault(b['template'], []).append(tuple(b['box']))
+        for key, e in entries.items():
+            for matcher, fn in matchers.items():
+                found, ms = _timed(fn, img, e)
+                tally(matcher, key).add(ms, found, truth.get(key, []), min_iou)
+            if key in area_keys and area_keys[key] is not None:
+                found, ms = _timed(pragmatic.find_bet_area, area_keys[key], img)
+                tally('pragmatic.find_bet_area', key).add(ms, found, truth.get(key, []), min_iou)
+            elif key in chip_keys:
+                found, ms = _timed(pragmatic._find_chip, chip_keys[key], img)
+                tally('pragmatic.find_chip', key).add(ms, found, truth.get(key, []), min_iou)
+        # find_any answers "which template, where" for the whole frame
+        found, ms = _timed(cv_utils.find_any, img, templates, threshold)
+        all_truth = [t for ts in truth.values() for t in ts]
+        if found is not None and truth.get(names[found[5]]) is None:
+            found_box = (-1, -1, 0, 0)
+        else:
+            found_box = found
+        tally('find_any', '*').add(ms, found_box, all_truth, min_iou)
+        (state, _), ms = _timed(pragmatic.classify_screen, img)
+        t = tally('pragmatic.classify_screen', '*')
+        t.ms.append(ms)
+        if 'state' in lab:
+            state_total += 1
+            state_ok += state == lab['state']
+
+    report = {
+        'corpus': os.path.abspath(corpus_dir),
+        'frames': len(frames),
+        'threshold': threshold,
+        'scales': scales,
+        'results': {m: {k: t.summary() for k, t in by_key.items()} for m, by_key in tallies.items()},
+    }
+    report['results']['pragmatic.classify_screen']['*']['state_accuracy'] = round(state_ok / state_total, 3) if state_total else None
+    report['prefilter'] = {k: e['prefilter'].report() for k, e in entries.items()}
+    return report
+
+
+def _print_corpus(report: dict, baseline: Optional[dict] = None) -> None:
+    print(f"{report['frames']} frames from {report['corpus']}")
+    print(f"{'matcher':<28}{'template':<28}{'p50 ms':>9}{'p99 ms':>9}{'hit':>7}{'FP':>5}")
+    for matcher, by_key in report['results'].items():
+        for key, r in by_key.items():
+            hit = '-' if r['hit_rate'] is None else f"{r['hit_rate']:.2f}"
+            line = f"{matcher:<28}{os.path.relpath(key, 'assets') if key != '*' else '*':<28}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{hit:>7}{r['false_positives']:>5}"
+            old = (baseline or {}).get('results', {}).get(matcher, {}).get(key)
+            if old:
+                line += f"   Δp50 {r['p50_ms'] - old['p50_ms']:+.2f} ms"
+                if r['hit_rate'] is not None and old.get('hit_rate') is not None:
+                    line += f"  Δhit {r['hit_rate'] - old['hit_rate']:+.2f}"
+            print(line)
+    acc = report['results']['pragmatic.classify_screen']['*'].get('state_accuracy')
+    if acc is not None:
+        print(f"classify_screen state accuracy: {acc:.2f}")
+
+
+def _same(a: Optional[Tuple], b: Optional[Tuple], tol: int = 2) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return abs(a[0] - b[0]) <= tol and abs(a[1] - b[1]) <= tol
+
+
+def bench_fast(frames: int, threshold: float, band: float, seed: int) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for path in bundled_assets():
+        tpl, mask = load_asset(path)
+        name = os.path.relpath(path, 'assets')
+        if tpl.shape[0] > FRAME_H or tpl.shape[1] > FRAME_W:
+            results[name] = {'skipped': f"template {tpl.shape[1]}x{tpl.shape[0]} larger than {FRAME_W}x{FRAME_H} frame"}
+            continue
+        rng = np.random.default_rng(seed)
+        fast = cv_utils.FastTemplate(tpl, mask)
+        full_s = fast_s = 0.0
+        agree = full_ok = fast_ok = 0
+        for i in range(frames):
+            frame = _background(rng)
+            truth = None
+            if i % 2 == 0:
+                x = int(rng.integers(0, FRAME_W - tpl.shape[1] + 1))
+                y = int(rng.integers(0, FRAME_H - tpl.shape[0] + 1))
+                frame = _paste(frame, tpl, mask, x, y, rng)
+                truth = (x, y)
+            t0 = time.perf_counter()
+            ref = cv_utils.match_template_masked(frame, tpl, mask, threshold)
+            t1 = time.perf_counter()
+            got = cv_utils.match_template_fast(frame, fast, threshold, band=band)
+            t2 = time.perf_counter()
+            full_s += t1 - t0
+            fast_s += t2 - t1
+            agree += _same(ref, got)
+            full_ok += _same(ref, truth)
+            fast_ok += _same(got, truth)
+        results[name] = {
+            'size': f"{tpl.shape[1]}x{tpl.shape[0]}",
+            'scale': fast.scale,
+            'full_ms': round(full_s * 1000 / frames, 2),
+            'fast_ms': round(fast_s * 1000 / frames, 2),
+            'speedup': round(full_s / fast_s, 1) if fast_s else None,
+            'agreement': round(agree / frames, 3),
+            'full_correct': round(full_ok / frames, 3),
+            'fast_correct': round(fast_ok / frames, 3),
+            'stats': dict(fast.stats),
+        }
+    return results
+
+
+def _print_fast(results: Dict[str, dict]) -> None:
+    print(f"{'asset':<22}{'size':>10}{'full ms':>10}{'fast ms':>10}{'speedup':>9}{'agree':>8}{'full ok':>9}{'fast ok':>9}{'escal.':>8}")
+    for name, r in results.items():
+        if 'skipped' in r:
+            print(f"{name:<22}  skipped: {r['skipped']}")
+            continue
+        print(f"{name:<22}{r['size']:>10}{r['full_ms']:>10}{r['fast_ms']:>10}{r['speedup']:>8}x{r['agreement']:>8}{r['full_correct']:>9}{r['fast_correct']:>9}{r['stats']['escalated']:>8}")
+
+
+def bench_replay(source: str, poll_ms: int, speed: Optional[float], threshold: float) -> dict:
+    import capture
+    from site_pragmatic import PragmaticBaccarat
+    backend = capture.ReplayBackend(source, speed=speed)
+    cv_utils.set_capture_backend(backend)
+    cfg = _pragmatic_config(bundled_assets())
+    cfg['templates']['match_threshold'] = threshold
+    pragmatic = PragmaticBaccarat(cfg, logger=lambda msg: None)
+    labels = {}
+    labels_path = os.path.join(source, 'labels.json')
+    if os.path.isdir(source) and os.path.exists(labels_path):
+        with open(labels_path, 'r') as f:
+            labels = json.load(f)['frames']
+
+    timeline: List[dict] = []
+    polls = correct = scored = 0
+    t0 = time.perf_counter()
+    while not backend.exhausted:
+        at = backend.now()
+        idx = backend._index_at(at)
+        state, _ = pragmatic.classify_screen(cv_utils.screenshot())
+        polls += 1
+        if not timeline or timeline[-1]['state'] != state:
+            timeline.append({'t': round(at, 3), 'state': state})
+        expected = labels.get(os.path.basename(backend.files[idx]), {}).get('state') if backend.files else None
+        if expected:
+            scored += 1
+            correct += expected == state
+        cv_utils.pause(poll_ms / 1000.0)
+    wall = time.perf_counter() - t0
+    session = backend.duration()
+    return {
+        'source': source,
+        'frames': len(backend.times),
+        'polls': polls,
+        'session_s': round(session, 3),
+        'wall_s': round(wall, 3),
+        'realtime_factor': round(session / wall, 2) if wall else None,
+        'state_accuracy': round(correct / scored, 3) if scored else None,
+        'timeline': timeline,
+    }
+
+
+def _print_replay(results: dict) -> None:
+    print(f"{results['frames']} frames, {results['polls']} polls: {results['session_s']}s of session in {results['wall_s']}s ({results['realtime_factor']}x real time)")
+    if results['state_accuracy'] is not None:
+        print(f"classify_screen accuracy vs labels.json: {results['state_accuracy']}")
+    for entry in results['timeline']:
+        print(f"  {entry['t']:>9.3f}s  {entry['state']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_corpus = sub.add_parser('corpus', help='latency/accuracy over a labelled frame corpus')
+    p_corpus.add_argument('corpus_dir')
+    p_corpus.add_argument('--threshold', type=float, default=0.8)
+    p_corpus.add_argument('--scales', default='0.9,1.0,1.1', help='multiscale levels, comma separated')
+    p_corpus.add_argument('--min-iou', type=float, default=0.5)
+    p_corpus.add_argument('--compare', help='earlier --json report to diff against')
+    p_corpus.add_argument('--json', help='write results to this file')
+    p_fast = sub.add_parser('fast', help='fast-mode speedup and agreement per bundled asset')
+    p_fast.add_argument('--frames', type=int, default=40)
+    p_fast.add_argument('--threshold', type=float, default=0.8)
+    p_fast.add_argument('--band', type=float, default=0.08)
+    p_fast.add_argument('--seed', type=int, default=7)
+    p_fast.add_argument('--json', help='write results to this file')
+    p_replay = sub.add_parser('replay', help='classify_screen over a recorded session, faster than real time')
+    p_replay.add_argument('source', help='frame directory or video file')
+    p_replay.add_argument('--poll-ms', type=int, default=100)
+    p_replay.add_argument('--speed', type=float, help='replay at this multiple of real time instead of a virtual clock')
+    p_replay.add_argument('--threshold', type=float, default=0.8)
+    p_replay.add_argument('--json', help='write results to this file')
+    args = parser.parse_args(argv)
+
+    # Asset paths are relative to the app directory; user paths to the caller's cwd
+    json_path = os.path.abspath(args.json) if args.json else None
+    if args.cmd == 'corpus':
+        corpus_dir = os.path.abspath(args.corpus_dir)
+        baseline = None
+        if args.compare:
+            with open(args.compare, 'r') as f:
+                baseline = json.load(f)
+        os.chdir(BASE_DIR)
+        results = bench_corpus(corpus_dir, args.threshold, [float(v) for v in args.scales.split(',') if v], args.min_iou)
+        _print_corpus(results, baseline)
+    elif args.cmd == 'replay':
+        source = os.path.abspath(args.source)
+        os.chdir(BASE_DIR)
+        results = bench_replay(source, args.poll_ms, args.speed, args.threshold)
+        _print_replay(results)
+    else:
+        os.chdir(BASE_DIR)
+        results = bench_fast(args.frames, args.threshold, args.band, args.seed)
+        _print_fast(results)
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,15 @@
+import json
 import time
-from typing import Optional, Tuple, List
+import threading
+import zlib
+from typing import Dict, Optional, Sequence, Tuple, List
 import cv2
 import numpy as np
-import mss
-import pyautogui
 import os
 
-pyautogui.FAILSAFE = False
+# Input and monitor geometry live in the light clicker module (no cv2/numpy)
+# so macro-only code can click without loading the vision stack.
+from clicker import click_center, warm_input, get_monitor_for_coordinates
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -19,12 +22,15 @@ MON_HEIGHT = 0
 
 
 def list_monitors() -> List[dict]:
+	import mss
 	with mss.mss() as sct:
 		return list(sct.monitors)
 
 
 def set_selected_monitor(index: int) -> None:
-	global SELECTED_MONITOR_INDEX, MON_LEFT, MON_TOP, MON_WIDTH, MON_HEIGHT
+	global SELECTED_MONITOR_INDEX, MON_LEFT, MON_TOP, MON_WIDTH, MON_HEIGHT, _monitor_probed
+	import mss
+	_monitor_probed = True
 	with mss.mss() as sct:
 		monitors = sct.monitors
 		if index < 1 or index >= len(monitors):
@@ -36,27 +42,103 @@ def set_selected_monitor(index: int) -> None:
 		MON_WIDTH = mon.get('width', 0)
 		MON_HEIGHT = mon.get('height', 0)
 
-# Initialize defaults
-try:
-	set_selected_monitor(1)
-except Exception:
-	pass
+# The monitor probe opens mss, so it runs on first need, not at import
+_monitor_probed = False
 
 
-def screenshot() -> np.ndarray:
-	with mss.mss() as sct:
-		mon = sct.monitors[SELECTED_MONITOR_INDEX]
-		img = np.array(sct.grab(mon))
-		# mss returns BGRA; convert to BGR
-		return img[:, :, :3]
+def monitor_geometry() -> Tuple[int, int, int, int]:
+	# (left, top, width, height) of the selected monitor
+	if not _monitor_probed:
+		try:
+			set_selected_monitor(SELECTED_MONITOR_INDEX)
+		except Exception:
+			pass
+	return MON_LEFT, MON_TOP, MON_WIDTH, MON_HEIGHT
+
+
+# Frame source behind screenshot(): live mss by default, or a recorded /
+# synthetic source from capture.py (BET_CAPTURE=replay:<dir>, synthetic, ...).
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def capture_backend():
+	global _backend
+	if _backend is None:
+		with _backend_lock:
+			if _backend is None:
+				import capture
+				_backend = capture.backend_from_spec(os.environ.get('BET_CAPTURE'))
+	return _backend
+
+
+def set_capture_backend(backend) -> None:
+	# Swap the frame source; the previous backend is closed
+	global _backend
+	with _backend_lock:
+		old, _backend = _backend, backend
+	if old is not None and old is not backend:
+		old.close()
+
+
+def pause(seconds: float) -> None:
+	# Sleep on the capture clock so replays skip the wait instead of sleeping
+	capture_backend().sleep(seconds)
+
+
+def screenshot(region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+	# region is (x, y, w, h) relative to the selected monitor, so boxes found in
+	# a region capture only need the region offset added to be monitor coords.
+	# The backend clips it to the frame; None when none of it is inside.
+	backend = capture_backend()
+	img = backend.grab(region)
+	ring = _frame_ring
+	if ring is not None and img is not None:
+		ring.push(img, region, backend.now())
+	return img
+
+
+# Post-mortem evidence: every screenshot() is copied into a preallocated ring
+# and the ring is written out (off the bet path) when a bet fails.
+_frame_ring = None
+_frame_dumper = None
 
 
-def match_template(img: np.ndarray, template: np.ndarray, threshold: float = 0.8) -> Optional[Tuple[int, int, int, int, float]]:
+def enable_frame_ring(capacity: int = 8, shape: Optional[Tuple[int, int]] = None, logger=None):
+	global _frame_ring, _frame_dumper
+	import capture
+	if shape is None:
+		_, _, width, height = monitor_geometry()
+		if width and height:
+			shape = (height, width)
+	_frame_ring = capture.FrameRing(capacity, shape) if capacity > 0 else None
+	if _frame_ring is not None and _frame_dumper is None:
+		_frame_dumper = capture.FrameDumper(logger=logger)
+	return _frame_ring
+
+
+def annotate_frame(label: str, box: Optional[Tuple[int, ...]], score: Optional[float] = None) -> None:
+	ring = _frame_ring
+	if ring is not None:
+		ring.annotate(label, box, score)
+
+
+def dump_frame_ring(out_dir: str, meta: Optional[dict] = None) -> Optional[str]:
+	# Snapshot now, encode later on the dumper thread; None when nothing to dump
+	ring = _frame_ring
+	if ring is None or len(ring) == 0 or _frame_dumper is None:
+		return None
+	return out_dir if _frame_dumper.submit(ring.snapshot(), out_dir, meta) else None
+
+
+def match_template(img: np.ndarray, template: np.ndarray, threshold: float = 0.8, prefilter: Optional['PrefilterCascade'] = None) -> Optional[Tuple[int, int, int, int, float]]:
 	# Template and img are BGR
 	th, tw = template.shape[:2]
 	ih, iw = img.shape[:2]
 	if th > ih or tw > iw:
 		return None
+	if prefilter is not None and not prefilter.accept(img):
+		return None
 	res = cv2.matchTemplate(img, template, cv2.TM_CCOEFF_NORMED)
 	min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
 	if max_val >= threshold:
@@ -66,7 +148,7 @@ def match_template(img: np.ndarray, template: np.ndarray, threshold: float = 0.8
 	return None
 
 
-def match_template_masked(img: np.ndarray, template: np.ndarray, mask: np.ndarray, threshold: float = 0.8) -> Optional[Tuple[int, int, int, int, float]]:
+def match_template_masked(img: np.ndarray, template: np.ndarray, mask: np.ndarray, threshold: float = 0.8, prefilter: Optional['PrefilterCascade'] = None) -> Optional[Tuple[int, int, int, int, float]]:
 	# Use TM_CCORR_NORMED which supports mask
 	th, tw = template.shape[:2]
 	ih, iw = img.shape[:2]
@@ -75,6 +157,8 @@ def match_template_masked(img: np.ndarray, template: np.ndarray, mask: np.ndarra
 	if mask is not None and (mask.shape[0] != th or mask.shape[1] != tw):
 		# size mismatch; cannot match
 		return None
+	if prefilter is not None and not prefilter.accept(img):
+		return None
 	res = cv2.matchTemplate(img, template, cv2.TM_CCORR_NORMED, mask=mask)
 	min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
 	if max_val >= threshold:
@@ -92,7 +176,105 @@ def load_image(path: str) -> np.ndarray:
 	return img
 
 
-def load_image_with_alpha(path: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+# Precompiled template bundle written by build_templates.py: one .npy blob
+# memory-mapped at first use plus a JSON index of (offset, shape) per variant.
+# Set BET_TEMPLATE_BUNDLE=0 to force decoding the PNGs.
+BUNDLE_INDEX = os.path.join(BASE_DIR, 'assets', 'templates.json')
+_bundle: Optional['TemplateBundle'] = None
+_bundle_checked = False
+_bundle_lock = threading.Lock()
+
+
+def asset_key(path: str) -> str:
+	abs_path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+	return os.path.relpath(abs_path, BASE_DIR).replace(os.sep, '/')
+
+
+def file_crc(path: str) -> int:
+	with open(path, 'rb') as f:
+		return zlib.crc32(f.read())
+
+
+class TemplateBundle:
+	def __init__(self, index_path: str = BUNDLE_INDEX):
+		with open(index_path, 'r') as f:
+			self.index = json.load(f)
+		blob_path = os.path.join(os.path.dirname(index_path), self.index['blob'])
+		self.blob = np.load(blob_path, mmap_mode='r')
+		self._fresh: Dict[str, bool] = {}
+
+	def _entry(self, path: str) -> Optional[dict]:
+		key = asset_key(path)
+		entry = self.index['entries'].get(key)
+		if entry is None:
+			return None
+		fresh = self._fresh.get(key)
+		if fresh is None:
+			# A PNG edited after the bundle was built wins over the bundle. Same
+			# size and mtime as at build time is fresh without reading the file;
+			# only a changed mtime (a copy or checkout) costs a CRC. A PNG that
+			# cannot be read is not trusted to match the bundle.
+			src = os.path.join(BASE_DIR, key)
+			try:
+				st = os.stat(src)
+				fresh = st.st_size == entry['size'] and (st.st_mtime_ns == entry.get('mtime_ns') or file_crc(src) == entry['crc'])
+			except OSError:
+				fresh = False
+			self._fresh[key] = fresh
+		return entry if fresh else None
+
+	def get(self, path: str, variant: str) -> Optional[np.ndarray]:
+		# Zero-copy, read-only view into the mapped blob
+		entry = self._entry(path)
+		if entry is None or variant not in entry['variants']:
+			return None
+		offset, shape = entry['variants'][variant]
+		size = int(np.prod(shape))
+		return np.asarray(self.blob[offset:offset + size]).reshape(shape)
+
+
+def template_bundle() -> Optional[TemplateBundle]:
+	global _bundle, _bundle_checked
+	if not _bundle_checked:
+		with _bundle_lock:
+			if not _bundle_checked:
+				if os.environ.get('BET_TEMPLATE_BUNDLE', '1') != '0' and os.path.exists(BUNDLE_INDEX):
+					try:
+						_bundle = TemplateBundle(BUNDLE_INDEX)
+					except Exception as e:
+						print(f"Template bundle unusable, decoding PNGs instead: {e}")
+				_bundle_checked = True
+	return _bundle
+
+
+def _bundled(path: str, variant: str) -> Optional[np.ndarray]:
+	bundle = template_bundle()
+	return bundle.get(path, variant) if bundle is not None else None
+
+
+_template_cache: Dict[str, np.ndarray] = {}
+_template_cache_lock = threading.Lock()
+
+
+def get_template(path: str) -> np.ndarray:
+	# Cached load_image; returned arrays are read-only because they are shared
+	abs_path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+	tpl = _template_cache.get(abs_path)
+	if tpl is None:
+		tpl = _bundled(abs_path, 'bgr')
+		if tpl is None:
+			tpl = load_image(abs_path)
+			tpl.setflags(write=False)
+		with _template_cache_lock:
+			tpl = _template_cache.setdefault(abs_path, tpl)
+	return tpl
+
+
+def load_image_with_alpha(path: str, bundled: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+	# bundled=False always decodes the PNG (build_templates.py)
+	bgr = _bundled(path, 'bgr') if bundled else None
+	if bgr is not None:
+		return bgr, _bundled(path, 'alpha')
 	abs_path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
 	img = cv2.imread(abs_path, cv2.IMREAD_UNCHANGED)
 	if img is None:
@@ -104,6 +286,14 @@ def load_image_with_alpha(path: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
 	return img, None
 
 
+def template_mask(path: str, template_bgr: np.ndarray, alpha: Optional[np.ndarray] = None) -> np.ndarray:
+	# Match mask for a template: embedded alpha, else near-white removed
+	mask = _bundled(path, 'mask')
+	if mask is not None:
+		return mask
+	return alpha if alpha is not None else build_nonwhite_mask(template_bgr)
+
+
 def build_nonwhite_mask(template_bgr: np.ndarray, alpha: Optional[np.ndarray] = None, white_thresh: int = 240) -> np.ndarray:
 	# Mask where pixel is NOT near white and (if alpha provided) alpha > 0
 	b, g, r = cv2.split(template_bgr)
@@ -117,38 +307,13 @@ def build_nonwhite_mask(template_bgr: np.ndarray, alpha: Optional[np.ndarray] =
 	return mask
 
 
-def get_monitor_for_coordinates(x: int, y: int) -> dict:
-	"""Get the monitor that contains the given coordinates"""
-	with mss.mss() as sct:
-		monitors = sct.monitors
-		for i, monitor in enumerate(monitors):
-			if i == 0:  # Skip the "all monitors" entry
-				continue
-			left = monitor['left']
-			top = monitor['top']
-			width = monitor['width']
-			height = monitor['height']
-			
-			if (left <= x < left + width and top <= y < top + height):
-				return monitor
-		# Default to primary monitor if not found
-		return monitors[1] if len(monitors) > 1 else monitors[0]
-
-def click_center(box: Tuple[int, int, int, int], move_delay_ms: int = 100, post_click_ms: int = 150) -> None:
-	x, y, w, h = box
-	
-	# Get the monitor that contains these coordinates
-	target_monitor = get_monitor_for_coordinates(x, y)
-	
-	# Click at the exact position (x, y) without adding width/height offsets
-	# since the stored coordinates are the exact click positions
-	cx, cy = x, y
-	
-	print(f"Clicking at exact position ({cx}, {cy}) on monitor: {target_monitor['left']},{target_monitor['top']} {target_monitor['width']}x{target_monitor['height']}")
-	
-	pyautogui.moveTo(cx, cy, duration=move_delay_ms / 1000.0)
-	pyautogui.click()
-	time.sleep(post_click_ms / 1000.0)
+def configure_opencv(threads: Optional[int] = None, opencl: Optional[bool] = None) -> Dict[str, object]:
+	# threads=None keeps OpenCV's default pool; 0 runs kernels single-threaded
+	if threads is not None:
+		cv2.setNumThreads(int(threads))
+	if opencl is not None:
+		cv2.ocl.setUseOpenCL(bool(opencl))
+	return {'threads': cv2.getNumThreads(), 'opencl': bool(cv2.ocl.useOpenCL()), 'opencl_available': bool(cv2.ocl.haveOpenCL())}
 
 
 def find_any(img: np.ndarray, templates: List[np.ndarray], threshold: float) -> Optional[Tuple[int, int, int, int, float, int]]:
@@ -166,16 +331,72 @@ def find_any(img: np.ndarray, templates: List[np.ndarray], threshold: float) ->
 	return (best[0], best[1], best[2], best[3], best[4], best_idx)
 
 
-def wait_and_find(path: str, timeout_ms: int, threshold: float) -> Optional[Tuple[int, int, int, int, float]]:
-	end = time.time() + timeout_ms / 1000.0
-	tpl = load_image(path)
-	while time.time() < end:
-		img = screenshot()
-		res = match_template(img, tpl, threshold)
-		if res is not None:
-			return res
-		time.sleep(0.15)
-	return None 
+def _frame_signature(img: np.ndarray) -> np.ndarray:
+	# 32px-wide grayscale thumbnail; cheap enough to compute on every poll.
+	# Compared by max cell difference so a small widget changing still counts.
+	h, w = img.shape[:2]
+	tw = min(32, w)
+	th = max(1, int(h * tw / max(1, w)))
+	thumb = cv2.resize(img, (tw, th), interpolation=cv2.INTER_AREA)
+	if thumb.ndim == 3:
+		thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+	return thumb.astype(np.int16)
+
+
+def wait_for_any(paths: Sequence[str], timeout_ms: int, threshold: float, region: Optional[Tuple[int, int, int, int]] = None, deadline: Optional[float] = None, min_interval_ms: int = 20, max_interval_ms: int = 250, change_thresh: int = 6, force_every: int = 8) -> Optional[Tuple[int, int, int, int, float, int]]:
+	# Returns the first template (index into paths) that shows up, with its box in
+	# monitor coordinates. deadline is an absolute capture_backend().now() value
+	# shared by callers that chain several waits under one overall budget.
+	backend = capture_backend()
+	end = backend.now() + timeout_ms / 1000.0
+	if deadline is not None:
+		end = min(end, deadline)
+	templates = [get_template(p) for p in paths]
+	ox, oy = (region[0], region[1]) if region is not None else (0, 0)
+	max_interval = max_interval_ms / 1000.0
+	interval = min_interval_ms / 1000.0
+	# Signature of the last frame that was actually matched. Comparing with it
+	# (not with the previous poll) lets a gradual fade-in add up to a change.
+	matched_sig = None
+	skipped = 0
+	while True:
+		img = screenshot(region)
+		if img is None:
+			# The region is off the captured frame: nothing to match until that changes
+			remaining = end - backend.now()
+			if remaining <= 0:
+				return None
+			backend.sleep(min(max_interval, remaining))
+			continue
+		sig = _frame_signature(img)
+		changed = matched_sig is None or sig.shape != matched_sig.shape or int(np.abs(sig - matched_sig).max()) > change_thresh
+		# A thumbnail cell can hide a small widget, so match anyway now and then
+		if changed or skipped + 1 >= force_every or interval >= max_interval:
+			matched_sig = sig
+			skipped = 0
+			res = find_any(img, templates, threshold)
+			if res is not None:
+				x, y, w, h, score, idx = res
+				return (x + ox, y + oy, w, h, score, idx)
+		else:
+			skipped += 1
+		if changed:
+			# Something moved: poll fast for the next few frames
+			interval = min_interval_ms / 1000.0
+		else:
+			# Static screen: the last match already failed on (nearly) these pixels
+			interval = min(interval * 2.0, max_interval)
+		remaining = end - backend.now()
+		if remaining <= 0:
+			return None
+		backend.sleep(min(interval, remaining))
+
+
+def wait_and_find(path: str, timeout_ms: int, threshold: float, region: Optional[Tuple[int, int, int, int]] = None, deadline: Optional[float] = None) -> Optional[Tuple[int, int, int, int, float]]:
+	res = wait_for_any([path], timeout_ms, threshold, region=region, deadline=deadline)
+	if res is None:
+		return None
+	return res[:5]
 
 
 def resize_image(img: np.ndarray, scale: float) -> np.ndarray:
@@ -190,15 +411,19 @@ def resize_mask(mask: np.ndarray, scale: float) -> np.ndarray:
 	return cv2.resize(mask, (new_w, new_h), interpolation=cv2.INTER_NEAREST)
 
 
-def match_template_multiscale_masked(img: np.ndarray, tpl_bgr: np.ndarray, mask: Optional[np.ndarray], scales: List[float], threshold: float) -> Optional[Tuple[int, int, int, int, float, float]]:
+def match_template_multiscale_masked(img: np.ndarray, tpl_bgr: np.ndarray, mask: Optional[np.ndarray], scales: List[float], threshold: float, pyramid: Optional[Dict[float, Tuple[np.ndarray, Optional[np.ndarray]]]] = None) -> Optional[Tuple[int, int, int, int, float, float]]:
+	# pyramid: prebuilt {scale: (template, mask)} from template_pyramid()
 	best = None
 	ih, iw = img.shape[:2]
 	for s in scales:
-		tpl_scaled = resize_image(tpl_bgr, s)
+		if pyramid is not None and s in pyramid:
+			tpl_scaled, mask_scaled = pyramid[s]
+		else:
+			tpl_scaled = resize_image(tpl_bgr, s)
+			mask_scaled = resize_mask(mask, s) if mask is not None else None
 		th, tw = tpl_scaled.shape[:2]
 		if th > ih or tw > iw:
 			continue
-		mask_scaled = resize_mask(mask, s) if mask is not None else None
 		if mask_scaled is not None and (mask_scaled.shape[0] != th or mask_scaled.shape[1] != tw):
 			mask_scaled = None
 		if mask_scaled is not None:
@@ -217,4 +442,323 @@ def bottom_roi(img: np.ndarray, bottom_ratio: float = 0.4) -> Tuple[np.ndarray,
 	bottom_ratio = min(max(bottom_ratio, 0.05), 1.0)
 	h = img.shape[0]
 	y0 = int(h * (1.0 - bottom_ratio))
-	return img[y0:, :], y0 
\ No newline at end of file
+	return img[y0:, :], y0 
+
+def colour_signature(tpl_bgr: np.ndarray, mask: Optional[np.ndarray] = None, h_bins: int = 18, s_bins: int = 8, mass: float = 0.6) -> Tuple[np.ndarray, float]:
+	# Hue/saturation bins that together hold `mass` of the template's pixels.
+	# Returns (bin lookup table, fraction of the template covered by those bins).
+	hsv = cv2.cvtColor(tpl_bgr, cv2.COLOR_BGR2HSV)
+	hist = cv2.calcHist([hsv], [0, 1], mask, [h_bins, s_bins], [0, 180, 0, 256]).ravel()
+	total = float(hist.sum())
+	lut = np.zeros(h_bins * s_bins, dtype=bool)
+	if total <= 0:
+		return lut.reshape(h_bins, s_bins), 0.0
+	order = np.argsort(hist)[::-1]
+	covered = np.cumsum(hist[order]) / total
+	keep = order[:int(np.searchsorted(covered, mass)) + 1]
+	lut[keep] = True
+	lut = lut.reshape(h_bins, s_bins)
+	coverage = float(hist[keep].sum() / total)
+	# Tolerate JPEG/scaling colour drift: widen by one bin in hue (circular)
+	# and saturation, and ignore hue entirely for near-grey bins where it is noise.
+	grey = max(1, s_bins // 4)
+	lut[:, :grey] = lut[:, :grey].any(axis=0)
+	lut = lut | np.roll(lut, 1, axis=0) | np.roll(lut, -1, axis=0)
+	lut[:, 1:] |= lut[:, :-1].copy()
+	lut[:, :-1] |= lut[:, 1:].copy()
+	return lut, coverage
+
+
+def colour_presence(img: np.ndarray, lut: np.ndarray, thumb_width: Optional[int] = 160) -> float:
+	# Fraction of a downscaled copy of img whose hue/sat falls in lut.
+	# thumb_width=None uses img as-is (caller already shrank it).
+	if thumb_width is not None:
+		h, w = img.shape[:2]
+		tw = min(thumb_width, w)
+		th = max(1, int(h * tw / max(1, w)))
+		img = cv2.resize(img, (tw, th), interpolation=cv2.INTER_AREA)
+	hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+	h_bins, s_bins = lut.shape
+	hi = (hsv[:, :, 0].astype(np.int32) * h_bins) // 180
+	si = (hsv[:, :, 1].astype(np.int32) * s_bins) // 256
+	return float(lut[np.minimum(hi, h_bins - 1), np.minimum(si, s_bins - 1)].mean())
+
+
+def _edge_map(img_small: np.ndarray) -> np.ndarray:
+	gray = cv2.cvtColor(img_small, cv2.COLOR_BGR2GRAY) if img_small.ndim == 3 else img_small
+	return cv2.Canny(gray, 50, 150)
+
+
+class PrefilterCascade:
+	"""Cheap rejection tests run before normalised cross-correlation.
+
+	Both stages look at a thumbnail (`scale` of the input) and only reject
+	when the frame/ROI cannot plausibly hold the template:
+	  - colour: too few pixels in the template's dominant hue/sat bins
+	  - edges: fewer edge pixels than the template alone would contribute
+	Ratios are deliberately loose; a rejection must never hide a real match.
+	"""
+
+	STAGES = ('colour', 'edges')
+
+	def __init__(self, template: np.ndarray, mask: Optional[np.ndarray] = None, stages: Sequence[str] = STAGES, scale: float = 0.25, colour_ratio: float = 0.25, edge_ratio: float = 0.3):
+		self.stages = tuple(st for st in stages if st in self.STAGES)
+		self.scale = scale
+		self.colour_ratio = colour_ratio
+		self.edge_ratio = edge_ratio
+		self.tpl_px = float(template.shape[0] * template.shape[1])
+		self.lut, self.coverage = colour_signature(template, mask)
+		edges = _edge_map(resize_image(template, scale))
+		if mask is not None:
+			# Edges outside the mask belong to the template's background
+			edges = cv2.bitwise_and(edges, resize_mask(mask, scale))
+		self.tpl_edges = int(cv2.countNonZero(edges))
+		self.stats: Dict[str, List[int]] = {st: [0, 0] for st in self.STAGES}
+
+	def accept(self, img: np.ndarray) -> bool:
+		if not self.stages:
+			return True
+		small = resize_image(img, self.scale)
+		for stage in self.stages:
+			counters = self.stats[stage]
+			counters[0] += 1
+			if stage == 'colour':
+				frame_px = float(img.shape[0] * img.shape[1])
+				expected = self.coverage * self.tpl_px / frame_px
+				ok = colour_presence(small, self.lut, thumb_width=None) >= expected * self.colour_ratio
+			else:
+				ok = cv2.countNonZero(_edge_map(small)) >= self.tpl_edges * self.edge_ratio
+			if not ok:
+				counters[1] += 1
+				return False
+		return True
+
+	def report(self) -> Dict[str, Dict[str, float]]:
+		# Per-stage counts; rate is rejected/checked for frames reaching that stage
+		return {st: {'checked': c, 'rejected': r, 'rate': (r / c) if c else 0.0} for st, (c, r) in self.stats.items()}
+
+	def reset_stats(self) -> None:
+		for counters in self.stats.values():
+			counters[0] = counters[1] = 0
+
+
+def clip_region(region: Tuple[int, int, int, int], shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+	# Intersect (x, y, w, h) with an image of the given shape; None if empty
+	x, y, w, h = region
+	ih, iw = shape[:2]
+	x0, y0 = max(0, x), max(0, y)
+	x1, y1 = min(iw, x + w), min(ih, y + h)
+	if x1 <= x0 or y1 <= y0:
+		return None
+	return (x0, y0, x1 - x0, y1 - y0)
+
+
+class AnchorLocator:
+	"""Locates the game table from one distinctive anchor template.
+
+	Every other search region is stored relative to the anchor's top-left
+	corner, so after the anchor is found each lookup is a small ROI match and
+	a moved browser window only costs re-finding the anchor. ROIs can be
+	configured up front or learned from a full-frame hit (learn()). A miss in
+	an ROI is often the target being hidden (a dimmed bet area while betting
+	is closed), not a wrong ROI, so the full frame is searched again only
+	after miss_limit misses in a row (missed()); a hit there re-learns the
+	ROI, and configured ROIs are kept.
+	"""
+
+	def __init__(self, template: np.ndarray, mask: Optional[np.ndarray] = None, threshold: float = 0.8, rois: Optional[Dict[str, Tuple[int, int, int, int]]] = None, track_margin: int = 48, miss_limit: int = 3):
+		self.template = template
+		self.mask = mask
+		self.threshold = threshold
+		self.track_margin = track_margin
+		self.miss_limit = miss_limit
+		self.rois: Dict[str, Tuple[int, int, int, int]] = dict(rois or {})
+		self.configured = frozenset(self.rois)
+		self.box: Optional[Tuple[int, int, int, int, float]] = None
+		# Consecutive ROI misses per name, on frames where the anchor was found
+		self.misses: Dict[str, int] = {}
+
+	def _match(self, img: np.ndarray) -> Optional[Tuple[int, int, int, int, float]]:
+		if self.mask is not None:
+			return match_template_masked(img, self.template, self.mask, self.threshold)
+		return match_template(img, self.template, self.threshold)
+
+	def locate(self, frame: np.ndarray) -> Optional[Tuple[int, int, int, int, float]]:
+		# Try a small window around the last known position before the full frame
+		if self.box is not None:
+			x, y, w, h = self.box[:4]
+			m = self.track_margin
+			win = clip_region((x - m, y - m, w + 2 * m, h + 2 * m), frame.shape)
+			if win is not None:
+				wx, wy, ww, wh = win
+				res = self._match(frame[wy:wy + wh, wx:wx + ww])
+				if res is not None:
+					self.box = (res[0] + wx, res[1] + wy, res[2], res[3], res[4])
+					return self.box
+		self.box = self._match(frame)
+		return self.box
+
+	def has_roi(self, name: str) -> bool:
+		return name in self.rois
+
+	def learn(self, name: str, box: Tuple[int, ...], pad: int = 16) -> None:
+		# Remember where `name` was found (frame coords) relative to the anchor
+		if self.box is None or name in self.configured:
+			return
+		ax, ay = self.box[0], self.box[1]
+		x, y, w, h = box[:4]
+		self.rois[name] = (x - ax - pad, y - ay - pad, w + 2 * pad, h + 2 * pad)
+		self.misses.pop(name, None)
+
+	def hit(self, name: str) -> None:
+		self.misses.pop(name, None)
+
+	def missed(self, name: str) -> bool:
+		# Count a miss in name's ROI; True on every miss_limit-th in a row, when
+		# the caller should search the full frame in case the ROI is wrong
+		count = self.misses.get(name, 0) + 1
+		self.misses[name] = count % self.miss_limit
+		return count >= self.miss_limit
+
+	def forget(self, name: str) -> None:
+		if name not in self.configured:
+			self.rois.pop(name, None)
+			self.misses.pop(name, None)
+
+	def roi(self, name: str, shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+		# Absolute (x, y, w, h) of a relative ROI, clipped to the frame
+		if self.box is None or name not in self.rois:
+			return None
+		dx, dy, w, h = self.rois[name]
+		return clip_region((self.box[0] + dx, self.box[1] + dy, w, h), shape)
+
+	def crop(self, frame: np.ndarray, name: str) -> Optional[Tuple[np.ndarray, int, int]]:
+		region = self.roi(name, frame.shape)
+		if region is None:
+			return None
+		x, y, w, h = region
+		return frame[y:y + h, x:x + w], x, y
+
+
+# Per-thread scratch buffers for colour->gray and downscale conversions, keyed
+# by shape so repeated captures of the same region never allocate.
+_scratch_local = threading.local()
+
+
+def _scratch(key: Tuple, shape: Tuple[int, ...]) -> np.ndarray:
+	bufs = getattr(_scratch_local, 'bufs', None)
+	if bufs is None:
+		bufs = _scratch_local.bufs = {}
+	buf = bufs.get((key, shape))
+	if buf is None:
+		buf = bufs[(key, shape)] = np.empty(shape, dtype=np.uint8)
+	return buf
+
+
+def to_gray(img: np.ndarray, scale: float = 1.0) -> np.ndarray:
+	# Single-channel (optionally downscaled) view of img in a reused buffer.
+	# The result is overwritten by the next call with the same shape.
+	if img.ndim == 2:
+		gray = img
+	else:
+		gray = _scratch('gray', img.shape[:2])
+		cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=gray)
+	if scale == 1.0:
+		return gray
+	h, w = gray.shape[:2]
+	small = _scratch('small', (max(1, int(h * scale)), max(1, int(w * scale))))
+	cv2.resize(gray, (small.shape[1], small.shape[0]), dst=small, interpolation=cv2.INTER_AREA)
+	return small
+
+
+class FastTemplate:
+	"""Grayscale / half-resolution variants of a BGR template, built once.
+
+	Templates whose downscaled side would fall under min_side pixels are
+	matched at full resolution (grayscale only) to keep them discriminative.
+	"""
+
+	def __init__(self, bgr: np.ndarray, mask: Optional[np.ndarray] = None, scale: float = 0.5, min_side: int = 16, gray: Optional[np.ndarray] = None, mask_small: Optional[np.ndarray] = None):
+		# gray/mask_small: variants precomputed for this scale (template bundle)
+		self.bgr = bgr
+		self.mask = mask
+		if min(bgr.shape[:2]) * scale < min_side:
+			scale = 1.0
+			gray = mask_small = None
+		self.scale = scale
+		if gray is None:
+			gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+			gray = resize_image(gray, scale) if scale != 1.0 else gray
+			mask_small = None
+		self.gray = gray
+		self.mask_small = mask_small
+		if mask is not None and mask_small is None:
+			self.mask_small = resize_mask(mask, scale) if scale != 1.0 else mask
+		if self.mask_small is not None and self.mask_small.shape != self.gray.shape:
+			self.mask_small = None
+		# fast_reject / escalated (checked in full colour) / confirmed
+		self.stats: Dict[str, int] = {'fast_reject': 0, 'escalated': 0, 'confirmed': 0}
+
+
+def match_template_fast(img: np.ndarray, fast: FastTemplate, threshold: float = 0.8, band: float = 0.08, prefilter: Optional['PrefilterCascade'] = None) -> Optional[Tuple[int, int, int, int, float]]:
+	# Match on the gray/downscaled copy to find the candidate position. Clear
+	# misses (< threshold - band) are final; every other hit is confirmed with
+	# the full-colour matcher in a small window around it, because gray
+	# cannot tell colour-discriminated templates apart (player/banker areas,
+	# chip denominations) and a high gray score is no proof of a match.
+	th, tw = fast.bgr.shape[:2]
+	ih, iw = img.shape[:2]
+	if th > ih or tw > iw:
+		return None
+	if prefilter is not None and not prefilter.accept(img):
+		return None
+	small = to_gray(img, fast.scale)
+	sh, sw = fast.gray.shape[:2]
+	if sh > small.shape[0] or sw > small.shape[1]:
+		return None
+	if fast.mask_small is not None:
+		res = cv2.matchTemplate(small, fast.gray, cv2.TM_CCORR_NORMED, mask=fast.mask_small)
+	else:
+		res = cv2.matchTemplate(small, fast.gray, cv2.TM_CCOEFF_NORMED)
+	_, score, _, loc = cv2.minMaxLoc(res)
+	if not np.isfinite(score) or score < threshold - band:
+		fast.stats['fast_reject'] += 1
+		return None
+	x = int(round(loc[0] / fast.scale))
+	y = int(round(loc[1] / fast.scale))
+	fast.stats['escalated'] += 1
+	m = int(np.ceil(2.0 / fast.scale)) + 2
+	win = clip_region((x - m, y - m, tw + 2 * m, th + 2 * m), img.shape)
+	if win is None:
+		return None
+	wx, wy, ww, wh = win
+	roi = img[wy:wy + wh, wx:wx + ww]
+	if fast.mask is not None:
+		full = match_template_masked(roi, fast.bgr, fast.mask, threshold)
+	else:
+		full = match_template(roi, fast.bgr, threshold)
+	if full is None:
+		return None
+	fast.stats['confirmed'] += 1
+	return (full[0] + wx, full[1] + wy, full[2], full[3], full[4])
+
+
+def fast_template(path: str, bgr: np.ndarray, mask: Optional[np.ndarray] = None) -> FastTemplate:
+	# FastTemplate using the bundle's half-resolution variants when present
+	return FastTemplate(bgr, mask, gray=_bundled(path, 'gray_half'), mask_small=_bundled(path, 'mask_half') if mask is not None else None)
+
+
+def template_pyramid(path: str, bgr: np.ndarray, mask: Optional[np.ndarray], scales: Sequence[float]) -> Dict[float, Tuple[np.ndarray, Optional[np.ndarray]]]:
+	# Scaled template/mask pairs for match_template_multiscale_masked
+	pyramid = {}
+	for s in scales:
+		tpl_s = _bundled(path, f"bgr@{s:g}") if s != 1.0 else bgr
+		if tpl_s is None:
+			tpl_s = resize_image(bgr, s)
+		mask_s = None
+		if mask is not None:
+			mask_s = _bundled(path, f"mask@{s:g}") if s != 1.0 else mask
+			if mask_s is None:
+				mask_s = resize_mask(mask, s)
+		pyramid[s] = (tpl_s, mask_s)
+	return pyramid
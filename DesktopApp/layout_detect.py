@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+One-shot layout detection: find every bundled template in one screen capture.
+
+All templates (assets/*.png, assets/chips/<amount>.png) are matched in
+parallel threads (OpenCV releases the GIL) over a few scales each, first on
+a half-resolution copy of the frame and then at full resolution around the
+best coarse hit. The score is the zero-mean correlation inside the template
+mask, which unlike the masked TM_CCORR score stays low on look-alikes. The
+best centre and score per item are returned. MacroInterface.apply_detections() fills
+the positions from this, and anything scoring under the threshold is left for
+manual selection. Standalone, it configures a new PC from the command line:
+
+    python layout_detect.py                      # capture, print what was found
+    python layout_detect.py --apply              # ...and save it to macro_config.json
+    python layout_detect.py --image table.png --min-score 0.9
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import cv_utils
+
+# Template file stems that name a position; numbered variants (player_area2.png)
+# are alternatives for the same position
+POSITION_NAMES = ('player_area', 'banker_area', 'cancel_button')
+# Scales tried for templates captured at screen size, and on-screen sizes (px)
+# tried for the large chip artwork
+NATIVE_SCALES = (0.8, 0.9, 1.0, 1.1, 1.25)
+ART_SIZES = (56, 72, 90, 112, 140)
+ART_LIMIT = 400
+# Full-resolution search margin around the coarse hit, in pixels
+REFINE_MARGIN = 8
+# Scores at or above this are applied; the rest are left for manual selection
+MIN_SCORE = 0.85
+
+
+@dataclass
+class Detection:
+	name: str  # position name, or 'chip:<amount>'
+	path: str
+	box: Optional[Tuple[int, int, int, int]]  # screen coordinates
+	score: float
+	scale: float
+	elapsed_ms: float
+
+	@property
+	def center(self) -> Optional[Tuple[int, int]]:
+		if self.box is None:
+			return None
+		x, y, w, h = self.box
+		return x + w // 2, y + h // 2
+
+	@property
+	def chip_amount(self) -> Optional[int]:
+		return int(self.name.split(':', 1)[1]) if self.name.startswith('chip:') else None
+
+
+def bundled_templates(asset_dir: str) -> Dict[str, List[str]]:
+	"""name -> template paths (several when an asset has variants)"""
+	found: Dict[str, List[str]] = {}
+	for path in sorted(glob.glob(os.path.join(asset_dir, '*.png'))):
+		stem = re.sub(r'\d+$', '', os.path.splitext(os.path.basename(path))[0])
+		if stem in POSITION_NAMES:
+			found.setdefault(stem, []).append(path)
+	for path in sorted(glob.glob(os.path.join(asset_dir, 'chips', '*.png'))):
+		stem = os.path.splitext(os.path.basename(path))[0]
+		if stem.isdigit():
+			found.setdefault(f"chip:{int(stem)}", []).append(path)
+	return found
+
+
+def scales_for(shape: Tuple[int, ...]) -> List[float]:
+	size = max(shape[:2])
+	if size <= ART_LIMIT:
+		return list(NATIVE_SCALES)
+	return [px / size for px in ART_SIZES]
+
+
+def masked_correlation(patch: np.ndarray, tpl: np.ndarray, mask: Optional[np.ndarray]) -> float:
+	# Pearson correlation of the pixels under the mask, in [-1, 1]
+	sel = mask > 0 if mask is not None else np.ones(tpl.shape[:2], dtype=bool)
+	a = patch[sel].astype(np.float32).ravel()
+	b = tpl[sel].astype(np.float32).ravel()
+	a -= a.mean()
+	b -= b.mean()
+	denom = float(np.sqrt(np.dot(a, a) * np.dot(b, b)))
+	return float(np.dot(a, b)) / denom if denom > 0 else 0.0
+
+
+def _detect_one(frame: np.ndarray, half: np.ndarray, name: str, path: str, origin: Tuple[int, int]) -> Detection:
+	t0 = time.perf_counter()
+	tpl, alpha = cv_utils.load_image_with_alpha(path)
+	mask = cv_utils.template_mask(path, tpl, alpha)
+	scales = scales_for(tpl.shape)
+	# threshold 0: always return the best location, the caller decides on the score
+	coarse = cv_utils.match_template_multiscale_masked(half, tpl, mask, [s / 2 for s in scales], 0.0)
+	if coarse is None:
+		return Detection(name, path, None, 0.0, 0.0, (time.perf_counter() - t0) * 1000.0)
+	cx, cy, _, _, _, half_scale = coarse
+	scale = half_scale * 2
+	if scale != 1.0:
+		tpl, mask = cv_utils.resize_image(tpl, scale), cv_utils.resize_mask(mask, scale)
+	th, tw = tpl.shape[:2]
+	roi = cv_utils.clip_region((cx * 2 - REFINE_MARGIN, cy * 2 - REFINE_MARGIN, tw + 2 * REFINE_MARGIN, th + 2 * REFINE_MARGIN), frame.shape)
+	fine = None
+	if roi is not None:
+		rx, ry, rw, rh = roi
+		fine = cv_utils.match_template_masked(frame[ry:ry + rh, rx:rx + rw], tpl, mask, 0.0)
+	if fine is None:
+		return Detection(name, path, None, 0.0, scale, (time.perf_counter() - t0) * 1000.0)
+	x, y = fine[0] + rx, fine[1] + ry
+	score = masked_correlation(frame[y:y + th, x:x + tw], tpl, mask)
+	return Detection(name, path, (x + origin[0], y + origin[1], tw, th), score, scale, (time.perf_counter() - t0) * 1000.0)
+
+
+def detect_layout(frame: np.ndarray, templates: Dict[str, List[str]], origin: Tuple[int, int] = (0, 0), workers: Optional[int] = None) -> Dict[str, Detection]:
+	"""Best match per item; origin is the frame's top-left on screen"""
+	half = cv_utils.resize_image(frame, 0.5)
+	jobs = [(name, path) for name, paths in templates.items() for path in paths]
+	with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 2))) as pool:
+		results = list(pool.map(lambda job: _detect_one(frame, half, job[0], job[1], origin), jobs))
+	best: Dict[str, Detection] = {}
+	for det in results:
+		if det.name not in best or det.score > best[det.name].score:
+			best[det.name] = det
+	return best
+
+
+def capture_and_detect(asset_dir: str, image: Optional[str] = None, workers: Optional[int] = None) -> Tuple[Dict[str, Detection], float]:
+	"""Capture the selected monitor once (or read an image) and detect; returns (detections, total ms)"""
+	t0 = time.perf_counter()
+	if image:
+		frame, origin = cv_utils.load_image(image), (0, 0)
+	else:
+		frame = cv_utils.screenshot()
+		origin = cv_utils.monitor_geometry()[:2]
+	found = detect_layout(frame, bundled_templates(asset_dir), origin, workers)
+	return found, (time.perf_counter() - t0) * 1000.0
+
+
+def print_report(found: Dict[str, Detection], min_score: float) -> None:
+	print(f"{'item':<16} {'score':>6} {'scale':>6} {'ms':>7}  centre")
+	for name, det in sorted(found.items(), key=lambda kv: (kv[1].chip_amount or 0, kv[0])):
+		mark = '✓' if det.score >= min_score else '⚠️ manual'
+		print(f"{name:<16} {det.score:6.3f} {det.scale:6.2f} {det.elapsed_ms:7.1f}  {det.center} {mark}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	base = os.path.dirname(os.path.abspath(__file__))
+	parser.add_argument('--image', help='detect on a saved screenshot instead of capturing')
+	parser.add_argument('--assets', default=os.path.join(base, 'assets'))
+	parser.add_argument('--min-score', type=float, default=MIN_SCORE)
+	parser.add_argument('--workers', type=int)
+	parser.add_argument('--apply', nargs='?', const='macro_config.json', metavar='CONFIG',
+						help='write the confident matches into this positions file')
+	args = parser.parse_args(argv)
+	found, total_ms = capture_and_detect(args.assets, args.image, args.workers)
+	print_report(found, args.min_score)
+	print(f"\n{len(found)} items in {total_ms:.0f} ms")
+	if args.apply:
+		from macro_interface import MacroInterface
+		macro = MacroInterface(None, config_path=args.apply)
+		applied, manual = macro.apply_detections(found, args.min_score)
+		macro.store.flush()
+		print(f"✓ {len(applied)} positions written to {macro.config_path}")
+		if manual:
+			print(f"⚠️ set manually: {', '.join(manual)}")
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
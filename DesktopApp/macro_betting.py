@@ -1,13 +1,46 @@
 import time
-from typing import Dict, List, Optional, Tuple, Callable
-from macro_interface import MacroInterface, Position
-from cv_utils import click_center
+from functools import lru_cache, reduce
+from math import gcd
+from typing import List, Optional, Tuple, Callable
+from macro_interface import ConfigSnapshot, MacroInterface, Position
+from clicker import Click, MouseScheduler, click_center
+
+# Plans only depend on the amount and the chip set; keep the recent ones
+PLAN_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compose(target: int, available_chips: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+    # Dynamic programming to find the best combination, in units of the
+    # chips' common divisor (1000 for real chip sets) to keep the table small
+    unit = reduce(gcd, available_chips, 0) or 1
+    if target % unit:
+        return None
+    dp = {0: ()}
+    for t in range(1, target // unit + 1):
+        for chip in available_chips:
+            if t - chip // unit in dp:
+                dp[t] = dp[t - chip // unit] + (chip,)
+                break
+    return dp.get(target // unit)
+
 
 class MacroBaccarat:
-    def __init__(self, macro_interface: MacroInterface, logger: Optional[Callable[[str], None]] = None):
+    def __init__(self, macro_interface: MacroInterface, logger: Optional[Callable[[str], None]] = None,
+                 mouse: Optional[MouseScheduler] = None, owner: Optional[str] = None):
         self.macro = macro_interface
         self.logger = logger
+        # Shared by all tables in one process; None clicks directly
+        self.mouse = mouse
+        self.owner = owner
         self.last_bet_composition = []  # Track the last bet composition for cancel logic
+        self._planned_composition: List[int] = []
+        # Refuse bets that would click a position the last position check failed
+        self.block_failed_positions = False
+        # Optional bet_verify.BetVerifier: a bet only succeeds once chips show up on the area
+        self.verifier = None
+        # Optional click_pacing.ClickPacer: each click waits for the table instead of a fixed pause
+        self.pacer = None
     
     def log(self, msg: str) -> None:
         if self.logger:
@@ -33,74 +66,136 @@ class MacroBaccarat:
         """Get the position for the cancel button"""
         return self.macro.get_position('cancel_button')
     
-    def compose_amount(self, target: int) -> Optional[List[int]]:
+    def compose_amount(self, target: int, snapshot: Optional[ConfigSnapshot] = None) -> Optional[List[int]]:
         """Find the best combination of chips to reach the target amount"""
-        available_chips = [chip.amount for chip in self.macro.get_all_chips()]
-        available_chips.sort(reverse=True)
-        
-        # Dynamic programming to find the best combination
-        dp = {0: []}
-        for t in range(1, target + 1):
-            for chip in available_chips:
-                if t - chip in dp:
-                    dp[t] = dp[t - chip] + [chip]
-                    break
-        return dp.get(target)
+        plan = _compose(target, (snapshot or self.macro.snapshot).denominations)
+        return list(plan) if plan is not None else None
+    
+    def precompile_plans(self, amounts: List[int]) -> int:
+        """Compose plans for amounts ahead of time; returns how many are composable"""
+        return sum(1 for amount in amounts if amount > 0 and self.compose_amount(amount) is not None)
+    
+    def _run_clicks(self, clicks: List[Click]) -> None:
+        step = self.pacer.click if self.pacer is not None else None
+        if self.mouse is not None:
+            # Waits for the mouse; the sequence runs without other tables' clicks in between
+            self.mouse.run(clicks, owner=self.owner, step=step)
+            return
+        for box, pause in clicks:
+            if step is not None:
+                step(box, pause)
+                continue
+            click_center(box)
+            if pause:
+                time.sleep(pause)
     
     def place_bet(self, amount: int, side: str) -> Tuple[bool, str]:
         """Place a bet using macro positions"""
+        # Config reloads wait until the click sequence is over
+        with self.macro.sequence_lock:
+            ok, reason, clicks = self.plan_bet(amount, side)
+            if not ok:
+                return ok, reason
+            # The bet area is always the last click
+            area = clicks[-1][0]
+            armed = self._verify('arm', area)
+            acks_before = self.pacer.acks.get(area[:2], 0) if self.pacer is not None else 0
+            self._run_clicks(clicks)
+            if self.pacer is not None:
+                self.log(f"Click sequence completed ({len(clicks)} clicks, pacing {self.pacer.stats()})")
+            else:
+                self.log(f"Click sequence completed ({len(clicks)} clicks)")
+            confirmed = self._verify('confirm') if self.verifier is not None and armed else None
+            if confirmed is False:
+                # Often just a slow redraw: look once more, within the same capture interval
+                self.log(f"Bet not on screen after {self.verifier.last_ms:.0f} ms, checking again")
+                confirmed = self._verify('recheck')
+            if confirmed is False:
+                self.log(f"Error: bet_not_confirmed (changed {self.verifier.last_score:.1%} in {self.verifier.last_ms:.0f} ms)")
+                # Undo only the area clicks the pacer saw land. Undoing the whole
+                # plan would take chips of an earlier bet this round when none did.
+                landed = self.pacer.acks.get(area[:2], 0) - acks_before if self.pacer is not None else 0
+                if landed:
+                    ok, reason = self._cancel_bet(landed)
+                    self.log(f"Undid {landed} chip(s) seen landing" if ok else f"Could not undo {landed} chip(s) seen landing: {reason}")
+                else:
+                    self.log("No chip was seen landing; nothing undone")
+                return False, 'bet_not_confirmed'
+            if self.verifier is not None:
+                if confirmed is None:
+                    self.log("Bet not verified: the bet area could not be captured")
+                else:
+                    self.log(f"Bet confirmed on screen ({self.verifier.last_score:.1%} changed, {self.verifier.last_ms:.0f} ms)")
+            # Placed: the next cancel undoes this bet's chips
+            self.last_bet_composition = self._planned_composition
+            return True, 'ok'
+    
+    def _verify(self, step: str, *args) -> Optional[bool]:
+        # A capture problem leaves the bet unverified rather than failing it
+        if self.verifier is None:
+            return None
+        try:
+            return getattr(self.verifier, step)(*args)
+        except Exception as e:
+            self.log(f"Bet verification {step} failed: {e}")
+            return None
+    
+    def plan_bet(self, amount: int, side: str) -> Tuple[bool, str, List[Click]]:
+        """Work out the click sequence for a bet without touching the mouse"""
         self.log(f"Place bet start: amount={amount}, side={side}")
+        # One consistent view of the configuration for the whole click sequence,
+        # even if the configuration window saves in the meantime
+        snap = self.macro.snapshot
         
         # Validate inputs
         if side not in ('Player', 'Banker'):
             self.log("Error: invalid_side")
-            return False, 'invalid_side'
+            return False, 'invalid_side', []
         
         if amount <= 0:
             self.log("Error: invalid_amount")
-            return False, 'invalid_amount'
+            return False, 'invalid_amount', []
         
         # Check if configured
-        if not self.is_configured():
+        if not snap.configured:
             self.log("Error: not_configured")
-            return False, 'not_configured'
+            return False, 'not_configured', []
+        
+        # Remap onto the game window's current rectangle (cached while it stays put)
+        mapped = self.macro.click_boxes(snap)
+        if mapped is None:
+            self.log("Error: window_not_found")
+            return False, 'window_not_found', []
+        boxes, chip_boxes = mapped
         
         # Get bet area position
-        area_pos = self.get_bet_area_position(side)
-        if not area_pos:
+        area_box = boxes.get('player_area' if side == 'Player' else 'banker_area')
+        if not area_box:
             self.log(f"Error: bet_area_not_found ({side})")
-            return False, 'bet_area_not_found'
+            return False, 'bet_area_not_found', []
         
         # Check if any chips are configured
-        available_chips = self.macro.get_all_chips()
-        if not available_chips:
+        if not snap.chips:
             self.log("Error: no_chips_configured")
-            return False, 'no_chips_configured'
+            return False, 'no_chips_configured', []
         
         # Try to find exact chip first
-        chip_pos = self.get_chip_position(amount)
-        if chip_pos:
-            self.log(f"Exact chip found: {amount} at ({chip_pos.x},{chip_pos.y})")
-            # Track bet composition for cancel logic
-            self.last_bet_composition = [amount]
-            # Click chip first
-            self.log(f"Clicking chip at coordinates: ({chip_pos.x},{chip_pos.y})")
-            click_center((chip_pos.x, chip_pos.y, chip_pos.width, chip_pos.height))
-            time.sleep(0.05)
-            # Then click bet area
-            self.log(f"Clicking bet area at coordinates: ({area_pos.x},{area_pos.y})")
-            click_center((area_pos.x, area_pos.y, area_pos.width, area_pos.height))
-            self.log("Click sequence completed (exact chip)")
-            return True, 'ok'
+        chip_box = chip_boxes.get(amount)
+        if chip_box:
+            self.log(f"Exact chip found: {amount} at ({chip_box[0]},{chip_box[1]})")
+            # Click chip first, then the bet area
+            self.log(f"Clicking chip at ({chip_box[0]},{chip_box[1]}), then bet area at ({area_box[0]},{area_box[1]})")
+            if not self._positions_healthy(side, [amount]):
+                return False, 'position_check_failed', []
+            # Becomes last_bet_composition once place_bet has placed it
+            self._planned_composition = [amount]
+            return True, 'ok', [(chip_box, 0.05), (area_box, 0.0)]
         
         # Compose amount using available chips
-        plan = self.compose_amount(amount)
+        plan = self.compose_amount(amount, snap)
         if not plan:
             self.log("Error: cannot_compose_amount")
-            return False, 'cannot_compose_amount'
-        
-        # Track bet composition for cancel logic
-        self.last_bet_composition = plan.copy()
+            return False, 'cannot_compose_amount', []
         
         self.log(f"Chip composition plan: {plan}")
         
@@ -114,37 +209,55 @@ class MacroBaccarat:
         self.log(f"Chip groups: {chip_groups}")
         
         # For each unique chip amount, click the chip once, then click bet area multiple times
+        clicks: List[Click] = []
         for chip_amount, count in chip_groups.items():
-            chip_pos = self.get_chip_position(chip_amount)
-            if not chip_pos:
+            chip_box = chip_boxes.get(chip_amount)
+            if not chip_box:
                 self.log(f"Error: chip_not_found ({chip_amount})")
-                return False, 'chip_not_found'
+                return False, 'chip_not_found', []
             
-            # Click the chip once
-            self.log(f"Clicking chip {chip_amount} at ({chip_pos.x},{chip_pos.y})")
-            click_center((chip_pos.x, chip_pos.y, chip_pos.width, chip_pos.height))
-            time.sleep(0.05)
-            
-            # Click bet area 'count' times for this chip
-            for i in range(count):
-                self.log(f"Clicking bet area for chip {chip_amount} ({i+1}/{count})")
-                click_center((area_pos.x, area_pos.y, area_pos.width, area_pos.height))
-                time.sleep(0.05)
+            # Click the chip once, then the bet area 'count' times
+            self.log(f"Clicking chip {chip_amount} at ({chip_box[0]},{chip_box[1]}), then bet area {count} time(s)")
+            clicks.append((chip_box, 0.05))
+            clicks.extend([(area_box, 0.05)] * count)
         
-        self.log("Click sequence completed (composed chips)")
-        return True, 'ok'
+        if not self._positions_healthy(side, list(chip_groups)):
+            return False, 'position_check_failed', []
+        self._planned_composition = plan.copy()
+        return True, 'ok', clicks
+    
+    def _positions_healthy(self, side: str, amounts: List[int]) -> bool:
+        if not self.block_failed_positions:
+            return True
+        failed = set(self.macro.failed_positions())
+        used = ['player_area' if side == 'Player' else 'banker_area'] + [f"chip:{amount}" for amount in amounts]
+        bad = [name for name in used if name in failed]
+        if bad:
+            self.log(f"Error: position_check_failed ({', '.join(bad)})")
+        return not bad
     
     def cancel_bet(self) -> Tuple[bool, str]:
         """Cancel bet using macro position"""
-        cancel_pos = self.get_cancel_button_position()
-        if not cancel_pos:
+        with self.macro.sequence_lock:
+            return self._cancel_bet()
+    
+    def _cancel_bet(self, clicks_needed: Optional[int] = None) -> Tuple[bool, str]:
+        # clicks_needed: undo exactly that many chips instead of the last bet's
+        mapped = self.macro.click_boxes(self.macro.snapshot)
+        if mapped is None:
+            self.log("Error: window_not_found")
+            return False, 'window_not_found'
+        cancel_box = mapped[0].get('cancel_button')
+        if not cancel_box:
             self.log("Error: cancel_button_not_configured")
             return False, 'cancel_button_not_configured'
         
-        self.log(f"Clicking cancel button at ({cancel_pos.x},{cancel_pos.y})")
+        self.log(f"Clicking cancel button at ({cancel_box[0]},{cancel_box[1]})")
         
         # Calculate how many times to click cancel based on the last bet composition
-        if self.last_bet_composition:
+        if clicks_needed is not None:
+            self.log(f"Undoing {clicks_needed} chip(s)")
+        elif self.last_bet_composition:
             # Each chip in the bet requires one cancel click
             clicks_needed = len(self.last_bet_composition)
             self.log(f"Last bet composition: {self.last_bet_composition}, need {clicks_needed} cancel clicks")
@@ -154,9 +267,7 @@ class MacroBaccarat:
             self.log(f"No bet history, using default {clicks_needed} cancel clicks")
         
         # Click cancel button the calculated number of times
-        for i in range(clicks_needed):
-            click_center((cancel_pos.x, cancel_pos.y, cancel_pos.width, cancel_pos.height))
-            time.sleep(0.05)
+        self._run_clicks([(cancel_box, 0.05)] * clicks_needed)
         
         self.log(f"Cancel: clicked {clicks_needed} time(s)")
         return True, 'ok'
@@ -1,13 +1,20 @@
-import json
 import os
 import sys
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from typing import Dict, List, Optional, Tuple, Callable
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, simpledialog
+except ImportError:
+    # Headless agents only load and read the saved positions
+    tk = ttk = messagebox = simpledialog = None
+from typing import Dict, List, Mapping, Optional, Tuple, Callable
 import threading
 import time
 from dataclasses import dataclass, asdict
 from enum import Enum
+from types import MappingProxyType
+
+from config_store import ConfigStore, ConfigWatcher
+from window_frame import Rect, WindowFrame, remap_box
 
 @dataclass
 class Position:
@@ -16,12 +23,52 @@ class Position:
     width: int
     height: int
     name: str
+    # Match score when the position came from layout detection
+    score: Optional[float] = None
 
 @dataclass
 class ChipConfig:
     amount: int
     position: Position
 
+REQUIRED_POSITIONS = ('player_area', 'banker_area', 'cancel_button')
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Read-only view of a saved configuration, indexed for the bet path"""
+    version: int
+    positions: Mapping[str, Position]
+    chips: Tuple[ChipConfig, ...]
+    chip_index: Mapping[int, Position]
+    denominations: Tuple[int, ...]
+    boxes: Mapping[str, Tuple[int, int, int, int]]
+    chip_boxes: Mapping[int, Tuple[int, int, int, int]]
+    configured: bool
+    # Game window rectangle the positions were recorded in; None = absolute screen positions
+    window: Optional[Rect] = None
+
+    @classmethod
+    def build(cls, positions: Dict[str, Position], chips: List[ChipConfig], version: int = 0, window: Optional[Rect] = None) -> 'ConfigSnapshot':
+        # Copies, because the configuration UI edits Position/ChipConfig objects in place
+        positions = {name: Position(**asdict(pos)) for name, pos in positions.items()}
+        chips = tuple(sorted((ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in chips),
+                             key=lambda chip: chip.amount))
+        chip_index = {}
+        for chip in chips:
+            # First entry wins, like the old linear scan
+            chip_index.setdefault(chip.amount, chip.position)
+        return cls(
+            version=version,
+            positions=MappingProxyType(positions),
+            chips=chips,
+            chip_index=MappingProxyType(chip_index),
+            denominations=tuple(sorted(chip_index, reverse=True)),
+            boxes=MappingProxyType({name: (pos.x, pos.y, pos.width, pos.height) for name, pos in positions.items()}),
+            chip_boxes=MappingProxyType({amount: (pos.x, pos.y, pos.width, pos.height) for amount, pos in chip_index.items()}),
+            configured=all(name in positions for name in REQUIRED_POSITIONS),
+            window=tuple(window) if window else None,
+        )
+
 class SelectionMode(Enum):
     NONE = "none"
     PLAYER_AREA = "player_area"
@@ -30,7 +77,7 @@ class SelectionMode(Enum):
     CHIP = "chip"
 
 class MacroInterface:
-    def __init__(self, root: Optional[tk.Tk] = None, config_path: str = "macro_config.json"):
+    def __init__(self, root: Optional['tk.Tk'] = None, config_path: str = "macro_config.json"):
         self.root = root
         
         # Handle both script and executable paths
@@ -41,13 +88,32 @@ class MacroInterface:
             # Running as script
             base_dir = os.path.dirname(os.path.abspath(__file__))
         
+        self.base_dir = base_dir
         self.config_path = os.path.join(base_dir, config_path)
+        self.store = ConfigStore(self.config_path, parse=self._parse_config_data)
+        self.watcher: Optional[ConfigWatcher] = None
+        # Held by MacroBaccarat for a whole click sequence; reloads wait for it
+        self.sequence_lock = threading.Lock()
+        self._reload_logger: Callable[[str], None] = print
+        # External edit that arrived while the editor was open; applied if the editor is cancelled
+        self._deferred_reload: Optional[dict] = None
+        # Game window the positions are relative to (title or anchor template; off by default)
+        self.frame = WindowFrame()
+        self.window_ref: Optional[Rect] = None
+        self._mapped: Optional[Tuple[int, Optional[Rect], tuple]] = None
         self.positions: Dict[str, Position] = {}
         self.chips: List[ChipConfig] = []
         self.selection_mode = SelectionMode.NONE
         self.on_position_selected: Optional[Callable] = None
-        self.selection_window: Optional[tk.Toplevel] = None
-        self.overlay_window: Optional[tk.Toplevel] = None
+        self.selection_window: Optional['tk.Toplevel'] = None
+        self.overlay_window: Optional['tk.Toplevel'] = None
+        self.loupe = None
+        self._cursor_items: Tuple[int, ...] = ()
+        self._label_updated = 0.0
+        # What the bet path reads; replaced as a whole, never mutated
+        self.snapshot = ConfigSnapshot.build({}, [])
+        # (snapshot version, results) of the last position check (position_check.py)
+        self.position_health: Optional[Tuple[int, dict]] = None
         self.load_config()
         
     def load_config(self):
@@ -57,26 +123,9 @@ class MacroInterface:
         
         if os.path.exists(self.config_path):
             try:
-                with open(self.config_path, 'r') as f:
-                    data = json.load(f)
-                    
-                # Load positions
-                for name, pos_data in data.get('positions', {}).items():
-                    self.positions[name] = Position(**pos_data)
-                    print(f"Loaded position: {name} at ({pos_data['x']}, {pos_data['y']})")
-                    
-                # Load chips
-                self.chips = []
-                for chip_data in data.get('chips', []):
-                    position = Position(**chip_data['position'])
-                    self.chips.append(ChipConfig(
-                        amount=chip_data['amount'],
-                        position=position
-                    ))
-                    print(f"Loaded chip: {chip_data['amount']} at ({position.x}, {position.y})")
-                
-                print(f"Configuration loaded successfully from {self.config_path}")
-                print(f"Loaded {len(self.positions)} positions and {len(self.chips)} chips")
+                # Migrated to the current schema; a corrupt file falls back to the newest good backup
+                self._apply_config_data(self.store.load())
+                print(f"Loaded {len(self.positions)} positions and {len(self.chips)} chips from {self.config_path}")
             except Exception as e:
                 print(f"Error loading config: {e}")
                 # If there's an error loading, ensure initial chips exist
@@ -93,6 +142,7 @@ class MacroInterface:
         # Initial chip amounts
         initial_chips = [1000, 25000, 125000, 500000, 1250000, 2500000, 5000000, 50000000]
         
+        added = []
         for amount in initial_chips:
             # Check if chip already exists
             existing_chip = next((chip for chip in self.chips if chip.amount == amount), None)
@@ -102,35 +152,150 @@ class MacroInterface:
                 default_position = Position(x=0, y=0, width=50, height=50, name=f"chip_{amount}")
                 new_chip = ChipConfig(amount=amount, position=default_position)
                 self.chips.append(new_chip)
-                print(f"Added initial chip {amount} with default position")
+                added.append(amount)
         
-        # Save the updated config immediately
+        # Save the updated config (debounced, so it does not block loading)
         self.save_config()
-        print("Initial chips ensured and config saved")
+        print(f"Added initial chips {added} with default positions")
     
-    def save_config(self):
-        """Save current positions and chip configurations"""
-        data = {
+    @staticmethod
+    def _parse_config_data(data: dict) -> Tuple[Dict[str, Position], List[ChipConfig]]:
+        positions = {name: Position(**pos_data) for name, pos_data in data.get('positions', {}).items()}
+        chips = [ChipConfig(**dict(chip_data, position=Position(**chip_data['position'])))
+                 for chip_data in data.get('chips', [])]
+        return positions, chips
+    
+    def _apply_window_data(self, window: Optional[dict]):
+        window = window or {}
+        if (window.get('title'), window.get('anchor')) != (self.frame.title, self.frame.anchor):
+            self.frame = WindowFrame(window.get('title'), window.get('anchor'))
+        self.window_ref = tuple(window['rect']) if window.get('rect') else None
+    
+    def _apply_config_data(self, data: dict):
+        """Replace positions and chips with a loaded config and publish it"""
+        self.positions, self.chips = self._parse_config_data(data)
+        self._apply_window_data(data.get('window'))
+        self._publish_snapshot()
+    
+    def set_window(self, title: Optional[str] = None, anchor: Optional[str] = None) -> Optional[Rect]:
+        """Make positions relative to the game window found by title (or anchor template) and save"""
+        self.frame = WindowFrame(title, anchor)
+        self.window_ref = self.frame.rect(force=True) if self.frame.enabled else None
+        if self.frame.enabled and self.window_ref is None:
+            print(f"Game window not found ({title or anchor}); positions stay absolute until it is")
+        self.save_config()
+        return self.window_ref
+    
+    def _align_to_window(self) -> Optional[Rect]:
+        """Move the editable positions into the window's current rectangle before editing; that rectangle, or None"""
+        if not self.frame.enabled:
+            return None
+        cur = self.frame.rect(force=True)
+        if cur is None:
+            print("Game window not found; editing positions as saved")
+            return None
+        ref = self.window_ref
+        if ref is not None and cur != ref:
+            for pos in list(self.positions.values()) + [chip.position for chip in self.chips]:
+                pos.x, pos.y = remap_box((pos.x, pos.y, pos.width, pos.height), ref, cur)[:2]
+            print(f"Game window moved from {ref} to {cur}; positions remapped")
+        self.window_ref = cur
+        return cur
+    
+    def click_boxes(self, snap: ConfigSnapshot) -> Optional[Tuple[Mapping[str, Tuple[int, int, int, int]], Mapping[int, Tuple[int, int, int, int]]]]:
+        """(area boxes, chip boxes) for where the game window is now; None if it cannot be found"""
+        if snap.window is None or not self.frame.enabled:
+            return snap.boxes, snap.chip_boxes
+        cur = self.frame.rect()
+        if cur is None:
+            return None
+        if cur == snap.window:
+            return snap.boxes, snap.chip_boxes
+        # Remapped boxes are cached until the window or the config changes
+        mapped = self._mapped
+        if mapped is None or mapped[0] != snap.version or mapped[1] != cur:
+            ref = snap.window
+            boxes = {name: remap_box(box, ref, cur) for name, box in snap.boxes.items()}
+            chip_boxes = {amount: remap_box(box, ref, cur) for amount, box in snap.chip_boxes.items()}
+            mapped = self._mapped = (snap.version, cur, (boxes, chip_boxes))
+        return mapped[2]
+    
+    def start_watching(self, interval: float = 1.0, logger: Optional[Callable[[str], None]] = None) -> ConfigWatcher:
+        """Reload the config when the file is edited outside the app"""
+        if self.watcher is None:
+            self._reload_logger = logger or print
+            self.watcher = ConfigWatcher(self.store, self._on_external_change, interval, logger=self._reload_logger).start()
+        return self.watcher
+    
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def _on_external_change(self, data: dict):
+        """Swap in an externally edited (already validated and parsed) config between bets"""
+        if self.selection_window is not None:
+            # The editor's positions are relative to its window rect; swapping the
+            # rect under them would shift them. Cancel applies this config, Save overwrites it.
+            self._deferred_reload = data
+            self._reload_logger(f"Configuration window is open: {self.config_path} is reloaded if it is cancelled")
+            return
+        with self.sequence_lock:
+            self._apply_config_data(data)
+        self._reload_logger(f"Reloaded {self.config_path}: {len(self.positions)} positions, {len(self.chips)} chips (v{self.snapshot.version})")
+    
+    def _config_data(self) -> dict:
+        window = None
+        if self.frame.enabled or self.window_ref:
+            window = dict(self.frame.settings(), rect=list(self.window_ref) if self.window_ref else None)
+        return {
             'positions': {name: asdict(pos) for name, pos in self.positions.items()},
-            'chips': [{'amount': chip.amount, 'position': asdict(chip.position)} for chip in self.chips]
+            'chips': [{'amount': chip.amount, 'position': asdict(chip.position)} for chip in self.chips],
+            'window': window,
         }
-        
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Configuration saved successfully to {self.config_path}")
-            print(f"Saved {len(self.positions)} positions and {len(self.chips)} chips")
-            for name, pos in self.positions.items():
-                print(f"  - {name}: ({pos.x}, {pos.y})")
-            for chip in self.chips:
-                print(f"  - Chip {chip.amount}: ({chip.position.x}, {chip.position.y})")
-        except Exception as e:
-            print(f"Error saving config: {e}")
+    
+    def check_positions(self, checker, frame, origin: Tuple[int, int], snap: Optional[ConfigSnapshot] = None) -> Optional[dict]:
+        """Health per position (position_check.PositionChecker) in one frame; None if the game window is missing"""
+        snap = snap or self.snapshot
+        mapped = self.click_boxes(snap)
+        if mapped is None:
+            return None
+        # Positions still at the (0, 0) placeholder are not set, so there is nothing to check;
+        # negative coordinates are real (monitors left of or above the primary one)
+        boxes = {name: box for name, box in mapped[0].items() if snap.boxes[name][:2] != (0, 0)}
+        chip_boxes = {amount: box for amount, box in mapped[1].items() if snap.chip_boxes[amount][:2] != (0, 0)}
+        results = checker.check(frame, boxes, chip_boxes, origin)
+        if snap is self.snapshot:
+            self.position_health = (snap.version, results)
+        return results
+    
+    def failed_positions(self) -> List[str]:
+        """Positions that failed the last check of the current config (empty if it was not checked)"""
+        health = self.position_health
+        if health is None or health[0] != self.snapshot.version:
+            return []
+        return [name for name, result in health[1].items() if not result.ok]
+    
+    def rollback_config(self, steps: int = 1):
+        """Restore the config from `steps` saves ago (a rollback is itself a save, so steps=1 twice undoes it)"""
+        self._apply_config_data(self.store.rollback(steps))
+    
+    def _publish_snapshot(self) -> ConfigSnapshot:
+        """Swap in a snapshot of the current positions and chips (a single reference assignment)"""
+        self.snapshot = ConfigSnapshot.build(self.positions, self.chips, self.snapshot.version + 1, self.window_ref)
+        return self.snapshot
+    
+    def save_config(self):
+        """Save current positions and chip configurations (debounced; bursts of edits become one write)"""
+        self._publish_snapshot()
+        self.store.save(self._config_data())
     
     def start_position_selection(self):
         """Start position selection mode"""
-        # Load config to ensure we have the latest data
-        self.load_config()
+        # Load config to ensure we have the latest data (the watcher keeps it current)
+        if self.watcher is None:
+            self.load_config()
+        self._align_to_window()
         
         # Create backup of current state for reverting changes
         self._backup_positions = {name: Position(**asdict(pos)) for name, pos in self.positions.items()}
@@ -224,6 +389,16 @@ class MacroInterface:
                                       command=self._show_all_positions_visual, bg="#9C27B0", fg="white")
         show_positions_btn.pack(side="left", padx=5)
         
+        # Detect Layout button (fills everything it finds from one capture)
+        detect_btn = tk.Button(title_actions_frame, text="Detect Layout", 
+                               command=self._detect_layout_clicked, bg="#FF9800", fg="white")
+        detect_btn.pack(side="left", padx=5)
+        
+        # Check Positions button (matches each position against its template)
+        check_btn = tk.Button(title_actions_frame, text="Check Positions", 
+                              command=self._check_positions_clicked, bg="#607D8B", fg="white")
+        check_btn.pack(side="left", padx=5)
+        
         # Create scrollable frame
         canvas = tk.Canvas(main_frame)
         scrollbar = tk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
@@ -476,61 +651,162 @@ class MacroInterface:
             self._cancel_configuration()
     
     def _on_mouse_motion(self, event):
-        """Handle mouse motion to show circle at mouse position"""
+        """Handle mouse motion: move the cursor circle and the loupe"""
         if not hasattr(self, 'mouse_canvas') or not self.mouse_canvas:
             return
-            
-        # Clear previous circle
-        self.mouse_canvas.delete("mouse_circle")
         
         # Use screen-based coordinates for both circle and display
         screen_x, screen_y = event.x_root, event.y_root
         
-        # Convert screen coordinates to canvas coordinates for drawing
-        # Since canvas covers the entire screen starting at (0,0), screen coords = canvas coords
-        canvas_x, canvas_y = screen_x, screen_y
-        
-        # But we need to account for the overlay window position
-        overlay_x = self.overlay_window.winfo_x()
-        overlay_y = self.overlay_window.winfo_y()
-        
-        # Calculate relative position on canvas
-        canvas_x = screen_x - overlay_x
-        canvas_y = screen_y - overlay_y
+        # Calculate relative position on canvas (the overlay may not start at 0,0)
+        canvas_x = screen_x - self.overlay_window.winfo_x()
+        canvas_y = screen_y - self.overlay_window.winfo_y()
         
         radius = 15  # Circle radius
         
-        # Create a semi-transparent red circle at canvas coordinates
-        self.mouse_canvas.create_oval(
-            canvas_x - radius, canvas_y - radius, 
-            canvas_x + radius, canvas_y + radius,
-            fill="red", 
-            stipple="gray50",  # This creates 50% alpha effect
-            tags="mouse_circle"
-        )
+        # Move the existing circle items instead of recreating them on every event
+        for item in self._cursor_items:
+            self.mouse_canvas.coords(item, canvas_x - radius, canvas_y - radius, canvas_x + radius, canvas_y + radius)
+            self.mouse_canvas.itemconfigure(item, state='normal')
         
-        # Add a border to make it more visible
-        self.mouse_canvas.create_oval(
-            canvas_x - radius, canvas_y - radius, 
-            canvas_x + radius, canvas_y + radius,
-            outline="white", 
-            width=2,
-            tags="mouse_circle"
-        )
+        if self.loupe:
+            self.loupe.move(screen_x, screen_y, canvas_x, canvas_y)
         
-        # Update instruction label with screen-based cursor position
-        if hasattr(self, 'instruction_label'):
+        # Update instruction label with screen-based cursor position, at most ~30 times a second
+        now = time.perf_counter()
+        if hasattr(self, 'instruction_label') and now - self._label_updated >= 1 / 30:
+            self._label_updated = now
             mode_text = {
                 SelectionMode.PLAYER_AREA: "Player Bet Area",
                 SelectionMode.BANKER_AREA: "Banker Bet Area", 
                 SelectionMode.CANCEL_BUTTON: "Cancel Button",
                 SelectionMode.CHIP: "Chip Position"
             }.get(self.selection_mode, "Unknown")
+            snap_text = ""
+            if self.loupe and self.loupe.snap_enabled:
+                snap_text = f"\nSnap: {self.loupe.snap_point}" if self.loupe.snap_point else "\nSnap: no match"
             
             self.instruction_label.config(
-                text=f"Click to select {mode_text}\nPress ESC to return\nCursor: ({screen_x}, {screen_y})"
+                text=f"Click to select {mode_text}\nPress ESC to return, S to snap\nCursor: ({screen_x}, {screen_y}){snap_text}"
             )
     
+    def apply_detections(self, found: dict, min_score: float = 0.85) -> Tuple[List[str], List[str]]:
+        """Fill positions/chips from layout_detect results; returns (applied, left for manual selection)"""
+        if self.frame.enabled and self._align_to_window() is None:
+            # Detections are screen points for where the window is now; the
+            # positions they do not replace were remapped there too
+            self.window_ref = None
+            print("Game window not found; detected positions are saved as absolute")
+        applied, manual = [], []
+        for name, det in sorted(found.items()):
+            if det.center is None or det.score < min_score:
+                manual.append(f"{name} ({det.score:.2f})")
+                continue
+            x, y = det.center
+            amount = det.chip_amount
+            if amount is None:
+                self.positions[name] = Position(x=x, y=y, width=50, height=50, name=name, score=round(det.score, 4))
+            else:
+                position = Position(x=x, y=y, width=50, height=50, name=f"chip_{amount}", score=round(det.score, 4))
+                chip = next((c for c in self.chips if c.amount == amount), None)
+                if chip:
+                    chip.position = position
+                else:
+                    self.chips.append(ChipConfig(amount=amount, position=position))
+            applied.append(name)
+        if self.selection_window is None:
+            # Outside the editor there is no Save button; keep what was found
+            self.save_config()
+        return applied, manual
+    
+    def _detect_layout_clicked(self):
+        """Hide the editor, capture the table once and match every bundled template"""
+        windows = [w for w in (self.selection_window, self.root) if w is not None]
+        for window in windows:
+            window.withdraw()
+        
+        def run():
+            try:
+                import layout_detect
+                found, total_ms = layout_detect.capture_and_detect(os.path.join(self.base_dir, 'assets'))
+                error = None
+            except Exception as e:
+                found, total_ms, error = {}, 0.0, e
+            self.selection_window.after(0, lambda: finish(found, total_ms, error))
+        
+        def finish(found, total_ms, error):
+            for window in windows:
+                window.deiconify()
+            self.selection_window.lift()
+            if error is not None:
+                messagebox.showerror("Detect Layout", f"Detection failed: {error}")
+                return
+            applied, manual = self.apply_detections(found)
+            self._update_status_displays()
+            self._rebuild_chip_ui()
+            print(f"Layout detection: {len(applied)} found, {len(manual)} left in {total_ms:.0f} ms")
+            text = f"Found {len(applied)} of {len(found)} items in {total_ms:.0f} ms."
+            if manual:
+                text += "\n\nSelect these manually:\n" + "\n".join(manual)
+            messagebox.showinfo("Detect Layout", text + "\n\nReview the positions, then Save Configuration.")
+        
+        # Give the windows time to disappear before the capture
+        self.selection_window.after(300, lambda: threading.Thread(target=run, name='detect-layout', daemon=True).start())
+    
+    def _check_positions_clicked(self):
+        """Hide the editor and check the positions being edited against one capture"""
+        windows = [w for w in (self.selection_window, self.root) if w is not None]
+        for window in windows:
+            window.withdraw()
+        snap = ConfigSnapshot.build(self.positions, self.chips, -1, self.window_ref)
+        
+        def run():
+            try:
+                import cv_utils
+                from position_check import PositionChecker
+                frame, origin = cv_utils.screenshot(), cv_utils.monitor_geometry()[:2]
+                results, error = self.check_positions(PositionChecker(os.path.join(self.base_dir, 'assets')), frame, origin, snap), None
+            except Exception as e:
+                results, error = None, e
+            self.selection_window.after(0, lambda: finish(results, error))
+        
+        def finish(results, error):
+            for window in windows:
+                window.deiconify()
+            self.selection_window.lift()
+            if error is not None:
+                messagebox.showerror("Check Positions", f"Check failed: {error}")
+            elif results is None:
+                messagebox.showwarning("Check Positions", "Game window not found.")
+            else:
+                from position_check import failed, health_score
+                bad = failed(results)
+                score = health_score(results)
+                text = "\n".join(r.describe() for r in results.values())
+                title = f"Health {'-' if score is None else f'{score:.0%}'}: " + (f"{len(bad)} position(s) need attention" if bad else "all positions found")
+                (messagebox.showwarning if bad else messagebox.showinfo)("Check Positions", f"{title}\n\n{text}")
+        
+        self.selection_window.after(300, lambda: threading.Thread(target=run, name='check-positions', daemon=True).start())
+    
+    def _snap_template(self) -> Optional[str]:
+        """Bundled template for what is being selected, if there is one"""
+        name = {
+            SelectionMode.PLAYER_AREA: 'player_area.png',
+            SelectionMode.BANKER_AREA: 'banker_area.png',
+            SelectionMode.CANCEL_BUTTON: 'cancel_button.png',
+        }.get(self.selection_mode)
+        if self.selection_mode == SelectionMode.CHIP and getattr(self, '_pending_chip_amount', None):
+            name = f"chips/{self._pending_chip_amount}.png"
+        path = os.path.join(self.base_dir, 'assets', name) if name else None
+        return path if path and os.path.exists(path) else None
+    
+    def _hide_cursor_items(self):
+        if hasattr(self, 'mouse_canvas') and self.mouse_canvas:
+            for item in self._cursor_items:
+                self.mouse_canvas.itemconfigure(item, state='hidden')
+        if self.loupe:
+            self.loupe.stop()
+    
     def _start_area_selection(self, mode: SelectionMode):
         """Start selection for a specific area"""
         self.selection_mode = mode
@@ -555,6 +831,13 @@ class MacroInterface:
             self._create_overlay_window()
         
         if self.overlay_window:
+            if self.loupe:
+                try:
+                    # Before the overlay is visible, so a still (if needed) shows the real screen
+                    self.overlay_window.update_idletasks()
+                    self.loupe.start(self.overlay_window, self._snap_template())
+                except Exception as e:
+                    print(f"Loupe unavailable: {e}")
             self.overlay_window.deiconify()
             self.overlay_window.lift()
             self.overlay_window.focus_force()
@@ -646,6 +929,18 @@ class MacroInterface:
             self.mouse_canvas = tk.Canvas(self.overlay_window, highlightthickness=0)
             self.mouse_canvas.place(x=0, y=0, width=screen_width, height=screen_height)
             
+            # Cursor circle (50% stipple fill plus a white border), moved on motion
+            self._cursor_items = (
+                self.mouse_canvas.create_oval(0, 0, 0, 0, fill="red", stipple="gray50", state='hidden'),
+                self.mouse_canvas.create_oval(0, 0, 0, 0, outline="white", width=2, state='hidden'),
+            )
+            try:
+                from overlay_loupe import Loupe
+                self.loupe = Loupe(self.mouse_canvas)
+            except Exception as e:
+                print(f"Loupe unavailable: {e}")
+                self.loupe = None
+            
             # Ensure instruction frame is visible above canvas
             instruction_frame.lift()
             
@@ -666,11 +961,14 @@ class MacroInterface:
     def _on_overlay_click(self, event):
         """Handle click on overlay to set position"""
         x, y = event.x_root, event.y_root
+        if self.loupe and self.loupe.snap_enabled and self.loupe.snap_point:
+            # Use the centre of the template matched near the cursor
+            x, y = self.loupe.snap_point
         print(f"Position selected: ({x}, {y}) for mode: {self.selection_mode}")  # Debug
         
         # Get monitor information for the selected coordinates
         try:
-            from cv_utils import get_monitor_for_coordinates
+            from clicker import get_monitor_for_coordinates
             target_monitor = get_monitor_for_coordinates(x, y)
             monitor_info = f"Monitor: {target_monitor['left']},{target_monitor['top']} {target_monitor['width']}x{target_monitor['height']}"
             print(f"Selected position on {monitor_info}")
@@ -678,9 +976,8 @@ class MacroInterface:
             print(f"Could not determine monitor: {e}")
             monitor_info = "Monitor: Unknown"
         
-        # Clear the mouse circle
-        if hasattr(self, 'mouse_canvas') and self.mouse_canvas:
-            self.mouse_canvas.delete("mouse_circle")
+        # Hide the mouse circle and the loupe
+        self._hide_cursor_items()
         
         # Store position based on selection mode
         if self.selection_mode == SelectionMode.PLAYER_AREA:
@@ -749,6 +1046,7 @@ class MacroInterface:
             except:
                 pass
             
+            self._hide_cursor_items()
             self.overlay_window.withdraw()
             msg = messagebox.showinfo("Chip Added", f"Chip {amount} set at ({x}, {y})")
             # Bring the message box to front
@@ -760,9 +1058,8 @@ class MacroInterface:
         """Cancel overlay selection"""
         print("Canceling overlay selection")  # Debug
         
-        # Clear the mouse circle
-        if hasattr(self, 'mouse_canvas') and self.mouse_canvas:
-            self.mouse_canvas.delete("mouse_circle")
+        # Hide the mouse circle and the loupe
+        self._hide_cursor_items()
         
         # Release grab if set
         try:
@@ -863,7 +1160,7 @@ class MacroInterface:
             # Show the overlay window for position selection
             self._show_overlay_instructions()
     
-    def _on_chip_amount_changed(self, original_amount: int, amount_var: tk.StringVar):
+    def _on_chip_amount_changed(self, original_amount: int, amount_var: 'tk.StringVar'):
         """Handle chip amount changes"""
         try:
             new_amount = int(amount_var.get())
@@ -1091,53 +1388,41 @@ class MacroInterface:
                 self._cancel_configuration()
         elif event.keysym == 'F4' and event.state & 0x20000:  # Alt+F4
             self._cancel_configuration()
+        elif event.keysym in ('s', 'S') and self.loupe and self.selection_mode != SelectionMode.NONE:
+            enabled = self.loupe.toggle_snap()
+            print(f"Snap to template {'on' if enabled else 'off'}")
     
     def get_position(self, name: str) -> Optional[Position]:
         """Get a saved position by name"""
-        return self.positions.get(name)
+        return self.snapshot.positions.get(name)
     
     def get_chip_position(self, amount: int) -> Optional[Position]:
         """Get position for a specific chip amount"""
-        for chip in self.chips:
-            if chip.amount == amount:
-                return chip.position
-        return None
+        return self.snapshot.chip_index.get(amount)
     
-    def get_all_chips(self) -> List[ChipConfig]:
-        """Get all configured chips"""
-        return self.chips.copy()
+    def get_all_chips(self) -> Tuple[ChipConfig, ...]:
+        """Get all saved chips, lowest amount first"""
+        return self.snapshot.chips
     
     def is_configured(self) -> bool:
         """Check if all required positions are configured"""
-        required_positions = ['player_area', 'banker_area', 'cancel_button']
-        return all(pos in self.positions for pos in required_positions) 
+        return self.snapshot.configured
 
     def _save_configuration(self):
         """Save current configuration to file"""
         # Update chip amounts from entry fields before saving
         self._update_chip_amounts_from_entries()
         
-        # Save to file (without ensuring initial chips exist)
-        data = {
-            'positions': {name: asdict(pos) for name, pos in self.positions.items()},
-            'chips': [{'amount': chip.amount, 'position': asdict(chip.position)} for chip in self.chips]
-        }
-        
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Configuration saved successfully to {self.config_path}")
-            print(f"Saved {len(self.positions)} positions and {len(self.chips)} chips")
-            for name, pos in self.positions.items():
-                print(f"  - {name}: ({pos.x}, {pos.y})")
-            for chip in self.chips:
-                print(f"  - Chip {chip.amount}: ({chip.position.x}, {chip.position.y})")
-        except Exception as e:
-            print(f"Error saving config: {e}")
+        # Save to file (without ensuring initial chips exist); written right away
+        self._publish_snapshot()
+        self.store.save(self._config_data(), immediate=True)
         
         # Update backup to current state
         self._backup_positions = {name: Position(**asdict(pos)) for name, pos in self.positions.items()}
         self._backup_chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self.chips]
+        if self._deferred_reload is not None:
+            self._deferred_reload = None
+            print(f"Saved over the config reloaded from {self.config_path} while editing")
         
         # Close the window
         if self.selection_window:
@@ -1151,6 +1436,14 @@ class MacroInterface:
         
         # Revert chips to backup
         self.chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self._backup_chips]
+        self._publish_snapshot()
+        
+        # The file was edited outside the app while the editor was open
+        data, self._deferred_reload = self._deferred_reload, None
+        if data is not None:
+            with self.sequence_lock:
+                self._apply_config_data(data)
+            print(f"Reloaded {self.config_path}: {len(self.positions)} positions, {len(self.chips)} chips (v{self.snapshot.version})")
         
         # Close the window
         if self.selection_window:
@@ -1172,6 +1465,7 @@ class MacroInterface:
             pass
         
         # Hide overlay
+        self._hide_cursor_items()
         if self.overlay_window:
             self.overlay_window.withdraw()
             print("Overlay window hidden")  # Debug
@@ -1,32 +1,51 @@
+import time
+import startup_report
+startup_report.install()
+
+import argparse
+import atexit
 import asyncio
 import json
+import signal
 import threading
-import time
 import sys
-from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 import requests
 import websockets
-import tkinter as tk
-from tkinter import messagebox
+try:
+	import tkinter as tk
+	from tkinter import messagebox
+except ImportError:
+	# Headless agents never build a window
+	tk = messagebox = None
 import os
 from datetime import datetime, timezone
 
+import clicker
+from app_config import Config, load_config
 from macro_interface import MacroInterface, SelectionMode
 from macro_betting import MacroBaccarat
 
 
-@dataclass
-class Config:
-	controller_http: str
-	controller_ws: str
-	raw: dict
+# Templates matched once during warm-up so OpenCV's kernels and the template
+# cache are hot before the first bet (config warmup.templates overrides)
+WARM_UP_TEMPLATES = ('assets/player_area.png', 'assets/banker_area.png', 'assets/cancel_button.png')
+
+# PC slots the controller hands out per user (PC1 and PC2)
+PCS_PER_USER = 2
 
 
 class BetAutomationApp:
-	def __init__(self, cfg: Config):
+	def __init__(self, cfg: Config, headless: bool = False, macro_config: Optional[str] = None, agent_name: Optional[str] = None,
+				 mouse: Optional[clicker.MouseScheduler] = None):
 		self.cfg = cfg
+		# Shared with the other tables when one process runs several (run_tables)
+		self.mouse = mouse
+		self.headless = headless
+		self.macro_config = macro_config or 'macro_config.json'
+		self.agent_name = agent_name
+		self._stopped = threading.Event()
 		self.token: Optional[str] = None
 		self.current_user: Optional[str] = None
 		self.pc_name: Optional[str] = None
@@ -39,6 +58,19 @@ class BetAutomationApp:
 		# Macro interface - will be initialized after root is created
 		self.macro_interface = None
 		self.macro_betting = None
+
+		# Vision stack (cv2/numpy/mss) is only loaded when vision.enabled is set or
+		# something asks for it; macro betting only needs the clicker.
+		self.vision_cfg = cfg.raw.get('vision', {})
+		self.use_vision = bool(self.vision_cfg.get('enabled', False))
+		self._cv = None
+		# Warm-up and the login position check load it from their own threads
+		self._cv_lock = threading.Lock()
+		self.opencv_settings: dict = {}
+		diag = cfg.raw.get('diagnostics', {})
+		self.error_dump_dir = diag.get('dump_dir') or os.path.join(os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__)), 'bet_errors')
+		self.warm_up_timings: dict = {}
+		self._position_checker = None
 		
 		# UI refs
 		self.root = None
@@ -62,14 +94,72 @@ class BetAutomationApp:
 		self.ws_thread.start()
 		self._build_login_ui()
 
+	def start_headless(self, user: str, pwd: str) -> Optional[int]:
+		"""Log in and start the WS session without Tk; returns an exit code if that fails"""
+		self.agent_name = self.agent_name or user
+		self.macro_interface = MacroInterface(None, config_path=self.macro_config)
+		self.macro_betting = MacroBaccarat(self.macro_interface, logger=self._append_log, mouse=self.mouse, owner=self.agent_name)
+		self._watch_macro_config()
+		self._configure_bet_verification()
+		self._configure_click_pacing()
+		startup_report.uninstall()
+		self._append_log(startup_report.summary())
+		self._append_log(f"Macro config: {self.macro_interface.config_path}")
+		if not user or not pwd:
+			self._append_log('Error: username and password are required (--user / BET_USER, BET_PASSWORD)')
+			return 2
+		try:
+			ok, message = self._authenticate(user, pwd)
+		except Exception as e:
+			ok, message = False, f'Login error: {e}'
+		if not ok:
+			self._append_log(f"Login failed: {message}")
+			return 1
+		self._set_status(f'Logged in as {user}. Connecting...')
+		self._check_configuration_status()
+		self._start_warm_up()
+		self._start_position_check()
+		self.ws_thread.start()
+		self._connect_ws(user)
+		return None
+
+	def stop_headless(self):
+		self.logout()
+		self._stopped.set()
+
+	def wait_headless(self, timeout: Optional[float] = None) -> bool:
+		"""Block until the session ends; True once it has"""
+		if not self._stopped.wait(timeout):
+			return False
+		self.loop.call_soon_threadsafe(self.loop.stop)
+		return True
+
+	def run_headless(self, user: str, pwd: str) -> int:
+		"""Run the WS session and bet executor without Tk; blocks until logout or a signal"""
+		code = self.start_headless(user, pwd)
+		if code is not None:
+			return code
+
+		def stop(signum, frame):
+			self._append_log(f"Signal {signum}: logging out")
+			self.stop_headless()
+		_install_stop_handler(stop)
+		# Wake up periodically so signals are handled promptly on Windows too
+		while not self.wait_headless(0.5):
+			pass
+		return 0
+
 	def _build_login_ui(self):
 		self.root = tk.Tk()
 		self.root.title('Bet Automation - Macro Interface')
 		# Remove fixed geometry to let window size adjust to content
 
 		# Initialize macro interface after root is created
-		self.macro_interface = MacroInterface(self.root)
+		self.macro_interface = MacroInterface(self.root, config_path=self.macro_config)
 		self.macro_betting = MacroBaccarat(self.macro_interface, logger=self._append_log)
+		self._watch_macro_config()
+		self._configure_bet_verification()
+		self._configure_click_pacing()
 
 		# Main container with padding
 		main_frame = tk.Frame(self.root, padx=20, pady=20)
@@ -126,13 +216,24 @@ class BetAutomationApp:
 		y = (self.root.winfo_screenheight() // 2) - (height // 2)
 		self.root.geometry(f"{width}x{height}+{x}+{y}")
 
+		startup_report.uninstall()
+		self._append_log(startup_report.summary())
+
 		self.root.mainloop()
 
 	def _set_status(self, text: str):
+		if self.headless:
+			if text:
+				self._append_log(f"Status: {text}")
+			return
 		if self.root and self.status_label:
 			self.root.after(0, lambda: self.status_label.config(text=text))
 
 	def _append_log(self, text: str):
+		if self.headless:
+			# One line per entry so several agents can share a terminal or log file
+			print(f"{datetime.now().strftime('%H:%M:%S.%f')[:-3]} [{self.agent_name or '-'}] {text}", flush=True)
+			return
 		# Handle logging before UI is built
 		if not hasattr(self, 'root') or not self.root or not self.log_text:
 			print(f"[LOG] {text}")  # Fallback to console output
@@ -218,8 +319,9 @@ class BetAutomationApp:
 	def _check_configuration_status(self):
 		"""Check and display current configuration status"""
 		if self.macro_betting.is_configured():
-			positions = self.macro_interface.positions
-			chips = self.macro_interface.chips
+			snap = self.macro_interface.snapshot
+			positions = snap.positions
+			chips = snap.chips
 			status_text = f"Ready - {len(positions)} areas, {len(chips)} chips configured"
 			self._set_status(status_text)
 			self._append_log(f"Configuration loaded: {len(positions)} areas, {len(chips)} chips")
@@ -237,6 +339,180 @@ class BetAutomationApp:
 			self._set_status("Configuration needed - click 'Configure Positions'")
 			self._append_log("No configuration found - please configure positions")
 
+	def _watch_macro_config(self):
+		# Edits to the positions file (e.g. pushed to every PC) apply between bets without a restart
+		macro_cfg = self.cfg.raw.get('macro', {})
+		if macro_cfg.get('hot_reload', True):
+			self.macro_interface.start_watching(float(macro_cfg.get('reload_interval', 1.0)), logger=self._append_log)
+
+	def _configure_bet_verification(self):
+		# Off by default: needs the vision stack, and delays each bet by up to one capture interval
+		verify_cfg = self.cfg.raw.get('macro', {}).get('verify', {})
+		if not verify_cfg.get('enabled', False):
+			return
+		try:
+			self._vision()
+			from bet_verify import BetVerifier
+			self.macro_betting.verifier = BetVerifier(
+				roi_size=tuple(verify_cfg.get('roi', (200, 120))),
+				pixel_delta=int(verify_cfg.get('pixel_delta', 40)),
+				min_changed=float(verify_cfg.get('min_changed', 0.01)),
+				# Unset: learned from how long this table takes to draw confirmed bets
+				timeout_ms=int(verify_cfg['timeout_ms']) if verify_cfg.get('timeout_ms') else None,
+				# Most verification may add to a bet: one capture interval at 10 fps
+				budget_ms=float(verify_cfg.get('budget_ms', 100)),
+			)
+		except Exception as e:
+			self._append_log(f"Bet verification disabled: {e}")
+
+	def _configure_click_pacing(self):
+		# Off by default like verification: it watches the screen around every click
+		pacing_cfg = self.cfg.raw.get('macro', {}).get('pacing', {})
+		if not pacing_cfg.get('enabled', False):
+			return
+		try:
+			self._vision()
+			from click_pacing import ClickPacer, LatencyModel
+			model = LatencyModel(
+				initial_ms=float(pacing_cfg.get('initial_ms', 200)),
+				min_ms=float(pacing_cfg.get('min_timeout_ms', 30)),
+				max_ms=float(pacing_cfg.get('max_timeout_ms', 600)),
+			)
+			self.macro_betting.pacer = ClickPacer(model, roi_size=tuple(pacing_cfg.get('roi', (64, 64))),
+												  pixel_delta=int(pacing_cfg.get('pixel_delta', 30)),
+												  min_changed=float(pacing_cfg.get('min_changed', 0.02)),
+												  settle_ms=int(pacing_cfg.get('settle_ms', 60)),
+												  logger=self._append_log)
+		except Exception as e:
+			self._append_log(f"Click pacing disabled: {e}")
+
+	def _vision(self):
+		"""Load and configure the vision stack on first use"""
+		if self._cv is not None:
+			return self._cv
+		with self._cv_lock:
+			if self._cv is not None:
+				return self._cv
+			t0 = time.perf_counter()
+			import cv_utils
+			# Keep the last captured frames so failed bets leave screen evidence
+			cv_utils.enable_frame_ring(int(self.cfg.raw.get('diagnostics', {}).get('frame_ring', 8)), logger=self._append_log)
+			# OpenCV kernel threads / OpenCL are global settings; apply before any matching
+			self.opencv_settings = cv_utils.configure_opencv(self.vision_cfg.get('threads'), self.vision_cfg.get('opencl'))
+			self._start_capture_service()
+			self._cv = cv_utils
+			self._append_log(f"Vision stack loaded in {(time.perf_counter() - t0) * 1000:.0f} ms (OpenCV threads={self.opencv_settings['threads']} opencl={self.opencv_settings['opencl']})")
+		return self._cv
+
+	def _start_capture_service(self):
+		# Off by default: screenshot() then returns the service's latest frame, up to one tick old
+		svc_cfg = self.vision_cfg.get('capture_service', {})
+		if not svc_cfg.get('enabled', False):
+			return
+		try:
+			import capture_service
+			svc = capture_service.serve_screenshots(float(svc_cfg.get('fps', 10.0)), logger=self._append_log)
+		except Exception as e:
+			self._append_log(f"Capture service disabled: {e}")
+			return
+		# Unlinks the shared memory blocks; stop() is safe to call again
+		atexit.register(svc.stop)
+		self._append_log(f"Capture service running at {1.0 / svc.interval:g} fps")
+
+	def _start_warm_up(self):
+		if not self.cfg.raw.get('warmup', {}).get('enabled', True):
+			return
+		threading.Thread(target=self._warm_up, name='warm-up', daemon=True).start()
+
+	def _warm_up(self):
+		"""Pay the first-use costs (capture, matching kernels, plans, input) before the first bet"""
+		settings = self.cfg.raw.get('warmup', {})
+		timings = {}
+		frame = None
+
+		def step(name, fn):
+			t0 = time.perf_counter()
+			try:
+				fn()
+			except Exception as e:
+				self._append_log(f"Warm-up {name} failed: {e}")
+			timings[name] = (time.perf_counter() - t0) * 1000.0
+
+		def capture():
+			nonlocal frame
+			cv = self._vision()
+			frame = cv.screenshot()
+			cv.screenshot((0, 0, min(200, frame.shape[1]), min(200, frame.shape[0])))
+
+		def matching():
+			if frame is None:
+				return
+			cv = self._vision()
+			for path in settings.get('templates', WARM_UP_TEMPLATES):
+				tpl, alpha = cv.load_image_with_alpha(path)
+				mask = cv.template_mask(path, tpl, alpha)
+				cv.match_template_masked(frame, tpl, mask, 0.99)
+
+		def plans():
+			amounts = settings.get('amounts')
+			if amounts is None:
+				chips = [chip.amount for chip in self.macro_interface.get_all_chips()]
+				amounts = [chip * k for chip in chips for k in (1, 2, 3, 5, 10)]
+			timings['plans_composable'] = self.macro_betting.precompile_plans(amounts)
+
+		if settings.get('vision', self.use_vision):
+			step('capture', capture)
+			step('matching', matching)
+		step('plans', plans)
+		step('input', clicker.warm_input)
+		composable = timings.pop('plans_composable', 0)
+		timings['total'] = sum(timings.values())
+		self.warm_up_timings = timings
+		stages = ', '.join(f"{name} {ms:.0f}" for name, ms in timings.items() if name != 'total')
+		self._append_log(f"Warm-up done in {timings['total']:.0f} ms: {stages} ms ({composable} amounts planned)")
+
+	def _start_position_check(self):
+		macro_cfg = self.cfg.raw.get('macro', {})
+		self.macro_betting.block_failed_positions = bool(macro_cfg.get('block_failed_positions', False))
+		# Off unless the vision stack is enabled: the check loads OpenCV and captures the screen
+		if not macro_cfg.get('check_on_login', self.use_vision) or not self.macro_betting.is_configured():
+			return
+		threading.Thread(target=self.check_positions, name='position-check', daemon=True).start()
+
+	def check_positions(self) -> Optional[dict]:
+		"""Match every configured position against its template in one capture and flag the ones that fail"""
+		try:
+			cv = self._vision()
+			from position_check import PositionChecker, failed, health_score
+			if self._position_checker is None:
+				self._position_checker = PositionChecker(os.path.join(self.macro_interface.base_dir, 'assets'))
+			t0 = time.perf_counter()
+			results = self.macro_interface.check_positions(self._position_checker, cv.screenshot(), cv.monitor_geometry()[:2])
+		except Exception as e:
+			self._append_log(f"Position check failed: {e}")
+			return None
+		if results is None:
+			self._append_log('Position check: game window not found')
+			return None
+		bad = failed(results)
+		score = health_score(results)
+		self._append_log(f"Position check: health {'-' if score is None else f'{score:.0%}'} in {(time.perf_counter() - t0) * 1000:.0f} ms")
+		for name in bad:
+			self._append_log(f"  ⚠️ {results[name].describe()}")
+		if bad:
+			self._set_status(f"Check positions: {', '.join(bad)}")
+		return results
+
+	def _authenticate(self, user: str, pwd: str) -> Tuple[bool, str]:
+		"""Log in to the controller; stores the token and returns (ok, error message)"""
+		resp = requests.post(f"{self.cfg.controller_http}/api/login", json={'username': user, 'password': pwd}, timeout=10)
+		data = resp.json()
+		if not data.get('success'):
+			return False, data.get('message', 'Login failed')
+		self.token = data['token']
+		self.current_user = user
+		return True, ''
+
 	def login(self):
 		user = self.username_entry.get().strip()
 		pwd = self.password_entry.get()
@@ -244,14 +520,10 @@ class BetAutomationApp:
 			messagebox.showerror('Error', 'Enter username and password')
 			return
 		try:
-			resp = requests.post(f"{self.cfg.controller_http}/api/login", json={'username': user, 'password': pwd}, timeout=10)
-			data = resp.json()
-			if not data.get('success'):
-				messagebox.showerror('Login failed', data.get('message', 'Login failed'))
+			ok, message = self._authenticate(user, pwd)
+			if not ok:
+				messagebox.showerror('Login failed', message)
 				return
-			token = data['token']
-			self.token = token
-			self.current_user = user
 			self._set_status(f'Logged in as {user}. Connecting...')
 			self._show_login_fields(False)
 			self._show_configure_button(True)
@@ -259,6 +531,8 @@ class BetAutomationApp:
 			
 			# Check configuration status after login
 			self.root.after(100, self._check_configuration_status)
+			self.root.after(200, self._start_warm_up)
+			self.root.after(300, self._start_position_check)
 			
 			# Resize window to fit logged-in content
 			self.root.after(150, self._resize_window_for_logged_in)
@@ -295,7 +569,8 @@ class BetAutomationApp:
 		self._show_login_fields(True)
 		
 		# Resize window back to login size
-		self.root.after(100, self._resize_window_for_login)
+		if self.root:
+			self.root.after(100, self._resize_window_for_login)
 
 	def _resize_window_for_login(self):
 		"""Resize window to fit login content"""
@@ -334,7 +609,18 @@ class BetAutomationApp:
 							elif data.get('type') == 'error':
 								# Invalid token / license issues
 								self._append_log(f"Error: {data.get('message','')}")
-								self.root.after(0, lambda: messagebox.showerror('Connection error', data.get('message', 'Unknown error')))
+								if self.root:
+									self.root.after(0, lambda: messagebox.showerror('Connection error', data.get('message', 'Unknown error')))
+								break
+							elif data.get('type') == 'forceLogout':
+								# Another client took this PC slot; reconnecting would only take it back
+								reason = data.get('reason', 'Logged out by the controller')
+								self._append_log(f"Force logout: {reason}")
+								self._set_status(f'Logged out: {reason}')
+								self.keep_running = False
+								if self.root:
+									self.root.after(0, self.logout)
+									self.root.after(0, lambda: messagebox.showwarning('Logged out', reason))
 								break
 							elif data.get('type') == 'placeBet':
 								self._append_log(f"Cmd: placeBet {data.get('amount')} {data.get('side')}")
@@ -352,7 +638,9 @@ class BetAutomationApp:
 						break
 
 		# Schedule coroutine on the background event loop thread-safely
-		asyncio.run_coroutine_threadsafe(run(), self.loop)
+		future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+		# Headless agents exit once the session ends (logout or a controller error)
+		future.add_done_callback(lambda _: self._stopped.set())
 
 	async def _handle_place_bet(self, data: dict):
 		platform = data.get('platform', 'Pragmatic')
@@ -373,6 +661,18 @@ class BetAutomationApp:
 		else:
 			self._append_log(f"Bet error: {reason}")
 			await self._send_ws({'type': 'betError', 'message': self._error_message(reason), 'platform': platform, 'amount': amount, 'side': side, 'errorType': reason})
+			self._dump_bet_error(reason, amount, side)
+
+	def _dump_bet_error(self, reason: str, amount: int, side: str):
+		# Only snapshots the ring here; encoding happens on the dumper thread
+		stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+		out_dir = os.path.join(self.error_dump_dir, f"{stamp}_{reason}")
+		meta = {'errorType': reason, 'amount': amount, 'side': side, 'pc': self.pc_name}
+		if self._cv is None:
+			# Nothing captured frames, so there is no evidence to write
+			return
+		if self._cv.dump_frame_ring(out_dir, meta):
+			self._append_log(f"Saving screen frames for {reason} to {out_dir}")
 
 	async def _handle_cancel_bet(self):
 		# Use macro-based cancel only
@@ -413,24 +713,89 @@ class BetAutomationApp:
 			'chip_not_found': 'Chip position not found in configuration',
 			'cancel_button_not_configured': 'Cancel button position not configured',
 			'no_chips_configured': 'No chips are configured. Please configure at least one chip position.',
+			'window_not_found': 'Game window not found. Make sure the table window is open and not minimized.',
+			'bet_not_confirmed': 'Clicks were sent but no chips appeared on the bet area.',
+			'position_check_failed': 'A position this bet needs failed the position check. Reconfigure it or run the check again.',
 		}.get(code, code)
 
 
-def load_config() -> Config:
-    server_config = {
-        'controller': {
-            'http_url': 'https://absolutely-stirring-racer.ngrok-free.app',
-            'ws_url': 'wss://quality-crappie-painfully.ngrok-free.app'
-        }
-    }
-    return Config(
-        controller_http=server_config['controller']['http_url'],
-        controller_ws=server_config['controller']['ws_url'],
-        raw=server_config
-    )
+def _install_stop_handler(handler):
+	signal.signal(signal.SIGINT, handler)
+	if hasattr(signal, 'SIGTERM'):
+		signal.signal(signal.SIGTERM, handler)
+
+
+def run_tables(cfg: Config, path: str) -> int:
+	"""Run one headless session per table profile in this process, sharing the mouse.
+
+	The profile file lists the tables:
+	    {"tables": [{"name": "t1", "macro_config": "t1.json", "user": "...", "password_env": "BET_PASSWORD_T1"}]}
+	Each table logs in and registers with the controller on its own, so it
+	gets its own PC assignment. user and password_env default to BET_USER
+	and BET_PASSWORD. The controller gives each user PC1 and PC2 only, and a
+	third login force-logs-out the oldest, so at most PCS_PER_USER tables
+	may share a user. Planning, vision and the websocket for each table run
+	on that table's threads. Only the clicks wait for the shared mouse.
+	"""
+	with open(path, 'r') as f:
+		tables = json.load(f)['tables']
+	users = [table.get('user') or os.environ.get('BET_USER') for table in tables]
+	crowded = sorted({u for u in users if users.count(u) > PCS_PER_USER}, key=str)
+	if crowded:
+		print(f"Too many tables for {', '.join(map(str, crowded))}: the controller has {PCS_PER_USER} PC slots per user; give the other tables their own user", flush=True)
+		return 2
+	mouse = clicker.MouseScheduler(**cfg.raw.get('mouse', {})).start()
+	apps = []
+	for i, table in enumerate(tables):
+		name = table.get('name') or f"table{i + 1}"
+		app = BetAutomationApp(cfg, headless=True, macro_config=table.get('macro_config') or f"{name}.json", agent_name=name, mouse=mouse)
+		code = app.start_headless(users[i], os.environ.get(table.get('password_env', 'BET_PASSWORD')))
+		if code is not None:
+			app._append_log(f"Table not started (exit code {code})")
+			continue
+		apps.append(app)
+	if not apps:
+		mouse.close()
+		return 1
+
+	def stop(signum, frame):
+		for app in apps:
+			app._append_log(f"Signal {signum}: logging out")
+			app.stop_headless()
+	_install_stop_handler(stop)
+	pending = list(apps)
+	while pending:
+		pending = [app for app in pending if not app.wait_headless(0.5)]
+	print(f"Mouse: {mouse.stats()}", flush=True)
+	mouse.close()
+	return 0
 
 
 if __name__ == '__main__':
+	# Vision pool workers are spawned; frozen builds need this to re-enter as a worker
+	import multiprocessing
+	multiprocessing.freeze_support()
+	parser = argparse.ArgumentParser(description='Bet automation desktop agent')
+	parser.add_argument('--headless', action='store_true', default=os.environ.get('BET_HEADLESS') == '1',
+						help='run the session without a window (env BET_HEADLESS=1)')
+	parser.add_argument('--user', default=os.environ.get('BET_USER'), help='login for headless mode (env BET_USER)')
+	parser.add_argument('--password-file', help='read the password from this file instead of env BET_PASSWORD')
+	parser.add_argument('--macro-config', default=os.environ.get('BET_MACRO_CONFIG'),
+						help='positions file, relative to the app folder (env BET_MACRO_CONFIG)')
+	parser.add_argument('--name', default=os.environ.get('BET_AGENT_NAME'), help='log prefix for this agent (env BET_AGENT_NAME)')
+	parser.add_argument('--tables', default=os.environ.get('BET_TABLES'),
+						help='run several headless table sessions from this profile file (env BET_TABLES)')
+	args = parser.parse_args()
 	cfg = load_config()
-	app = BetAutomationApp(cfg)
+	if args.tables:
+		sys.exit(run_tables(cfg, args.tables))
+	if not args.headless and tk is None:
+		parser.error('tkinter is not installed; run with --headless (or BET_HEADLESS=1), or install tkinter for the window')
+	app = BetAutomationApp(cfg, headless=args.headless, macro_config=args.macro_config, agent_name=args.name)
+	if args.headless:
+		password = os.environ.get('BET_PASSWORD')
+		if args.password_file:
+			with open(args.password_file, 'r') as f:
+				password = f.read().strip()
+		sys.exit(app.run_headless(args.user, password))
 	app.start() 
\ No newline at end of file
@@ -0,0 +1,193 @@
+import sys
+import time
+from typing import Optional, Tuple
+
+import tkinter as tk
+
+# Magnifier for the position-selection overlay. It shows the pixels under the
+# cursor, zoomed, next to it. One mss session is kept open while the overlay
+# is up, and the canvas items and images are created once and only moved or
+# refilled. Renders are capped at `fps`, however fast motion events arrive.
+# Where Windows can exclude the overlay from capture, the live screen is
+# shown. Otherwise the loupe crops from a still taken just before the overlay
+# appeared, because a live grab would show the dimmed overlay instead.
+
+WDA_EXCLUDEFROMCAPTURE = 0x11
+
+
+def _exclude_from_capture(window: tk.Misc) -> bool:
+    if sys.platform != 'win32':
+        return False
+    try:
+        import ctypes
+        hwnd = int(window.wm_frame(), 16)
+        return bool(ctypes.windll.user32.SetWindowDisplayAffinity(hwnd, WDA_EXCLUDEFROMCAPTURE))
+    except Exception:
+        return False
+
+
+def bgra_to_ppm(bgra: bytes, width: int, height: int) -> bytes:
+    # Binary PPM is the one format Tk's PhotoImage reads without Pillow
+    rgb = bytearray(width * height * 3)
+    rgb[0::3] = bgra[2::4]
+    rgb[1::3] = bgra[1::4]
+    rgb[2::3] = bgra[0::4]
+    return b'P6 %d %d 255\n' % (width, height) + bytes(rgb)
+
+
+def crop_bgra(bgra: bytes, stride_px: int, x: int, y: int, width: int, height: int) -> bytes:
+    rows = [bgra[((y + r) * stride_px + x) * 4:((y + r) * stride_px + x + width) * 4] for r in range(height)]
+    return b''.join(rows)
+
+
+class Loupe:
+    def __init__(self, canvas: tk.Canvas, radius: int = 20, zoom: int = 6, fps: int = 30, offset: int = 32):
+        self.canvas = canvas
+        self.radius = radius
+        self.zoom = zoom
+        self.interval = 1.0 / fps
+        self.offset = offset
+        self.size = 2 * radius + 1
+        self._src = tk.PhotoImage(master=canvas, width=self.size, height=self.size)
+        self._img = tk.PhotoImage(master=canvas, width=self.size * zoom, height=self.size * zoom)
+        self._image_item = canvas.create_image(0, 0, image=self._img, anchor='nw', state='hidden')
+        self._border = canvas.create_rectangle(0, 0, 0, 0, outline='white', width=2, state='hidden')
+        self._cross = canvas.create_rectangle(0, 0, 0, 0, outline='red', width=1, state='hidden')
+        self._snap_item = canvas.create_rectangle(0, 0, 0, 0, outline='lime', width=3, state='hidden')
+        self._sct = None
+        self._bounds: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self._still = None
+        self._pos: Optional[Tuple[int, int, int, int]] = None
+        self._after: Optional[str] = None
+        self._last = 0.0
+        # Snapping: a template matched around the cursor once it rests
+        self.snap_enabled = False
+        self.snap_threshold = 0.75
+        self.snap_margin = 24
+        # Larger templates (the 1000 px chip art) are not drawn at that size on screen
+        self.snap_max_size = 400
+        self.snap_point: Optional[Tuple[int, int]] = None
+        self._template_path: Optional[str] = None
+        self._template = None
+        self._snap_checked: Optional[Tuple[int, int]] = None
+        self.frames = 0
+
+    def start(self, overlay: tk.Misc, template_path: Optional[str] = None) -> None:
+        """Open the capture session; call before the overlay is shown"""
+        import mss
+        self.stop()
+        self._sct = mss.mss()
+        virtual = self._sct.monitors[0]
+        self._bounds = (virtual['left'], virtual['top'], virtual['width'], virtual['height'])
+        self._still = None if _exclude_from_capture(overlay) else self._sct.grab(self._sct.monitors[0])
+        # Loaded on the first snap, so the vision stack stays unloaded unless snapping is used
+        self._template_path = template_path
+        self._template = None
+        self.snap_point = None
+        self._snap_checked = None
+
+    def stop(self) -> None:
+        if self._after is not None:
+            self.canvas.after_cancel(self._after)
+            self._after = None
+        for item in (self._image_item, self._border, self._cross, self._snap_item):
+            self.canvas.itemconfigure(item, state='hidden')
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+        self._still = None
+        self._pos = None
+
+    def move(self, x_root: int, y_root: int, canvas_x: int, canvas_y: int) -> None:
+        """Record the cursor; the next render happens at most once per frame interval"""
+        self._pos = (x_root, y_root, canvas_x, canvas_y)
+        if self._after is None and self._sct is not None:
+            delay = max(0, int((self._last + self.interval - time.perf_counter()) * 1000))
+            self._after = self.canvas.after(delay, self._render)
+
+    def toggle_snap(self) -> bool:
+        self.snap_enabled = not self.snap_enabled
+        self.snap_point = None
+        self._snap_checked = None
+        if not self.snap_enabled:
+            self.canvas.itemconfigure(self._snap_item, state='hidden')
+        return self.snap_enabled
+
+    def _region(self, x: int, y: int, half: int) -> Tuple[int, int, int, int]:
+        # Square around (x, y) kept inside the virtual screen
+        left, top, width, height = self._bounds
+        size = 2 * half + 1
+        gx = min(max(x - half, left), left + width - size)
+        gy = min(max(y - half, top), top + height - size)
+        return gx, gy, size, size
+
+    def _grab(self, region: Tuple[int, int, int, int]) -> bytes:
+        gx, gy, w, h = region
+        if self._still is not None:
+            left, top = self._bounds[:2]
+            return crop_bgra(self._still.raw, self._still.width, gx - left, gy - top, w, h)
+        return self._sct.grab({'left': gx, 'top': gy, 'width': w, 'height': h}).raw
+
+    def _render(self) -> None:
+        self._after = None
+        if self._pos is None or self._sct is None:
+            return
+        self._last = time.perf_counter()
+        x, y, cx, cy = self._pos
+        region = self._region(x, y, self.radius)
+        try:
+            bgra = self._grab(region)
+        except Exception as e:
+            print(f"Loupe capture failed: {e}")
+            return
+        self._src.configure(data=bgra_to_ppm(bgra, self.size, self.size), format='PPM')
+        self._img.tk.call(self._img, 'copy', self._src, '-zoom', self.zoom, self.zoom)
+        self.frames += 1
+
+        # Beside the cursor, flipped to the other side near the screen edges
+        span = self.size * self.zoom
+        cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+        lx = cx + self.offset if cx + self.offset + span < cw else cx - self.offset - span
+        ly = cy + self.offset if cy + self.offset + span < ch else cy - self.offset - span
+        self.canvas.coords(self._image_item, lx, ly)
+        self.canvas.coords(self._border, lx, ly, lx + span, ly + span)
+        # The magnified cursor pixel (off centre when the region was clamped at an edge)
+        px, py = lx + (x - region[0]) * self.zoom, ly + (y - region[1]) * self.zoom
+        self.canvas.coords(self._cross, px, py, px + self.zoom, py + self.zoom)
+        for item in (self._image_item, self._border, self._cross):
+            self.canvas.itemconfigure(item, state='normal')
+            self.canvas.tag_raise(item)
+        if self.snap_enabled:
+            self._update_snap(x, y, x - cx, y - cy)
+
+    def _update_snap(self, x: int, y: int, dx: int, dy: int) -> None:
+        if self._template_path is None or self._snap_checked == (x, y):
+            return
+        self._snap_checked = (x, y)
+        import numpy as np
+        import cv_utils
+        if self._template is None:
+            try:
+                tpl, alpha = cv_utils.load_image_with_alpha(self._template_path)
+                self._template = (tpl, cv_utils.template_mask(self._template_path, tpl, alpha))
+            except Exception as e:
+                print(f"Loupe: cannot snap to {self._template_path}: {e}")
+                self._template_path = None
+                return
+        tpl, mask = self._template
+        th, tw = tpl.shape[:2]
+        half = max(th, tw) // 2 + self.snap_margin
+        if max(th, tw) > self.snap_max_size or 2 * half + 1 > min(self._bounds[2], self._bounds[3]):
+            return
+        region = self._region(x, y, half)
+        frame = np.frombuffer(self._grab(region), dtype=np.uint8).reshape(region[3], region[2], 4)[:, :, :3]
+        hit = cv_utils.match_template_masked(np.ascontiguousarray(frame), tpl, mask, self.snap_threshold)
+        if hit is None:
+            self.snap_point = None
+            self.canvas.itemconfigure(self._snap_item, state='hidden')
+            return
+        hx, hy, hw, hh = hit[0] + region[0], hit[1] + region[1], hit[2], hit[3]
+        self.snap_point = (hx + hw // 2, hy + hh // 2)
+        self.canvas.coords(self._snap_item, hx - dx, hy - dy, hx + hw - dx, hy + hh - dy)
+        self.canvas.itemconfigure(self._snap_item, state='normal')
+        self.canvas.tag_raise(self._snap_item)
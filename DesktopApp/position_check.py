@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Position health check: is each configured macro position still on its item?
+
+The macro path clicks stored screen points without looking. This takes one
+capture and, for every configured position with a bundled template, matches
+that template only in a small patch around the click point (a template's
+size plus a margin each way, at a few scales). The health score is the
+zero-mean masked correlation of the best match (layout_detect), and a
+position only passes when the match also covers the click point. Run at
+login, from the editor's "Check Positions" button, or standalone:
+
+    python position_check.py                       # capture, check macro_config.json
+    python position_check.py --image table.png --config t1.json
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+import cv_utils
+from layout_detect import bundled_templates, masked_correlation, scales_for
+
+# Scores below this fail. Lower than layout_detect.MIN_SCORE: the search is
+# confined to the patch around the stored point, so look-alikes elsewhere on
+# the table cannot win, and a disabled (dimmed) chip between rounds still
+# correlates well.
+HEALTH_MIN = 0.7
+# Extra search room around the template, in pixels; reports how far an item moved
+PATCH_MARGIN = 16
+
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class PositionHealth:
+	name: str  # position name, or 'chip:<amount>'
+	point: Tuple[int, int]  # screen click point that was checked
+	score: Optional[float]  # None when there is nothing to check against
+	status: str  # ok, low_score, moved, off_screen, no_template
+	offset: Optional[Tuple[int, int]] = None  # matched centre minus the click point
+	elapsed_ms: float = 0.0
+
+	@property
+	def ok(self) -> bool:
+		return self.status in ('ok', 'no_template')
+
+	def describe(self) -> str:
+		score = '  -  ' if self.score is None else f"{self.score:.3f}"
+		extra = f" (item found {self.offset[0]:+d},{self.offset[1]:+d} px away)" if self.status == 'moved' else ''
+		return f"{self.name:<16} {score} {self.status}{extra}"
+
+
+class PositionChecker:
+	"""Checks click points against the bundled templates; scaled templates are kept between checks"""
+
+	def __init__(self, asset_dir: str, min_score: float = HEALTH_MIN, margin: int = PATCH_MARGIN):
+		self.asset_dir = asset_dir
+		self.min_score = min_score
+		self.margin = margin
+		self.templates = bundled_templates(asset_dir)
+		self._pyramids: Dict[str, Dict[float, Tuple[np.ndarray, Optional[np.ndarray]]]] = {}
+
+	def _pyramid(self, path: str) -> Dict[float, Tuple[np.ndarray, Optional[np.ndarray]]]:
+		pyramid = self._pyramids.get(path)
+		if pyramid is None:
+			tpl, alpha = cv_utils.load_image_with_alpha(path)
+			mask = cv_utils.template_mask(path, tpl, alpha)
+			pyramid = self._pyramids[path] = cv_utils.template_pyramid(path, tpl, mask, scales_for(tpl.shape))
+		return pyramid
+
+	def check_point(self, frame: np.ndarray, name: str, point: Tuple[int, int], origin: Tuple[int, int] = (0, 0)) -> PositionHealth:
+		t0 = time.perf_counter()
+		paths = self.templates.get(name)
+		if not paths:
+			return PositionHealth(name, point, None, 'no_template')
+		# Frames cover the selected monitor; points are screen coordinates
+		px, py = point[0] - origin[0], point[1] - origin[1]
+		ih, iw = frame.shape[:2]
+		if not (0 <= px < iw and 0 <= py < ih):
+			return PositionHealth(name, point, 0.0, 'off_screen', elapsed_ms=(time.perf_counter() - t0) * 1000.0)
+		best = None
+		for path in paths:
+			for tpl, mask in self._pyramid(path).values():
+				th, tw = tpl.shape[:2]
+				m = self.margin
+				roi = cv_utils.clip_region((px - tw - m, py - th - m, 2 * (tw + m), 2 * (th + m)), frame.shape)
+				if roi is None:
+					continue
+				rx, ry, rw, rh = roi
+				hit = cv_utils.match_template_masked(frame[ry:ry + rh, rx:rx + rw], tpl, mask, 0.0)
+				if hit is None:
+					continue
+				x, y = hit[0] + rx, hit[1] + ry
+				score = masked_correlation(frame[y:y + th, x:x + tw], tpl, mask)
+				if best is None or score > best[0]:
+					best = (score, (x, y, tw, th))
+		elapsed = (time.perf_counter() - t0) * 1000.0
+		if best is None:
+			return PositionHealth(name, point, 0.0, 'low_score', elapsed_ms=elapsed)
+		score, (x, y, w, h) = best
+		offset = (x + w // 2 - px, y + h // 2 - py)
+		if score < self.min_score:
+			status = 'low_score'
+		elif not (x <= px < x + w and y <= py < y + h):
+			status = 'moved'
+		else:
+			status = 'ok'
+		return PositionHealth(name, point, round(score, 4), status, offset, elapsed)
+
+	def check(self, frame: np.ndarray, boxes: Mapping[str, Box], chip_boxes: Mapping[int, Box],
+			  origin: Tuple[int, int] = (0, 0)) -> Dict[str, PositionHealth]:
+		"""Health per position for click boxes as returned by MacroInterface.click_boxes()"""
+		points = {name: box[:2] for name, box in boxes.items()}
+		points.update({f"chip:{amount}": box[:2] for amount, box in chip_boxes.items()})
+		return {name: self.check_point(frame, name, point, origin) for name, point in points.items()}
+
+
+def health_score(results: Mapping[str, PositionHealth]) -> Optional[float]:
+	"""Fraction of checkable positions that pass; None when nothing could be checked"""
+	checked = [r for r in results.values() if r.status != 'no_template']
+	if not checked:
+		return None
+	return sum(1 for r in checked if r.ok) / len(checked)
+
+
+def failed(results: Mapping[str, PositionHealth]) -> List[str]:
+	return [name for name, r in results.items() if not r.ok]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	base = os.path.dirname(os.path.abspath(__file__))
+	parser.add_argument('--image', help='check against a saved screenshot instead of capturing')
+	parser.add_argument('--config', default='macro_config.json')
+	parser.add_argument('--assets', default=os.path.join(base, 'assets'))
+	parser.add_argument('--min-score', type=float, default=HEALTH_MIN)
+	args = parser.parse_args(argv)
+	from macro_interface import MacroInterface
+	macro = MacroInterface(None, config_path=args.config)
+	t0 = time.perf_counter()
+	if args.image:
+		frame, origin = cv_utils.load_image(args.image), (0, 0)
+	else:
+		frame, origin = cv_utils.screenshot(), cv_utils.monitor_geometry()[:2]
+	results = macro.check_positions(PositionChecker(args.assets, args.min_score), frame, origin)
+	total_ms = (time.perf_counter() - t0) * 1000.0
+	if results is None:
+		print('⚠️ Game window not found')
+		return 1
+	for r in results.values():
+		print(('✓ ' if r.ok else '⚠️ ') + r.describe())
+	score = health_score(results)
+	print(f"\nHealth {'-' if score is None else f'{score:.0%}'} ({len(results)} positions in {total_ms:.0f} ms)")
+	return 0 if not failed(results) else 1
+
+
+if __name__ == '__main__':
+	sys.exit(main())
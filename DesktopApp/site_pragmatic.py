@@ -1,8 +1,12 @@
-import time
 from typing import Dict, List, Optional, Tuple, Callable
 import cv2
 import numpy as np
-from cv_utils import screenshot, load_image, load_image_with_alpha, match_template, match_template_masked, click_center, find_any, build_nonwhite_mask, match_template_multiscale_masked, bottom_roi
+from cv_utils import screenshot, pause, annotate_frame, load_image, load_image_with_alpha, match_template, match_template_masked, click_center, find_any, build_nonwhite_mask, match_template_multiscale_masked, bottom_roi, PrefilterCascade, AnchorLocator, get_template, FastTemplate, match_template_fast, template_mask, fast_template
+
+# classify_screen() results
+SCREEN_WRONG_TAB = 'wrong_tab'
+SCREEN_BETTING_CLOSED = 'not_betting_time'
+SCREEN_BETTING_OPEN = 'betting_open'
 
 class PragmaticBaccarat:
 	def __init__(self, config: Dict, logger: Optional[Callable[[str], None]] = None):
@@ -10,6 +14,8 @@ class PragmaticBaccarat:
 		self.threshold = float(self.cfg['templates'].get('match_threshold', 0.8))
 		self.max_search_ms = int(self.cfg['templates'].get('max_search_time_ms', 5000))
 		self.logger = logger
+		# Optional click_pacing.ClickPacer; without it clicks are followed by fixed pauses
+		self.pacer = None
 		
 		# Preload templates with alpha if present
 		self.player_tpl_bgr = None
@@ -18,69 +24,232 @@ class PragmaticBaccarat:
 		self.banker_alpha = None
 		
 		try:
-		self.player_tpl_bgr, self.player_alpha = load_image_with_alpha(self.cfg['templates']['player_area'])
+			self.player_tpl_bgr, self.player_alpha = load_image_with_alpha(self.cfg['templates']['player_area'])
 		except Exception as e:
 			if self.logger:
 				self.logger(f"Player area template missing: {self.cfg['templates']['player_area']} - {e}")
 		
 		try:
-		self.banker_tpl_bgr, self.banker_alpha = load_image_with_alpha(self.cfg['templates']['banker_area'])
+			self.banker_tpl_bgr, self.banker_alpha = load_image_with_alpha(self.cfg['templates']['banker_area'])
 		except Exception as e:
 			if self.logger:
 				self.logger(f"Banker area template missing: {self.cfg['templates']['banker_area']} - {e}")
 		
+		# Masks and prefilter cascades are fixed per template, so build them once
+		prefilter_cfg = self.cfg['templates'].get('prefilter', {})
+		self.prefilter_stages = tuple(prefilter_cfg.get('stages', PrefilterCascade.STAGES))
+		self.prefilter_colour_ratio = float(prefilter_cfg.get('colour_ratio', 0.25))
+		self.prefilter_edge_ratio = float(prefilter_cfg.get('edge_ratio', 0.3))
+		self.area_masks: Dict[str, np.ndarray] = {}
+		self.area_prefilters: Dict[str, PrefilterCascade] = {}
+		for side, tpl, alpha in (('Player', self.player_tpl_bgr, self.player_alpha), ('Banker', self.banker_tpl_bgr, self.banker_alpha)):
+			if tpl is None:
+				continue
+			mask = template_mask(self.cfg['templates'][self._area_key(side)], tpl, alpha)
+			self.area_masks[side] = mask
+			self.area_prefilters[side] = self._make_prefilter(tpl, mask)
+		
 		self.chip_map: Dict[int, np.ndarray] = {}
+		self.chip_masks: Dict[int, np.ndarray] = {}
+		self.chip_prefilters: Dict[int, PrefilterCascade] = {}
+		self.chip_paths: Dict[int, str] = {}
 		for val_str, path in self.cfg['templates']['chips'].items():
 			try:
-				self.chip_map[int(val_str)] = load_image(path)
+				tpl, alpha = load_image_with_alpha(path)
 			except Exception as e:
 				if self.logger:
 					self.logger(f"Chip template missing or unreadable: {path} - {e}")
+				continue
+			val = int(val_str)
+			self.chip_map[val] = tpl
+			self.chip_paths[val] = path
+			self.chip_masks[val] = template_mask(path, tpl, alpha)
+			self.chip_prefilters[val] = self._make_prefilter(tpl, self.chip_masks[val])
+
+		# Optional grayscale/half-resolution matching with full-colour escalation
+		self.fast_mode = bool(self.cfg['templates'].get('fast_mode', False))
+		self.fast_band = float(self.cfg['templates'].get('fast_band', 0.08))
+		self.fast_templates: Dict[str, FastTemplate] = {}
+		if self.fast_mode:
+			for side, mask in self.area_masks.items():
+				self.fast_templates[side] = fast_template(self.cfg['templates'][self._area_key(side)], self._area_template(side), mask)
+			for val, tpl in self.chip_map.items():
+				self.fast_templates[f"chip:{val}"] = fast_template(self.chip_paths[val], tpl, self.chip_masks[val])
+
+		# Optional anchor: find the table once, then search every other
+		# template in a small ROI relative to it (templates.anchor / templates.rois)
+		self.anchor: Optional[AnchorLocator] = None
+		anchor_path = self.cfg['templates'].get('anchor')
+		if anchor_path:
+			try:
+				anchor_bgr, anchor_alpha = load_image_with_alpha(anchor_path)
+				rois = {name: tuple(r) for name, r in self.cfg['templates'].get('rois', {}).items()}
+				self.anchor = AnchorLocator(anchor_bgr, anchor_alpha, self.threshold, rois=rois)
+			except Exception as e:
+				self.log(f"Anchor template missing: {anchor_path} - {e}")
+
+		# Optional out-of-process matching (vision_pool.VisionPool, see attach_pool)
+		self.pool = None
+		self.template_paths: Dict[str, str] = {side: self.cfg['templates'][self._area_key(side)] for side in self.area_masks}
+		self.template_paths.update({f"chip:{val}": path for val, path in self.chip_paths.items()})
+
+	def attach_pool(self, pool) -> None:
+		# Matching then runs in the pool's worker processes; prefilters and the
+		# anchor stay local. Pass None to match in-process again.
+		self.pool = pool
+
+	def _make_prefilter(self, tpl: np.ndarray, mask: Optional[np.ndarray]) -> PrefilterCascade:
+		return PrefilterCascade(tpl, mask, stages=self.prefilter_stages, colour_ratio=self.prefilter_colour_ratio, edge_ratio=self.prefilter_edge_ratio)
+
+	def prefilter_report(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+		# Per-template, per-stage rejection counts since startup
+		report = {f"area:{side}": pf.report() for side, pf in self.area_prefilters.items()}
+		report.update({f"chip:{val}": pf.report() for val, pf in self.chip_prefilters.items()})
+		return report
 
 	def log(self, msg: str) -> None:
 		if self.logger:
 			self.logger(msg)
 
-	def find_bet_area(self, side: str) -> Optional[Tuple[int, int, int, int, float]]:
-		img = screenshot()
-		if side == 'Player':
-			tpl = self.player_tpl_bgr
-			alpha = self.player_alpha
-		else:
-			tpl = self.banker_tpl_bgr
-			alpha = self.banker_alpha
+	def _click(self, box: Tuple[int, int, int, int], seconds: float) -> None:
+		# Click, then wait for the table to show it (paced) or for `seconds`
+		if self.pacer is not None:
+			self.pacer.click(box, seconds)
+			return
+		click_center(box)
+		if seconds:
+			pause(seconds)
+
+	@staticmethod
+	def _area_key(side: str) -> str:
+		return 'player_area' if side == 'Player' else 'banker_area'
+
+	def _area_template(self, side: str) -> Optional[np.ndarray]:
+		return self.player_tpl_bgr if side == 'Player' else self.banker_tpl_bgr
+
+	def _match(self, img: np.ndarray, key: str, tpl: np.ndarray, mask: Optional[np.ndarray], prefilter: Optional[PrefilterCascade] = None) -> Optional[Tuple[int, int, int, int, float]]:
+		if self.pool is not None and key in self.template_paths:
+			if prefilter is not None and not prefilter.accept(img):
+				return None
+			mode = 'fast' if key in self.fast_templates else 'masked'
+			try:
+				res = self.pool.match(img, self.template_paths[key], self.threshold, mode, self.fast_band).result(timeout=self.max_search_ms / 1000.0)
+				return tuple(res) if res is not None else None
+			except Exception as e:
+				self.log(f"Vision pool match failed for {key}, matching locally: {e}")
+			prefilter = None
+		fast = self.fast_templates.get(key)
+		if fast is not None:
+			return match_template_fast(img, fast, self.threshold, band=self.fast_band, prefilter=prefilter)
+		return match_template_masked(img, tpl, mask, self.threshold, prefilter=prefilter)
+
+	def _locate_anchor(self, frame: np.ndarray) -> bool:
+		# True when searches may proceed (no anchor configured, or anchor found)
+		if self.anchor is None:
+			return True
+		return self.anchor.locate(frame) is not None
+
+	def _search(self, frame: np.ndarray, key: str, match: Callable[[np.ndarray], Optional[Tuple[int, int, int, int, float]]], fallback: Optional[Callable[[np.ndarray], Tuple[np.ndarray, int, int]]] = None) -> Optional[Tuple[int, int, int, int, float]]:
+		# Match in the anchor-relative ROI for key when one is known; otherwise
+		# search fallback(frame) (whole frame by default) and learn the ROI.
+		anchored = self.anchor is not None and self.anchor.box is not None
+		if anchored and self.anchor.has_roi(key):
+			crop = self.anchor.crop(frame, key)
+			res = match(crop[0]) if crop is not None else None
+			if res is not None:
+				self.anchor.hit(key)
+				img, x0, y0 = crop
+				box = (res[0] + x0, res[1] + y0, res[2], res[3], res[4])
+				annotate_frame(key, box, box[4])
+				return box
+			# Usually the target is hidden (one side dims while betting is closed).
+			# After a few misses in a row the layout may have shifted inside the
+			# table, or the ROI was learned from a wrong hit: look in the whole
+			# fallback region, keeping the ROI unless that finds it elsewhere.
+			if not self.anchor.missed(key):
+				annotate_frame(key, None)
+				return None
+		img, x0, y0 = fallback(frame) if fallback else (frame, 0, 0)
+		res = match(img)
+		if res is None:
+			annotate_frame(key, None)
+			return None
+		box = (res[0] + x0, res[1] + y0, res[2], res[3], res[4])
+		annotate_frame(key, box, box[4])
+		if anchored:
+			self.anchor.learn(key, box)
+		return box
+
+	def find_bet_area(self, side: str, frame: Optional[np.ndarray] = None) -> Optional[Tuple[int, int, int, int, float]]:
+		img = frame if frame is not None else screenshot()
+		tpl = self._area_template(side)
 		
 		# Check if template is available
 		if tpl is None:
 			self.log(f"Bet area '{side}' template not loaded")
 			return None
 		
-		# Build mask: prefer embedded alpha; otherwise ignore near-white
-		mask = alpha if alpha is not None else build_nonwhite_mask(tpl)
-		res = match_template_masked(img, tpl, mask, self.threshold)
+		# Mask: embedded alpha if present, otherwise ignore near-white (built in __init__)
+		mask = self.area_masks[side]
+		res = self._search(img, side, lambda roi: self._match(roi, side, tpl, mask))
 		if res:
 			self.log(f"Bet area '{side}' found at ({res[0]},{res[1]}) score={res[4]:.3f}")
 		else:
 			self.log(f"Bet area '{side}' NOT found (masked, threshold={self.threshold})")
 		return res
 
+	def _find_chip(self, val: int, frame: np.ndarray) -> Optional[Tuple[int, int, int, int, float]]:
+		# Chips sit in the bottom half; same masked logic as the bet areas
+		tpl = self.chip_map[val]
+		mask = self.chip_masks[val]
+		prefilter = self.chip_prefilters[val]
+		def _bottom(img: np.ndarray) -> Tuple[np.ndarray, int, int]:
+			roi, y_offset = bottom_roi(img, bottom_ratio=0.5)
+			return roi, 0, y_offset
+		key = f"chip:{val}"
+		return self._search(frame, key, lambda roi: self._match(roi, key, tpl, mask, prefilter), _bottom)
+
+	def _table_possible(self, frame: np.ndarray) -> bool:
+		# Cheap first stage: if neither bet area's cascade accepts the frame,
+		# no amount of matching would find the table on it.
+		if not self.area_prefilters:
+			return True
+		return any(pf.accept(frame) for pf in self.area_prefilters.values())
+
+	def classify_screen(self, frame: np.ndarray) -> Tuple[str, Dict[str, Optional[Tuple[int, int, int, int, float]]]]:
+		"""Decide wrong tab / betting closed / betting open from one capture.
+
+		Returns the state and the bet-area boxes found along the way, so the
+		caller can click without searching again.
+		"""
+		areas: Dict[str, Optional[Tuple[int, int, int, int, float]]] = {'Player': None, 'Banker': None}
+		if not self._table_possible(frame):
+			self.log("Screen: rejected by prefilter (no table visible)")
+			return SCREEN_WRONG_TAB, areas
+		if not self._locate_anchor(frame):
+			self.log("Screen: table anchor not found")
+			return SCREEN_WRONG_TAB, areas
+		for side in ('Player', 'Banker'):
+			areas[side] = self.find_bet_area(side, frame)
+		found = sum(1 for box in areas.values() if box)
+		if found == 0:
+			return SCREEN_WRONG_TAB, areas
+		if found == 1:
+			# Table is visible but one side is dimmed/covered: betting closed
+			return SCREEN_BETTING_CLOSED, areas
+		return SCREEN_BETTING_OPEN, areas
+
 	def find_best_chip(self, amount: int) -> Optional[Tuple[int, Tuple[int, int, int, int, float]]]:
 		# Only try to find the exact chip for the requested amount (no pre-scan)
 		tpl = self.chip_map.get(amount)
 		if tpl is None:
 			self.log(f"Chip template not configured for amount {amount}")
 			return None
-		img_full = screenshot()
-		img_roi, y_offset = bottom_roi(img_full, bottom_ratio=0.5)
-		# Use same logic as bet area finding - build mask to ignore near-white
-		mask = build_nonwhite_mask(tpl)
-		res = match_template_masked(img_roi, tpl, mask, self.threshold)
+		res = self._find_chip(amount, screenshot())
 		if res is None:
 			return None
-		x, y, w, h, score = res
-		y_full = y + y_offset
-		self.log(f"Exact chip candidate {amount} at ({x},{y_full}) score={score:.3f}")
-		return amount, (x, y_full, w, h, score)
+		self.log(f"Exact chip candidate {amount} at ({res[0]},{res[1]}) score={res[4]:.3f}")
+		return amount, res
 
 	def compose_amount(self, target: int) -> Optional[List[int]]:
 		available = sorted(list(self.chip_map.keys()), reverse=True)
@@ -102,11 +271,11 @@ class PragmaticBaccarat:
 			self.log("Error: invalid_amount")
 			return False, 'invalid_amount'
 
-		# Check bet area
-		area = self.find_bet_area(side)
+		# Check bet area: one capture decides the screen state and yields the boxes
+		state, areas = self.classify_screen(screenshot())
+		area = areas[side]
 		if not area:
-			# Heuristic: if neither area matches, likely wrong_tab/not_betting
-			if not self.find_bet_area('Player') and not self.find_bet_area('Banker'):
+			if state == SCREEN_WRONG_TAB:
 				self.log("Error: wrong_tab (no bet areas detected)")
 				return False, 'wrong_tab'
 			self.log("Error: not_betting_time (bet areas exist but selected side not found)")
@@ -117,9 +286,8 @@ class PragmaticBaccarat:
 		if best and best[0] == amount:
 			_, res = best
 			self.log(f"Exact chip found: {amount} at ({res[0]},{res[1]}) score={res[4]:.3f}")
-			click_center(res[:4])
-			time.sleep(0.2)
-			click_center(area[:4])
+			self._click(res[:4], 0.2)
+			self._click(area[:4], 0.0)
 			self.log("Click sequence completed (exact chip)")
 			return True, 'ok'
 
@@ -136,21 +304,14 @@ class PragmaticBaccarat:
 			if tpl is None:
 				self.log(f"Error: no_chips_found (template missing for {val})")
 				return False, 'no_chips_found'
-			img_full = screenshot()
-			img_roi, y_offset = bottom_roi(img_full, bottom_ratio=0.5)
-			# Use same logic as bet area finding - build mask to ignore near-white
-			mask = build_nonwhite_mask(tpl)
-			res = match_template_masked(img_roi, tpl, mask, self.threshold)
+			res = self._find_chip(val, screenshot())
 			if res is None:
 				self.log(f"Error: no_chips_found (chip {val})")
 				return False, 'no_chips_found'
 			x, y, w, h, score = res
-			y_full = y + y_offset
-			self.log(f"Clicking chip {val} at ({x},{y_full}) score={score:.3f} [{idx}/{len(plan)}]")
-			click_center((x, y_full, w, h))
-			time.sleep(0.2)
-			click_center(area[:4])
-			time.sleep(0.15)
+			self.log(f"Clicking chip {val} at ({x},{y}) score={score:.3f} [{idx}/{len(plan)}]")
+			self._click((x, y, w, h), 0.2)
+			self._click(area[:4], 0.15)
 		self.log("Click sequence completed (composed chips)")
 		return True, 'ok'
 
@@ -160,22 +321,23 @@ class PragmaticBaccarat:
 			self.log("Cancel: no template path configured")
 			return False, 'cancel_unavailable'
 		try:
-			tpl = load_image(path)
+			tpl = get_template(path)
 		except Exception:
 			self.log("Cancel: template missing/unreadable")
 			return False, 'cancel_unavailable'
 		img = screenshot()
-		res = match_template(img, tpl, self.threshold)
+		match = lambda roi: match_template(roi, tpl, self.threshold)
+		res = self._search(img, 'cancel', match) if self._locate_anchor(img) else None
 		if not res:
 			self.log("Cancel: button not found")
 			return False, 'cancel_not_found'
 		clicks = 0
 		for i in range(20):
-			click_center(res[:4])
+			self._click(res[:4], 0.25)
 			clicks += 1
-			time.sleep(0.25)
+			# The table may have moved since the last look; the ROI is relative to it
 			img = screenshot()
-			res2 = match_template(img, tpl, self.threshold)
+			res2 = self._search(img, 'cancel', match) if self._locate_anchor(img) else None
 			if not res2:
 				break
 			res = res2
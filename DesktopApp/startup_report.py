@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Import-time and memory report for app startup (like `python -X importtime`).
+
+main.py installs the timer before its own imports and logs the summary once
+the window is up. Run standalone to profile a fresh interpreter importing a
+module, e.g. to compare the macro-only path with the vision stack:
+
+    python startup_report.py main            # what the app imports at launch
+    python startup_report.py cv_utils --top 25
+"""
+
+import argparse
+import builtins
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+_T0 = time.perf_counter()
+_original_import = None
+# module -> [cumulative ms, self ms, depth]; insertion order = import order
+_timings: Dict[str, List[float]] = {}
+_stack: List[List[float]] = []
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    frame = [time.perf_counter(), 0.0]
+    _stack.append(frame)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _stack.pop()
+        total = (time.perf_counter() - frame[0]) * 1000.0
+        if _stack:
+            _stack[-1][1] += total
+        if name not in _timings:
+            _timings[name] = [total, total - frame[1], len(_stack)]
+
+
+def install() -> None:
+    global _original_import
+    if _original_import is None:
+        _original_import = builtins.__import__
+        builtins.__import__ = _timed_import
+
+
+def uninstall() -> None:
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB, when the platform exposes it"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize / 1e6
+            return None
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except Exception:
+        return None
+
+
+def slowest(top: int = 10, depth: Optional[int] = 0) -> List[Tuple[str, float, float]]:
+    """(module, cumulative ms, self ms), slowest first; depth=0 keeps only direct imports"""
+    rows = [(name, t[0], t[1]) for name, t in _timings.items() if depth is None or t[2] <= depth]
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def summary(top: int = 5) -> str:
+    """One log line: time since the timer loaded, import total, RSS, slowest imports"""
+    elapsed = (time.perf_counter() - _T0) * 1000.0
+    imports = sum(t[0] for t in _timings.values() if t[2] == 0)
+    rss = rss_mb()
+    parts = [f"Startup {elapsed:.0f} ms (imports {imports:.0f} ms)"]
+    if rss is not None:
+        parts.append(f"RSS {rss:.0f} MB")
+    heavy = ', '.join(f"{name} {cum:.0f}" for name, cum, _ in slowest(top))
+    vision = [m for m in ('cv2', 'numpy', 'mss', 'pyautogui') if m in sys.modules]
+    parts.append(f"slowest: {heavy}" if heavy else "no timed imports")
+    parts.append(f"vision modules loaded: {', '.join(vision) if vision else 'none'}")
+    return '; '.join(parts)
+
+
+def print_tree(top: int = 30) -> None:
+    # -X importtime layout: self and cumulative ms, indented by nesting depth
+    print(f"{'self ms':>9} | {'cumulative':>10} | module")
+    rows = sorted(_timings.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    for name, (cum, self_ms, depth) in rows:
+        print(f"{self_ms:9.1f} | {cum:10.1f} | {'  ' * int(depth)}{name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('module', nargs='?', default='main')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    install()
+    t0 = time.perf_counter()
+    __import__(args.module)
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    uninstall()
+    print_tree(args.top)
+    rss = rss_mb()
+    print(f"\n✓ import {args.module}: {elapsed:.1f} ms" + (f", RSS {rss:.1f} MB" if rss is not None else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
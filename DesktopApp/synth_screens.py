@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Synthetic table screens for headless matching tests.
+
+Composites the bundled assets (player/banker areas, cancel button, chips)
+onto generated backgrounds at random scales and offsets, adds noise,
+brightness jitter and JPEG artefacts, and records ground-truth boxes in the
+labels.json format read by `cv_bench.py corpus`.
+
+Random parameters and coarse backgrounds are drawn for a whole batch of
+frames at once with NumPy; per frame only the upsample, pasting, one fused
+gain/offset/noise pass and the JPEG round-trip remain.
+
+Usage:
+    python synth_screens.py OUT_DIR [--count 1000] [--size 1280x720]
+                            [--scale 0.9,1.1] [--noise 0,6] [--jpeg 60,95]
+                            [--format jpg] [--seed 0]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import cv_utils
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Assets larger than this (the 1000px chip PNGs) are not screen-sized
+MAX_ASSET_SIDE = 300
+STATES = ('betting_open', 'not_betting_time', 'wrong_tab')
+BG_CELL = 16
+# Sensor noise is cut from one shared bank at random offsets per frame
+NOISE_PAD = 64
+
+
+def _assets(include_large: bool) -> Dict[str, List[Tuple[str, np.ndarray, np.ndarray]]]:
+    """Bundled assets grouped by role: (key, bgr, mask)"""
+    groups: Dict[str, List[Tuple[str, np.ndarray, np.ndarray]]] = {'areas': [], 'cancel': [], 'chips': []}
+    def add(group: str, key: str) -> None:
+        bgr, alpha = cv_utils.load_image_with_alpha(key)
+        if not include_large and max(bgr.shape[:2]) > MAX_ASSET_SIDE:
+            return
+        groups[group].append((key, np.ascontiguousarray(bgr), cv_utils.template_mask(key, bgr, alpha)))
+    add('areas', 'assets/player_area.png')
+    add('areas', 'assets/banker_area.png')
+    add('cancel', 'assets/cancel_button.png')
+    for path in sorted(glob.glob(os.path.join(BASE_DIR, 'assets', 'chips', '*.png'))):
+        add('chips', cv_utils.asset_key(path))
+    return groups
+
+
+def _backgrounds(rng: np.random.Generator, n: int, height: int, width: int) -> np.ndarray:
+    """n coarse (1/16 scale) frames mixing a flat tint, a diagonal gradient and blobs.
+
+    Everything in the background is low-frequency, so it is built for the
+    whole batch at coarse resolution and upsampled per frame with cv2.resize.
+    """
+    ch, cw = height // BG_CELL + 2, width // BG_CELL + 2
+    tint = rng.integers(10, 200, (n, 1, 1, 3)).astype(np.float32)
+    gy = np.linspace(-1.0, 1.0, ch, dtype=np.float32)[None, :, None, None]
+    gx = np.linspace(-1.0, 1.0, cw, dtype=np.float32)[None, None, :, None]
+    slope = rng.uniform(-50, 50, (n, 1, 1, 2)).astype(np.float32)
+    grad = gy * slope[..., :1] + gx * slope[..., 1:]
+    blobs = rng.normal(0, 18, (n, ch, cw, 3)).astype(np.float32)
+    return np.clip(tint + grad + blobs, 0, 255).astype(np.uint8)
+
+
+def _paste(frame: np.ndarray, bgr: np.ndarray, mask: np.ndarray, x: int, y: int) -> None:
+    h, w = bgr.shape[:2]
+    region = frame[y:y + h, x:x + w]
+    np.copyto(region, bgr, where=(mask > 0)[:, :, None])
+
+
+def _layout(rng: np.random.Generator, groups: Dict[str, list], state: str, scale: float, width: int, height: int) -> List[Tuple[str, np.ndarray, np.ndarray, int, int]]:
+    """Table-like placement: bet areas mid-screen, chips and cancel along the bottom"""
+    if state == 'wrong_tab':
+        return []
+    placed = []
+    areas = list(groups['areas'])
+    if state == 'not_betting_time' and len(areas) > 1:
+        # Closed betting: one side is covered/dimmed, so it is not drawn
+        areas.pop(int(rng.integers(0, len(areas))))
+    row = [(k, cv_utils.resize_image(b, scale), cv_utils.resize_mask(m, scale)) for k, b, m in areas]
+    bottom = [(k, cv_utils.resize_image(b, scale), cv_utils.resize_mask(m, scale)) for k, b, m in groups['chips'] + groups['cancel']]
+    for items, y_frac in ((row, rng.uniform(0.35, 0.5)), (bottom, rng.uniform(0.72, 0.8))):
+        if not items:
+            continue
+        total_w = sum(b.shape[1] for _, b, _ in items)
+        gap = max(4, int((width - total_w) / (len(items) + 1)))
+        x = int(rng.integers(0, gap + 1))
+        for key, bgr, mask in items:
+            h, w = bgr.shape[:2]
+            y = int(min(max(0, y_frac * height + rng.integers(-10, 11)), height - h))
+            if x + w > width or y < 0:
+                break
+            placed.append((key, bgr, mask, x, y))
+            x += w + gap + int(rng.integers(-gap // 4, gap // 4 + 1))
+    return placed
+
+
+def generate(count: int, width: int = 1280, height: int = 720, scale_range: Tuple[float, float] = (0.9, 1.1), noise_range: Tuple[float, float] = (0.0, 6.0), jpeg_range: Optional[Tuple[int, int]] = (60, 95), seed: int = 0, batch: int = 32, include_large: bool = False) -> Iterator[Tuple[np.ndarray, dict]]:
+    """Yield (BGR frame, label) pairs; label matches cv_bench's labels.json entries"""
+    rng = np.random.default_rng(seed)
+    groups = _assets(include_large)
+    noise = rng.standard_normal((height + NOISE_PAD, width + NOISE_PAD, 3), dtype=np.float32)
+    done = 0
+    while done < count:
+        n = min(batch, count - done)
+        coarse = _backgrounds(rng, n, height, width)
+        states = rng.choice(len(STATES), n, p=(0.6, 0.2, 0.2))
+        scales = rng.uniform(scale_range[0], scale_range[1], n)
+        # Photometric jitter per frame: gain, offset and sensor noise sigma
+        gains = rng.uniform(0.9, 1.1, n)
+        offsets = rng.uniform(-12, 12, n)
+        sigmas = rng.uniform(noise_range[0], noise_range[1], n)
+        shifts = rng.integers(0, NOISE_PAD + 1, (n, 2))
+        qualities = rng.integers(jpeg_range[0], jpeg_range[1] + 1, n) if jpeg_range is not None else None
+        for i in range(n):
+            state = STATES[states[i]]
+            frame = cv2.resize(coarse[i], (width, height), interpolation=cv2.INTER_LINEAR)
+            boxes = []
+            for key, bgr, mask, x, y in _layout(rng, groups, state, float(scales[i]), width, height):
+                _paste(frame, bgr, mask, x, y)
+                boxes.append({'template': key, 'box': [x, y, bgr.shape[1], bgr.shape[0]], 'scale': round(float(scales[i]), 4)})
+            label = {'state': state, 'boxes': boxes}
+            dy, dx = shifts[i]
+            # gain * frame + sigma * noise + offset, saturated back to uint8 in one pass
+            frame = cv2.addWeighted(frame, float(gains[i]), noise[dy:dy + height, dx:dx + width], float(sigmas[i]), float(offsets[i]), dtype=cv2.CV_8U)
+            if qualities is not None:
+                quality = int(qualities[i])
+                ok, enc = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                frame = cv2.imdecode(enc, cv2.IMREAD_COLOR)
+                label['jpeg_quality'] = quality
+            yield frame, label
+        done += n
+
+
+def write_corpus(out_dir: str, count: int, fmt: str = 'png', **kwargs) -> int:
+    """Write frames plus labels.json to out_dir; returns the number written"""
+    os.makedirs(out_dir, exist_ok=True)
+    labels = {}
+    for idx, (frame, label) in enumerate(generate(count, **kwargs)):
+        name = f"synth_{idx:05d}.{fmt}"
+        params = [cv2.IMWRITE_JPEG_QUALITY, 95] if fmt == 'jpg' else [cv2.IMWRITE_PNG_COMPRESSION, 1]
+        cv2.imwrite(os.path.join(out_dir, name), frame, params)
+        labels[name] = label
+    with open(os.path.join(out_dir, 'labels.json'), 'w') as f:
+        json.dump({'generator': 'synth_screens', 'frames': labels}, f, indent=1)
+    return len(labels)
+
+
+def _pair(text: str, cast=float) -> Tuple:
+    lo, hi = (cast(v) for v in text.split(','))
+    return lo, hi
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--size', default='1280x720', help='WIDTHxHEIGHT')
+    parser.add_argument('--scale', default='0.9,1.1', help='asset scale range')
+    parser.add_argument('--noise', default='0,6', help='gaussian noise sigma range')
+    parser.add_argument('--jpeg', default='60,95', help="JPEG quality range, or 'none'")
+    parser.add_argument('--format', choices=('png', 'jpg'), default='png')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--include-large', action='store_true', help='also paste the 1000px chip PNGs at native size')
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    out_dir = os.path.abspath(args.out_dir)
+    os.chdir(BASE_DIR)
+    t0 = time.perf_counter()
+    written = write_corpus(out_dir, args.count, fmt=args.format, width=width, height=height,
+                           scale_range=_pair(args.scale), noise_range=_pair(args.noise),
+                           jpeg_range=None if args.jpeg == 'none' else _pair(args.jpeg, int),
+                           seed=args.seed, include_large=args.include_large)
+    print(f"✓ Wrote {written} frames to {out_dir} in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import os
+import sys
+
+# The app modules live flat in DesktopApp/ and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+import capture
+import cv_utils
+
+
+class Table(capture.CaptureBackend):
+	"""Virtual-clock table screen for the region watches.
+
+	Chips show in the middle of any grabbed region `draw_ms` after click_t
+	(None: not clicked yet, set by a fake mouse). Once hover_t is set the
+	region brightens in two steps, 10 ms apart, like a hover transition.
+	"""
+
+	def __init__(self, draw_ms=None, click_t=0.0):
+		self.t = 0.0
+		self.draw_ms = draw_ms
+		self.click_t = click_t
+		self.hover_t = None
+
+	def now(self):
+		return self.t
+
+	def sleep(self, seconds):
+		self.t += max(0.0, seconds)
+
+	def grab(self, region=None):
+		x, y, w, h = region
+		img = np.full((h, w, 3), 90, dtype=np.uint8)
+		if self.hover_t is not None:
+			img[:] += 50 if self.t - self.hover_t < 0.01 else 80
+		if self.draw_ms is not None and self.click_t is not None and self.t - self.click_t >= self.draw_ms / 1000.0:
+			img[h // 4:3 * h // 4, w // 4:3 * w // 4] = (20, 20, 20)
+		return img
+
+
+@pytest.fixture
+def table(monkeypatch):
+	"""table(draw_ms, click_t) installs a fresh Table as the capture backend of a 1280x720 monitor"""
+	for name, value in (('_monitor_probed', True), ('MON_LEFT', 0), ('MON_TOP', 0), ('MON_WIDTH', 1280), ('MON_HEIGHT', 720)):
+		monkeypatch.setattr(cv_utils, name, value)
+	# No frame ring: the error dump path is not under test
+	monkeypatch.setattr(cv_utils, 'annotate_frame', lambda *args: None)
+
+	def make(draw_ms=None, click_t=0.0):
+		t = Table(draw_ms, click_t)
+		cv_utils.set_capture_backend(t)
+		return t
+	yield make
+	cv_utils.set_capture_backend(None)
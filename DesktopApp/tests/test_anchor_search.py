@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import cv_utils
+from site_pragmatic import PragmaticBaccarat
+
+RNG = np.random.default_rng(29)
+ANCHOR = RNG.integers(0, 256, (24, 24, 3), dtype=np.uint8)
+CHIP = RNG.integers(0, 256, (30, 30, 3), dtype=np.uint8)
+
+
+def _scene(chip_xy):
+	frame = np.full((400, 600, 3), 30, dtype=np.uint8)
+	frame[50:74, 50:74] = ANCHOR
+	frame[chip_xy[1]:chip_xy[1] + 30, chip_xy[0]:chip_xy[0] + 30] = CHIP
+	return frame
+
+
+def _search(finder, frame):
+	finder.anchor.locate(frame)
+	return PragmaticBaccarat._search(finder, frame, 'chip', lambda img: cv_utils.match_template(img, CHIP, 0.9))
+
+
+def test_roi_miss_falls_back_and_relearns():
+	finder = SimpleNamespace(anchor=cv_utils.AnchorLocator(ANCHOR, threshold=0.9))
+	assert _search(finder, _scene((200, 300)))[:2] == (200, 300)
+	assert finder.anchor.has_roi('chip')
+
+	# The chip moved inside the table: the learned ROI misses. A miss is taken
+	# for a hidden chip until it happens miss_limit times in a row; then the
+	# full frame is searched and finds it
+	moved = _scene((420, 120))
+	for _ in range(finder.anchor.miss_limit - 1):
+		assert _search(finder, moved) is None
+	assert _search(finder, moved)[:2] == (420, 120)
+	# ...and the ROI now points at the new place
+	assert finder.anchor.roi('chip', moved.shape)[:2] == (420 - 16, 120 - 16)
+	assert _search(finder, moved)[:2] == (420, 120)
+
+
+def test_configured_roi_is_kept_after_a_miss():
+	anchor = cv_utils.AnchorLocator(ANCHOR, rois={'chip': (0, 0, 10, 10)})
+	anchor.forget('chip')
+	assert anchor.has_roi('chip')
+
+
+def test_hidden_target_keeps_its_roi():
+	finder = SimpleNamespace(anchor=cv_utils.AnchorLocator(ANCHOR, threshold=0.9))
+	_search(finder, _scene((200, 300)))
+	# Betting closed: the chip is dimmed away on every frame, the anchor is not
+	hidden = np.full((400, 600, 3), 30, dtype=np.uint8)
+	hidden[50:74, 50:74] = ANCHOR
+	for _ in range(10):
+		assert _search(finder, hidden) is None
+	assert finder.anchor.roi('chip', hidden.shape)[:2] == (200 - 16, 300 - 16)
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app_config import DEFAULTS, load_config
+
+# Every knob read from cfg.raw, as (path, value) pairs set through the file
+KNOBS = [
+	(('vision', 'enabled'), True),
+	(('vision', 'threads'), 2),
+	(('vision', 'opencl'), False),
+	(('vision', 'capture_service', 'enabled'), True),
+	(('vision', 'capture_service', 'fps'), 20),
+	(('macro', 'verify', 'enabled'), True),
+	(('macro', 'verify', 'timeout_ms'), 80),
+	(('macro', 'pacing', 'enabled'), True),
+	(('macro', 'pacing', 'settle_ms'), 40),
+	(('macro', 'hot_reload'), False),
+	(('macro', 'check_on_login'), True),
+	(('macro', 'block_failed_positions'), True),
+	(('diagnostics', 'frame_ring'), 0),
+	(('diagnostics', 'dump_dir'), 'errors'),
+	(('warmup', 'enabled'), False),
+	(('mouse', 'max_wait_ms'), 90),
+]
+
+
+def _set(data, path, value):
+	for key in path[:-1]:
+		data = data.setdefault(key, {})
+	data[path[-1]] = value
+
+
+def _get(data, path):
+	for key in path:
+		data = data[key]
+	return data
+
+
+@pytest.mark.parametrize('path,value', KNOBS, ids=['.'.join(p) for p, _ in KNOBS])
+def test_knob_is_read_from_the_file(tmp_path, path, value):
+	data = {}
+	_set(data, path, value)
+	(tmp_path / 'config.json').write_text(json.dumps(data))
+	cfg = load_config(str(tmp_path / 'config.json'))
+	assert _get(cfg.raw, path) == value
+	# Defaults the file leaves out are kept
+	assert cfg.controller_ws == DEFAULTS['controller']['ws_url']
+
+
+def test_all_knobs_together_and_controller_override(tmp_path):
+	data = {'controller': {'ws_url': 'ws://localhost:8080/'}}
+	for path, value in KNOBS:
+		_set(data, path, value)
+	(tmp_path / 'config.json').write_text(json.dumps(data))
+	cfg = load_config(str(tmp_path / 'config.json'))
+	assert all(_get(cfg.raw, path) == value for path, value in KNOBS)
+	assert cfg.controller_ws == 'ws://localhost:8080/'
+	assert cfg.controller_http == DEFAULTS['controller']['http_url']
+
+
+def test_missing_or_broken_file_uses_the_defaults(tmp_path):
+	assert load_config(str(tmp_path / 'none.json')).raw == DEFAULTS
+	(tmp_path / 'bad.json').write_text('{"vision": ')
+	cfg = load_config(str(tmp_path / 'bad.json'))
+	assert cfg.raw == DEFAULTS and cfg.raw is not DEFAULTS
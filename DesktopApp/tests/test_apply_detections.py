@@ -0,0 +1,26 @@
+import json
+
+from layout_detect import Detection
+from macro_interface import MacroInterface
+from window_frame import WindowFrame
+
+
+def test_detections_reset_the_window_reference(tmp_path, monkeypatch):
+	# Saved while the window was at (0, 0); it is at (100, 50) when the layout is detected
+	path = tmp_path / 'macro_config.json'
+	banker = {'x': 500, 'y': 200, 'width': 50, 'height': 50, 'name': 'banker_area'}
+	path.write_text(json.dumps({'version': 4, 'positions': {'banker_area': banker}, 'chips': [], 'window': {'title': 'Table', 'rect': [0, 0, 800, 600]}}))
+	monkeypatch.setattr(WindowFrame, 'rect', lambda self, force=False: (100, 50, 800, 600))
+	macro = MacroInterface(None, config_path=str(path))
+	found = {'player_area': Detection('player_area', 'assets/player_area.png', (300, 250, 100, 60), 0.95, 1.0, 1.0)}
+	applied, _ = macro.apply_detections(found)
+	macro.store.flush()
+	assert applied == ['player_area']
+	saved = json.loads(path.read_text())
+	assert saved['window']['rect'] == [100, 50, 800, 600]
+	# Clicked where it was detected, not shifted by the window's old offset
+	boxes, _ = macro.click_boxes(macro.snapshot)
+	assert boxes['player_area'][:2] == (350, 280)
+	# Not detected: moved with the window like the editor would
+	assert boxes['banker_area'][:2] == (600, 250)
+	assert saved['positions']['banker_area']['x'] == 600
@@ -0,0 +1,89 @@
+import threading
+from types import SimpleNamespace
+
+from bet_verify import BetVerifier
+from macro_betting import MacroBaccarat
+
+BOX = (400, 300, 50, 50)
+CHIP = (100, 600, 50, 50)
+
+
+def test_verification_stays_within_one_capture_interval(table):
+	t = table(draw_ms=None)
+	verifier = BetVerifier(budget_ms=100)
+	verifier.arm(BOX)
+	assert verifier.confirm() is False
+	assert verifier.recheck() is False
+	assert t.t * 1000 <= 100 + verifier.poll_ms
+
+
+def test_late_draw_is_confirmed_on_the_recheck(table):
+	verifier = BetVerifier(budget_ms=100)
+	for _ in range(20):
+		table(draw_ms=20)
+		verifier.arm(BOX)
+		assert verifier.confirm() is True
+	assert verifier.model.timeout_ms() < 60
+	t = table(draw_ms=75)
+	verifier.arm(BOX)
+	assert verifier.confirm() is False
+	assert verifier.recheck() is True
+	assert t.t * 1000 <= 100
+
+
+def _betting(clicks, acks):
+	macro = SimpleNamespace(sequence_lock=threading.Lock())
+	betting = MacroBaccarat(macro)
+	betting.verifier = BetVerifier()
+	betting.cancels = []
+
+	def plan(amount, side):
+		betting._planned_composition = [1000] * (len(clicks) - 1)
+		return True, 'ok', clicks
+	betting.plan_bet = plan
+	betting._cancel_bet = lambda n=None: betting.cancels.append(n) or (True, 'ok')
+	# Pacer stand-in: the first `acks` area clicks show on screen
+	pacer = betting.pacer = SimpleNamespace(acks={}, stats=dict)
+
+	def run(seq):
+		for box, _ in seq:
+			if box == clicks[-1][0] and acks > sum(pacer.acks.values()):
+				pacer.acks[box[:2]] = pacer.acks.get(box[:2], 0) + 1
+	betting._run_clicks = run
+	return betting
+
+
+def test_unconfirmed_bet_with_nothing_landed_is_not_undone(table):
+	table(draw_ms=None)
+	betting = _betting([(CHIP, 0.05), (BOX, 0.05), (BOX, 0.05)], acks=0)
+	betting.last_bet_composition = [25000]
+	assert betting.place_bet(2000, 'Player') == (False, 'bet_not_confirmed')
+	assert betting.cancels == []
+	# The earlier bet is still what a cancel undoes
+	assert betting.last_bet_composition == [25000]
+
+
+def test_unconfirmed_bet_undoes_only_the_clicks_seen_landing(table):
+	table(draw_ms=None)
+	betting = _betting([(CHIP, 0.05), (BOX, 0.05), (BOX, 0.05), (BOX, 0.05)], acks=1)
+	assert betting.place_bet(3000, 'Player') == (False, 'bet_not_confirmed')
+	assert betting.cancels == [1]
+
+
+def test_confirmed_bet_becomes_the_last_composition(table):
+	table(draw_ms=10)
+	betting = _betting([(CHIP, 0.05), (BOX, 0.05), (BOX, 0.05)], acks=2)
+	assert betting.place_bet(2000, 'Player') == (True, 'ok')
+	assert betting.last_bet_composition == [1000, 1000]
+
+
+def test_refused_bet_keeps_the_last_composition():
+	snap = SimpleNamespace(configured=True, chips=[1000], denominations=(1000,))
+	macro = SimpleNamespace(snapshot=snap, sequence_lock=threading.Lock(), failed_positions=lambda: ['chip:1000'],
+							click_boxes=lambda s: ({'player_area': BOX}, {1000: CHIP}))
+	betting = MacroBaccarat(macro)
+	betting.block_failed_positions = True
+	betting.last_bet_composition = [25000]
+	assert betting.place_bet(1000, 'Player') == (False, 'position_check_failed')
+	assert betting.place_bet(3000, 'Player') == (False, 'position_check_failed')
+	assert betting.last_bet_composition == [25000]
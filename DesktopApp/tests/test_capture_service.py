@@ -0,0 +1,56 @@
+import numpy as np
+
+import capture
+import capture_service
+
+
+class FailingBackend(capture.CaptureBackend):
+	def __init__(self):
+		self.calls = 0
+
+	def grab(self, region=None):
+		self.calls += 1
+		if self.calls > 1:
+			raise OSError('display gone')
+		return np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_grab_errors_go_to_the_logger(capsys):
+	logs = []
+	svc = capture_service.CaptureService({'full': None}, fps=200, backend=FailingBackend(), logger=logs.append).start()
+	try:
+		while not logs:
+			svc._stop.wait(0.005)
+	finally:
+		svc.stop()
+	assert logs[0] == 'Capture service grab failed: display gone'
+	assert capsys.readouterr().out == ''
+
+
+class ShrinkingBackend(capture.CaptureBackend):
+	# 16x16 white, then 8x12 black frames: the monitor's resolution dropped
+	def __init__(self):
+		self.calls = 0
+
+	def grab(self, region=None):
+		self.calls += 1
+		if self.calls <= 2:
+			return np.full((16, 16, 3), 255, dtype=np.uint8)
+		return np.zeros((8, 12, 3), dtype=np.uint8)
+
+
+def test_readers_see_only_the_published_frame_size():
+	svc = capture_service.CaptureService({'full': None}, backend=ShrinkingBackend(), slots=2)
+	svc._allocate()
+	sub = svc.subscribe('test')
+	try:
+		for _ in range(3):
+			seq = svc.publish_once()
+		_, _, view = sub.latest('full')
+		# The slot held a 16x16 white frame before; none of it shows
+		assert view.shape == (8, 12, 3) and not view.any()
+		assert sub.get('full', seq).shape == (8, 12, 3)
+		assert capture_service.ServiceBackend(sub).grab().shape == (8, 12, 3)
+	finally:
+		svc.unsubscribe(sub)
+		svc.stop()
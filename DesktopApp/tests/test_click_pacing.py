@@ -0,0 +1,67 @@
+import pytest
+
+import clicker
+import cv_utils
+from click_pacing import ClickPacer
+
+BOX = (300, 200, 50, 50)
+
+
+class Mouse:
+	def __init__(self, table):
+		self.table = table
+
+	def moveTo(self, x, y, duration=0.0):
+		self.table.sleep(duration)
+		if self.table.hover_t is None:
+			self.table.hover_t = self.table.t
+
+	def click(self):
+		self.table.click_t = self.table.t
+
+
+@pytest.fixture
+def clicks(table, monkeypatch):
+	"""clicks(ack_ms) is a table the fake mouse hovers and clicks on"""
+	def make(ack_ms=None):
+		t = table(ack_ms, click_t=None)
+		monkeypatch.setattr(clicker, '_input', lambda: Mouse(t))
+		monkeypatch.setattr(clicker, 'get_monitor_for_coordinates', lambda x, y: {'left': 0, 'top': 0, 'width': 1280, 'height': 720})
+		monkeypatch.setattr(cv_utils, 'pause', t.sleep)
+		return t
+	return make
+
+
+def test_hover_alone_is_not_an_ack(clicks):
+	clicks()
+	pacer = ClickPacer()
+	pacer.click(BOX)
+	assert (pacer.acked, pacer.timeouts) == (0, 1)
+
+
+def test_click_is_acked_after_hover(clicks):
+	t = clicks(ack_ms=40)
+	pacer = ClickPacer()
+	pacer.click(BOX)
+	assert (pacer.acked, pacer.timeouts) == (1, 0)
+	assert 40 <= (t.t - t.click_t) * 1000 < 50
+
+
+def test_pause_is_the_minimum_wait(clicks):
+	t = clicks(ack_ms=40)
+	ClickPacer().click(BOX, pause=0.2)
+	assert 200 <= (t.t - t.click_t) * 1000 < 210
+
+
+def test_capture_errors_go_to_the_logger(clicks, capsys):
+	clicks(ack_ms=40)
+	logs = []
+	pacer = ClickPacer(logger=logs.append)
+
+	def broken(box, settle_ms=0.0):
+		raise OSError('no display')
+	pacer.watch.arm = broken
+	pacer.click(BOX)
+	assert logs == ['Click pacing: cannot capture around (300, 200): no display']
+	assert pacer.unwatched == 1
+	assert capsys.readouterr().out.count('Click pacing') == 0
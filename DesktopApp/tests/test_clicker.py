@@ -0,0 +1,31 @@
+import clicker
+
+PRIMARY = {'left': 0, 'top': 0, 'width': 1920, 'height': 1080}
+SECOND = {'left': 1920, 'top': 0, 'width': 1280, 'height': 720}
+
+
+def test_monitor_list_is_probed_again_for_an_unknown_point(monkeypatch):
+	probes = [[PRIMARY, PRIMARY], [PRIMARY, PRIMARY, SECOND]]
+	calls = []
+
+	def monitors(refresh=False):
+		if refresh or not calls:
+			calls.append(probes[min(len(calls), 1)])
+		return calls[-1]
+	monkeypatch.setattr(clicker, 'monitors', monitors)
+	assert clicker.get_monitor_for_coordinates(100, 100) is PRIMARY
+	assert len(calls) == 1
+	assert clicker.get_monitor_for_coordinates(2000, 100) is SECOND
+	assert len(calls) == 2
+	# Still outside every monitor after the refresh: the primary one
+	assert clicker.get_monitor_for_coordinates(-5000, 100) is PRIMARY
+
+
+def test_queue_waits_are_bounded_per_owner(monkeypatch):
+	monkeypatch.setattr(clicker, 'WAIT_SAMPLES', 5)
+	mouse = clicker.MouseScheduler(click=lambda box: None).start()
+	for _ in range(20):
+		mouse.run([((0, 0, 10, 10), 0.0)], owner='t1')
+	mouse.close()
+	assert len(mouse.waits['t1']) == 5
+	assert mouse.stats()['owners']['t1']['sequences'] == 5
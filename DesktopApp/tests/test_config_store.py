@@ -0,0 +1,63 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from config_store import ConfigStore, ConfigWatcher, validate
+from macro_interface import MacroInterface
+
+
+def pos(name, x=10, y=20, **extra):
+	return dict({'x': x, 'y': y, 'width': 50, 'height': 50, 'name': name}, **extra)
+
+
+def config(**changes):
+	data = {'version': 4, 'window': None, 'positions': {'player_area': pos('player_area')},
+			'chips': [{'amount': 100, 'position': pos('chip_100')}]}
+	data.update(changes)
+	return data
+
+
+@pytest.mark.parametrize('data, problem', [
+	(config(positions={'player_area': {'x': 1, 'y': 2, 'width': 3, 'height': 4}}), 'position player_area'),
+	(config(chips=[{'amount': 100, 'position': pos('a')}, {'amount': 100, 'position': pos('b')}]), 'chip 100: listed more than once'),
+	(config(layout={}), 'unknown keys: layout'),
+	(config(window={'title': 'Table', 'size': [1, 2]}), 'unknown window keys: size'),
+])
+def test_validate_rejects(data, problem):
+	assert any(problem in error for error in validate(data))
+
+
+def test_store_accepts_only_what_parses(tmp_path):
+	path = tmp_path / 'macro_config.json'
+	path.write_text(json.dumps(config(positions={'player_area': pos('player_area', colour='red')})))
+	store = ConfigStore(str(path), parse=MacroInterface._parse_config_data)
+	with pytest.raises(ValueError, match='cannot build'):
+		store.read()
+	path.write_text(json.dumps(config()))
+	assert store.read()['positions']['player_area']['x'] == 10
+
+
+def test_failed_reload_is_not_counted(tmp_path):
+	path = tmp_path / 'macro_config.json'
+	store = ConfigStore(str(path))
+	watcher = ConfigWatcher(store, lambda data: 1 / 0)
+	path.write_text(json.dumps(config()))
+	with pytest.raises(ZeroDivisionError):
+		watcher.poll()
+	assert watcher.reloads == 0
+
+
+def test_edit_while_the_editor_is_open_waits_for_cancel(tmp_path):
+	path = tmp_path / 'macro_config.json'
+	path.write_text(json.dumps(config()))
+	macro = MacroInterface(None, config_path=str(path))
+	macro._backup_positions, macro._backup_chips = dict(macro.positions), list(macro.chips)
+	macro.selection_window = SimpleNamespace(destroy=lambda: None)
+	edited = config(positions={'player_area': pos('player_area', x=400)}, window={'title': 'Table', 'rect': [0, 0, 800, 600]})
+	macro._on_external_change(edited)
+	assert macro.window_ref is None
+	assert macro.snapshot.boxes['player_area'][0] == 10
+	macro._cancel_configuration()
+	assert macro.window_ref == (0, 0, 800, 600)
+	assert macro.snapshot.boxes['player_area'][0] == 400
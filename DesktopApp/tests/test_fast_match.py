@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+
+import cv_utils
+
+RNG = np.random.default_rng(30)
+TEMPLATE = RNG.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+
+def _frame(patch):
+	frame = np.full((240, 320, 3), 30, dtype=np.uint8)
+	frame[100:164, 120:184] = patch
+	return frame
+
+
+def test_gray_lookalike_is_not_a_match():
+	# Same gray levels as the template, none of its colour: a perfect
+	# grayscale score that the full-colour matcher rejects
+	lookalike = cv2.cvtColor(cv2.cvtColor(TEMPLATE, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+	fast = cv_utils.FastTemplate(TEMPLATE)
+	assert cv_utils.match_template(_frame(lookalike), TEMPLATE, 0.8) is None
+	assert cv_utils.match_template_fast(_frame(lookalike), fast, 0.8) is None
+	assert fast.stats['escalated'] == 1 and fast.stats['confirmed'] == 0
+
+
+def test_true_match_is_confirmed():
+	fast = cv_utils.FastTemplate(TEMPLATE)
+	assert cv_utils.match_template_fast(_frame(TEMPLATE), fast, 0.8)[:4] == (120, 100, 64, 64)
+	assert fast.stats['confirmed'] == 1
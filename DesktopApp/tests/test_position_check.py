@@ -0,0 +1,26 @@
+import json
+
+from macro_interface import MacroInterface
+
+
+class Checker:
+	def check(self, frame, boxes, chip_boxes, origin):
+		self.boxes, self.chip_boxes = boxes, chip_boxes
+		return {}
+
+
+def test_only_the_placeholder_is_skipped(tmp_path):
+	def pos(name, x, y):
+		return {'x': x, 'y': y, 'width': 50, 'height': 50, 'name': name}
+	path = tmp_path / 'macro_config.json'
+	path.write_text(json.dumps({'version': 4, 'window': None, 'positions': {
+		# A monitor left of the primary one has negative x; y = 0 is its top row
+		'player_area': pos('player_area', -800, 300),
+		'banker_area': pos('banker_area', 400, 0),
+		'cancel_button': pos('cancel_button', 0, 0),
+	}, 'chips': [{'amount': 100, 'position': pos('chip_100', 0, 0)}, {'amount': 500, 'position': pos('chip_500', 0, 700)}]}))
+	macro = MacroInterface(None, config_path=str(path))
+	checker = Checker()
+	macro.check_positions(checker, None, (0, 0))
+	assert sorted(checker.boxes) == ['banker_area', 'player_area']
+	assert sorted(checker.chip_boxes) == [500]
@@ -0,0 +1,50 @@
+import pytest
+
+import cv_utils
+import synth_screens
+
+FRAMES = 30
+THRESHOLD = 0.8
+TEMPLATES = (
+	'assets/player_area.png',
+	'assets/banker_area.png',
+	'assets/cancel_button.png',
+	'assets/chips/1000.png',
+	'assets/chips/25000.png',
+	'assets/chips/125000.png',
+	'assets/chips/500000.png',
+)
+
+
+@pytest.fixture(scope='module')
+def corpus():
+	# Every screen state, including wrong_tab frames without the table
+	return list(synth_screens.generate(FRAMES, scale_range=(1.0, 1.0), seed=28))
+
+
+def _labelled(label: dict, path: str, box) -> bool:
+	# Centre of the found box inside a ground-truth box of the same template
+	cx, cy = box[0] + box[2] // 2, box[1] + box[3] // 2
+	return any(b['template'] == path and b['box'][0] <= cx < b['box'][0] + b['box'][2] and b['box'][1] <= cy < b['box'][1] + b['box'][3]
+			   for b in label['boxes'])
+
+
+@pytest.mark.parametrize('path', TEMPLATES)
+def test_prefilter_never_hides_a_true_match(corpus, path):
+	tpl, alpha = cv_utils.load_image_with_alpha(path)
+	mask = cv_utils.template_mask(path, tpl, alpha)
+	prefilter = cv_utils.PrefilterCascade(tpl, mask)
+	true_hits = 0
+	for frame, label in corpus:
+		plain = cv_utils.match_template_masked(frame, tpl, mask, THRESHOLD)
+		filtered = cv_utils.match_template_masked(frame, tpl, mask, THRESHOLD, prefilter=prefilter)
+		if filtered is not None:
+			# The prefilter only ever removes results, it never changes one
+			assert plain is not None and filtered[:4] == plain[:4]
+		if plain is not None and _labelled(label, path, plain):
+			true_hits += 1
+			# No extra false negatives: every correct unfiltered hit survives the prefilter
+			assert filtered is not None and filtered[:4] == plain[:4], (path, label)
+	# The corpus must hold real hits and rejected frames for the comparison to mean anything
+	assert true_hits > 0
+	assert sum(r['rejected'] for r in prefilter.report().values()) > 0
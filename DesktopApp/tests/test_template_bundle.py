@@ -0,0 +1,44 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+import cv_utils
+
+KEY = 'assets/cancel_button.png'
+
+
+def _bundle(tmp_path, monkeypatch, **entry):
+	# One-entry index over a copy of the app dir's PNG
+	shutil.copy(os.path.join(cv_utils.BASE_DIR, KEY), tmp_path / 'cancel_button.png')
+	src = str(tmp_path / 'cancel_button.png')
+	st = os.stat(src)
+	index = {'version': 1, 'blob': 'blob.npy', 'entries': {
+		'cancel_button.png': dict({'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'crc': cv_utils.file_crc(src), 'variants': {'bgr': [0, [1, 1, 3]]}}, **entry)}}
+	(tmp_path / 'index.json').write_text(json.dumps(index))
+	np.save(tmp_path / 'blob.npy', np.zeros(3, dtype=np.uint8))
+	monkeypatch.setattr(cv_utils, 'BASE_DIR', str(tmp_path))
+	return cv_utils.TemplateBundle(str(tmp_path / 'index.json')), src
+
+
+def test_unchanged_file_is_not_read(tmp_path, monkeypatch):
+	bundle, src = _bundle(tmp_path, monkeypatch)
+	monkeypatch.setattr(cv_utils, 'file_crc', lambda path: (_ for _ in ()).throw(AssertionError('CRC computed')))
+	assert bundle.get(src, 'bgr') is not None
+
+
+def test_touched_file_with_same_content_is_fresh(tmp_path, monkeypatch):
+	bundle, src = _bundle(tmp_path, monkeypatch, mtime_ns=1)
+	assert bundle.get(src, 'bgr') is not None
+
+
+def test_edited_file_is_stale(tmp_path, monkeypatch):
+	bundle, src = _bundle(tmp_path, monkeypatch, mtime_ns=1, crc=0)
+	assert bundle.get(src, 'bgr') is None
+
+
+def test_missing_file_is_stale(tmp_path, monkeypatch):
+	bundle, src = _bundle(tmp_path, monkeypatch)
+	os.remove(src)
+	assert bundle.get(src, 'bgr') is None
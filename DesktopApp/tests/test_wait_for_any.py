@@ -0,0 +1,63 @@
+import numpy as np
+
+import capture
+import cv_utils
+
+
+class FadeInBackend(capture.RecordedBackend):
+	"""cancel_button.png fading in over `steps` frames on a plain background"""
+
+	def __init__(self, steps: int = 20, fps: float = 50.0):
+		super().__init__(speed=None)
+		self.steps = steps
+		self.fps = fps
+		self.template = cv_utils.get_template('assets/cancel_button.png')
+		self.background = np.full((360, 640, 3), 40, dtype=np.uint8)
+
+	def duration(self) -> float:
+		return 10.0
+
+	def _frame_at(self, t: float) -> np.ndarray:
+		alpha = min(1.0, int(t * self.fps) / self.steps)
+		frame = self.background.copy()
+		h, w = self.template.shape[:2]
+		roi = frame[100:100 + h, 200:200 + w]
+		roi[:] = (roi * (1 - alpha) + self.template * alpha).astype(np.uint8)
+		return frame
+
+
+def test_gradual_fade_in_is_matched():
+	cv_utils.set_capture_backend(FadeInBackend())
+	try:
+		res = cv_utils.wait_and_find('assets/cancel_button.png', 3000, 0.95)
+	finally:
+		cv_utils.set_capture_backend(None)
+	assert res is not None
+	assert (res[0], res[1]) == (200, 100)
+
+
+def test_static_screen_still_forces_a_match(monkeypatch):
+	calls = []
+	real = cv_utils.find_any
+	monkeypatch.setattr(cv_utils, 'find_any', lambda *a: calls.append(1) or real(*a))
+	backend = FadeInBackend(steps=1)
+	cv_utils.set_capture_backend(backend)
+	try:
+		cv_utils.wait_for_any(['assets/chips/1000.png'], 3000, 0.99)
+	finally:
+		cv_utils.set_capture_backend(None)
+	# Unchanged frames are skipped, but never for longer than the interval cap allows
+	assert len(calls) > 3
+
+
+def test_region_off_the_frame_is_not_found():
+	backend = FadeInBackend()
+	assert backend.grab((700, 400, 50, 50)) is None
+	assert backend.grab((600, 300, 100, 100)).shape == (60, 40, 3)
+	cv_utils.set_capture_backend(backend)
+	try:
+		res = cv_utils.wait_and_find('assets/cancel_button.png', 500, 0.95, region=(700, 400, 50, 50))
+	finally:
+		cv_utils.set_capture_backend(None)
+	assert res is None
+	assert backend.now() >= 0.5
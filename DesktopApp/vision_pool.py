@@ -0,0 +1,335 @@
+import itertools
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import cv_utils
+
+# Optional out-of-process matching. Tk, the websocket loop and the bet path
+# share one interpreter; a multi-scale search there holds the GIL long enough
+# to stall the UI and delay pongs. VisionPool runs the matchers in worker
+# processes instead. Frames travel through shared memory, either a slot of
+# the pool's own input block (one memcpy by the caller) or a frame already
+# published by capture_service; only small tuples go over the pipes.
+
+
+class WorkerCrashed(RuntimeError):
+	pass
+
+
+def service_frame(subscriber, region: str, seq: int) -> tuple:
+	"""Frame reference for a frame published by capture_service (no copy at all)"""
+	return ('service', subscriber.spec, region, seq)
+
+
+class _TemplateCache:
+	"""Per-worker templates, masks and fast variants, loaded on first use"""
+
+	def __init__(self):
+		self.entries: Dict[str, dict] = {}
+
+	def get(self, path: str) -> dict:
+		entry = self.entries.get(path)
+		if entry is None:
+			bgr, alpha = cv_utils.load_image_with_alpha(path)
+			entry = {'bgr': bgr, 'mask': cv_utils.template_mask(path, bgr, alpha)}
+			self.entries[path] = entry
+		return entry
+
+	def fast(self, path: str) -> cv_utils.FastTemplate:
+		entry = self.get(path)
+		if 'fast' not in entry:
+			entry['fast'] = cv_utils.fast_template(path, entry['bgr'], entry['mask'])
+		return entry['fast']
+
+	def pyramid(self, path: str, scales: Sequence[float]):
+		entry = self.get(path)
+		key = ('pyramid', tuple(scales))
+		if key not in entry:
+			entry[key] = cv_utils.template_pyramid(path, entry['bgr'], entry['mask'], scales)
+		return entry[key]
+
+
+def _op_match(img: np.ndarray, cache: _TemplateCache, path: str, threshold: float, mode: str = 'masked', band: float = 0.08, scales: Optional[Sequence[float]] = None):
+	if mode == 'fast':
+		return cv_utils.match_template_fast(img, cache.fast(path), threshold, band=band)
+	entry = cache.get(path)
+	if mode == 'plain':
+		return cv_utils.match_template(img, entry['bgr'], threshold)
+	if mode == 'multiscale':
+		scales = list(scales or (0.9, 1.0, 1.1))
+		return cv_utils.match_template_multiscale_masked(img, entry['bgr'], entry['mask'], scales, threshold, pyramid=cache.pyramid(path, scales))
+	return cv_utils.match_template_masked(img, entry['bgr'], entry['mask'], threshold)
+
+
+def _op_find_any(img: np.ndarray, cache: _TemplateCache, paths: Sequence[str], threshold: float, mode: str = 'masked', band: float = 0.08, scales: Optional[Sequence[float]] = None):
+	best = None
+	for idx, path in enumerate(paths):
+		res = _op_match(img, cache, path, threshold, mode, band, scales)
+		if res is not None and (best is None or res[4] > best[4]):
+			best = tuple(res[:5]) + (idx,)
+	return best
+
+
+def _op_ping(img: Optional[np.ndarray], cache: _TemplateCache, paths: Sequence[str] = ()):
+	# Health check / warm-up: optionally preload templates
+	for path in paths:
+		cache.get(path)
+	return len(cache.entries)
+
+
+OPS = {'match': _op_match, 'find_any': _op_find_any, 'ping': _op_ping}
+
+
+def _worker_main(conn, block_name: str, slots: int, height: int, width: int) -> None:
+	# Worker process entry point (spawned, so it must stay importable)
+	shm = shared_memory.SharedMemory(name=block_name)
+	frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=shm.buf)
+	cache = _TemplateCache()
+	subscribers: Dict[str, object] = {}
+	while True:
+		try:
+			msg = conn.recv()
+		except (EOFError, OSError):
+			break
+		if msg is None:
+			break
+		req_id, op, ref, args = msg
+		try:
+			if ref is None:
+				img = None
+			elif ref[0] == 'slot':
+				_, slot, h, w = ref
+				img = frames[slot, :h, :w]
+			else:
+				_, spec, region, seq = ref
+				sub = subscribers.get(spec['stats'])
+				if sub is None:
+					import capture_service
+					sub = subscribers[spec['stats']] = capture_service.FrameSubscriber(spec)
+				img = sub.get(region, seq)
+				if img is None:
+					raise RuntimeError(f"frame {region}#{seq} already overwritten")
+			res = OPS[op](img, cache, *args)
+			conn.send((req_id, True, res))
+		except Exception as e:
+			conn.send((req_id, False, f"{type(e).__name__}: {e}"))
+	del frames
+	shm.close()
+
+
+class VisionPool:
+	"""Process pool for template matching with a small RPC.
+
+	submit(op, frame, *args) returns a concurrent.futures.Future. frame is a
+	BGR array (copied into a free slot of the shared input block; frames
+	larger than max_frame are rejected) or a service_frame() reference. A
+	worker that dies is restarted; its in-flight requests are retried once on
+	another worker and then fail with WorkerCrashed.
+	"""
+
+	def __init__(self, workers: int = 2, max_frame: Tuple[int, int] = (1080, 1920), slots: Optional[int] = None, logger=None):
+		self.size = max(1, int(workers))
+		self.max_frame = (int(max_frame[0]), int(max_frame[1]))
+		self.slots = int(slots) if slots else self.size * 4
+		self.logger = logger
+		self.restarts = 0
+		self._ctx = mp.get_context('spawn')
+		self._ids = itertools.count()
+		self._lock = threading.Lock()
+		self._free_slots: List[int] = list(range(self.slots))
+		self._slot_ready = threading.Condition(self._lock)
+		self._workers: List[Optional[Tuple[object, object]]] = [None] * self.size
+		# req_id -> (future, worker index, slot or None, message, retries left)
+		self._pending: Dict[int, list] = {}
+		self._block: Optional[shared_memory.SharedMemory] = None
+		self._frames: Optional[np.ndarray] = None
+		self._collector: Optional[threading.Thread] = None
+		self._closed = threading.Event()
+
+	def log(self, msg: str) -> None:
+		if self.logger:
+			self.logger(msg)
+
+	def start(self) -> 'VisionPool':
+		h, w = self.max_frame
+		self._block = shared_memory.SharedMemory(create=True, size=self.slots * h * w * 3)
+		self._frames = np.ndarray((self.slots, h, w, 3), dtype=np.uint8, buffer=self._block.buf)
+		for idx in range(self.size):
+			self._spawn(idx)
+		self._collector = threading.Thread(target=self._collect, name='vision-pool', daemon=True)
+		self._collector.start()
+		return self
+
+	def _spawn(self, idx: int) -> None:
+		parent, child = self._ctx.Pipe()
+		h, w = self.max_frame
+		proc = self._ctx.Process(target=_worker_main, args=(child, self._block.name, self.slots, h, w), name=f"vision-{idx}", daemon=True)
+		proc.start()
+		child.close()
+		self._workers[idx] = (proc, parent)
+
+	def _pick_worker(self) -> int:
+		# Least in-flight requests
+		load = [0] * self.size
+		for entry in self._pending.values():
+			load[entry[1]] += 1
+		return min(range(self.size), key=lambda i: load[i])
+
+	def _acquire_slot(self, timeout: float) -> int:
+		with self._slot_ready:
+			if not self._slot_ready.wait_for(lambda: self._free_slots, timeout=timeout):
+				raise TimeoutError("No free vision pool frame slot")
+			return self._free_slots.pop()
+
+	def _release_slot(self, slot: Optional[int]) -> None:
+		if slot is None:
+			return
+		with self._slot_ready:
+			self._free_slots.append(slot)
+			self._slot_ready.notify()
+
+	def submit(self, op: str, frame, *args, timeout: float = 5.0) -> Future:
+		if self._closed.is_set() or self._block is None:
+			raise RuntimeError("VisionPool is not running")
+		slot = None
+		if frame is None or isinstance(frame, tuple):
+			ref = frame
+		else:
+			h, w = frame.shape[:2]
+			if h > self.max_frame[0] or w > self.max_frame[1]:
+				raise ValueError(f"Frame {w}x{h} exceeds pool max_frame {self.max_frame[1]}x{self.max_frame[0]}")
+			slot = self._acquire_slot(timeout)
+			np.copyto(self._frames[slot, :h, :w], frame[:, :, :3])
+			ref = ('slot', slot, h, w)
+		future: Future = Future()
+		req_id = next(self._ids)
+		msg = (req_id, op, ref, args)
+		with self._lock:
+			idx = self._pick_worker()
+			self._pending[req_id] = [future, idx, slot, msg, 1]
+			conn = self._workers[idx][1]
+			try:
+				conn.send(msg)
+			except (BrokenPipeError, OSError):
+				# Collector notices the dead worker and retries this request
+				pass
+		return future
+
+	def match(self, frame, path: str, threshold: float, mode: str = 'masked', band: float = 0.08, scales: Optional[Sequence[float]] = None) -> Future:
+		return self.submit('match', frame, path, threshold, mode, band, scales)
+
+	def find_any(self, frame, paths: Sequence[str], threshold: float, mode: str = 'masked') -> Future:
+		return self.submit('find_any', frame, list(paths), threshold, mode)
+
+	def warm_up(self, paths: Sequence[str] = (), timeout: float = 30.0) -> float:
+		"""Ping every worker (loading paths) and return the slowest round trip in ms"""
+		t0 = time.perf_counter()
+		futures = [self.submit('ping', None, list(paths)) for _ in range(self.size)]
+		for f in futures:
+			f.result(timeout=timeout)
+		return (time.perf_counter() - t0) * 1000.0
+
+	def _finish(self, req_id: int, ok: bool, value) -> None:
+		with self._lock:
+			entry = self._pending.pop(req_id, None)
+		if entry is None:
+			return
+		future, _, slot, _, _ = entry
+		self._release_slot(slot)
+		if ok:
+			future.set_result(value)
+		else:
+			future.set_exception(RuntimeError(value))
+
+	def _restart(self, idx: int) -> None:
+		if self._closed.is_set():
+			return
+		proc, conn = self._workers[idx]
+		code = proc.exitcode
+		conn.close()
+		if proc.is_alive():
+			proc.kill()
+		proc.join(timeout=1.0)
+		self.restarts += 1
+		self.log(f"Vision worker {idx} exited (code {code}); restarting")
+		with self._lock:
+			self._spawn(idx)
+			orphans = [(rid, e) for rid, e in self._pending.items() if e[1] == idx]
+		for req_id, entry in orphans:
+			future, _, slot, msg, retries = entry
+			if retries <= 0:
+				with self._lock:
+					self._pending.pop(req_id, None)
+				self._release_slot(slot)
+				future.set_exception(WorkerCrashed(f"vision worker {idx} crashed twice on request {req_id}"))
+				continue
+			with self._lock:
+				target = self._pick_worker()
+				entry[1] = target
+				entry[4] = retries - 1
+				try:
+					self._workers[target][1].send(msg)
+				except (BrokenPipeError, OSError):
+					pass
+
+	def _collect(self) -> None:
+		while not self._closed.is_set():
+			conns = {self._workers[i][1]: i for i in range(self.size) if self._workers[i] is not None}
+			sentinels = {self._workers[i][0].sentinel: i for i in range(self.size) if self._workers[i] is not None}
+			ready = wait_connections(list(conns) + list(sentinels), timeout=0.5)
+			dead = set()
+			for obj in ready:
+				if obj in conns:
+					try:
+						while conns[obj] is not None and obj.poll():
+							req_id, ok, value = obj.recv()
+							self._finish(req_id, ok, value)
+					except (EOFError, OSError):
+						dead.add(conns[obj])
+				else:
+					dead.add(sentinels[obj])
+			if self._closed.is_set():
+				break
+			for idx in dead:
+				self._restart(idx)
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {'workers': self.size, 'alive': sum(1 for w in self._workers if w and w[0].is_alive()), 'pending': len(self._pending), 'restarts': self.restarts}
+
+	def close(self) -> None:
+		self._closed.set()
+		if self._collector is not None:
+			self._collector.join(timeout=2.0)
+		for worker in self._workers:
+			if worker is None:
+				continue
+			proc, conn = worker
+			try:
+				conn.send(None)
+			except (BrokenPipeError, OSError):
+				pass
+		for worker in self._workers:
+			if worker is None:
+				continue
+			proc, conn = worker
+			proc.join(timeout=2.0)
+			if proc.is_alive():
+				proc.kill()
+			conn.close()
+		with self._lock:
+			pending, self._pending = self._pending, {}
+		for future, _, _, _, _ in pending.values():
+			future.set_exception(RuntimeError("VisionPool closed"))
+		if self._block is not None:
+			self._frames = None
+			self._block.close()
+			self._block.unlink()
+			self._block = None
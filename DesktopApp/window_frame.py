@@ -0,0 +1,109 @@
+import time
+from typing import Dict, Optional, Tuple
+
+# Locates the game window so macro positions can be stored relative to it.
+# Positions are saved in screen pixels together with the window rectangle
+# they were recorded in; at bet time they are remapped onto wherever that
+# window is now. Finding the window by title needs win32gui (pywin32) or
+# pygetwindow; finding it by an anchor template needs the vision stack.
+# Neither is imported until first use.
+
+Rect = Tuple[int, int, int, int]
+
+
+def remap_box(box: Tuple[int, int, int, int], ref: Rect, cur: Rect) -> Tuple[int, int, int, int]:
+	# Click points scale with the window; the click box size is kept
+	x, y, w, h = box
+	sx = cur[2] / ref[2] if ref[2] else 1.0
+	sy = cur[3] / ref[3] if ref[3] else 1.0
+	return (int(round(cur[0] + (x - ref[0]) * sx)), int(round(cur[1] + (y - ref[1]) * sy)), w, h)
+
+
+def _win32_rect(title: str, hwnd: Optional[int]) -> Tuple[Optional[Rect], Optional[int]]:
+	import win32gui
+	if not hwnd or not win32gui.IsWindow(hwnd):
+		matches = []
+		needle = title.lower()
+
+		def collect(h, _):
+			if win32gui.IsWindowVisible(h) and needle in win32gui.GetWindowText(h).lower():
+				matches.append(h)
+		win32gui.EnumWindows(collect, None)
+		if not matches:
+			return None, None
+		hwnd = matches[0]
+	if win32gui.IsIconic(hwnd):
+		return None, hwnd
+	# Client area: the page content, without the title bar and borders
+	left, top, right, bottom = win32gui.GetClientRect(hwnd)
+	x, y = win32gui.ClientToScreen(hwnd, (left, top))
+	return (x, y, right - left, bottom - top), hwnd
+
+
+def _pygetwindow_rect(title: str) -> Optional[Rect]:
+	import pygetwindow
+	for win in pygetwindow.getWindowsWithTitle(title):
+		if win.width > 0 and win.height > 0 and not getattr(win, 'isMinimized', False):
+			return (win.left, win.top, win.width, win.height)
+	return None
+
+
+class WindowFrame:
+	"""Current screen rectangle of the game window, found by title or anchor template.
+
+	rect() is cached for `ttl` seconds. A title lookup is a couple of Win32
+	calls; an anchor lookup captures the selected monitor and, once the anchor
+	has been seen, only matches around its last position. Anchor mode follows
+	moves but not resizes (the anchor is matched at one scale).
+	"""
+
+	def __init__(self, title: Optional[str] = None, anchor: Optional[str] = None, threshold: float = 0.8, ttl: float = 0.25):
+		self.title = title
+		self.anchor = anchor
+		self.threshold = threshold
+		self.ttl = ttl
+		self._hwnd: Optional[int] = None
+		self._locator = None
+		self._cached: Optional[Rect] = None
+		self._checked = 0.0
+		self.lookups = 0
+
+	@property
+	def enabled(self) -> bool:
+		return bool(self.title or self.anchor)
+
+	def settings(self) -> Dict[str, object]:
+		return {'title': self.title, 'anchor': self.anchor}
+
+	def rect(self, force: bool = False) -> Optional[Rect]:
+		now = time.monotonic()
+		if not force and now - self._checked < self.ttl:
+			return self._cached
+		self._checked = now
+		self.lookups += 1
+		try:
+			self._cached = self._title_rect() if self.title else self._anchor_rect()
+		except Exception as e:
+			print(f"Window lookup failed: {e}")
+			self._cached = None
+		return self._cached
+
+	def _title_rect(self) -> Optional[Rect]:
+		try:
+			rect, self._hwnd = _win32_rect(self.title, self._hwnd)
+			return rect
+		except ImportError:
+			return _pygetwindow_rect(self.title)
+
+	def _anchor_rect(self) -> Optional[Rect]:
+		import cv_utils
+		if self._locator is None:
+			tpl, alpha = cv_utils.load_image_with_alpha(self.anchor)
+			mask = cv_utils.template_mask(self.anchor, tpl, alpha) if alpha is not None else None
+			self._locator = cv_utils.AnchorLocator(tpl, mask, self.threshold)
+		box = self._locator.locate(cv_utils.screenshot())
+		if box is None:
+			return None
+		# Frames are monitor-relative; clicks use screen coordinates
+		left, top = cv_utils.monitor_geometry()[:2]
+		return (box[0] + left, box[1] + top, box[2], box[3])